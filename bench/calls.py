@@ -0,0 +1,86 @@
+#!/usr/bin/python3
+# measures blang function calls per second for every engine with the
+# call bound fibo recursion from example/fibo.blang
+#   python3 bench/calls.py [-n N] [-r REPEAT]
+import os
+import sys
+import time
+import argparse as ap
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import lang.frontend as frontend
+import lang.exec as exec
+import lang.closure as closure
+import lang.bytecode as bytecode
+import lang.vm as vm
+
+program = """
+def fibo(n) {
+    if (n == 0) ret 0
+    if (n == 1) ret 1
+    ret fibo(n-1) + fibo(n-2)
+}
+a := fibo %d
+"""
+
+
+def parse(code):
+    # the tree blang.py runs: optimized, resolved and typed
+    return frontend.compile_source(code)
+
+
+def run_interp(asttree):
+    exec.Interpreter().visit(asttree)
+
+
+def run_closure(asttree):
+    closure.ClosureEngine().run(asttree)
+
+
+def run_vm(asttree):
+    vm.VM().run(bytecode.compile(asttree))
+
+
+engines = {
+    "interp": run_interp,
+    "closure": run_closure,
+    "vm": run_vm,
+}
+
+
+def calls(n):
+    # fibo(n) makes 2 * fib(n + 1) - 1 calls
+    a, b = 0, 1
+    for _ in range(n + 1):
+        a, b = b, a + b
+    return 2 * a - 1
+
+
+def measure(run, asttree, repeat):
+    # best of several runs, the noise is one sided
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        run(asttree)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main():
+    parser = ap.ArgumentParser(description="blang call throughput")
+    parser.add_argument("-n", type=int, default=20, help="fibo argument")
+    parser.add_argument("-r", "--repeat", type=int, default=5)
+    args = parser.parse_args()
+    asttree = parse(program % args.n)
+    total = calls(args.n)
+    print(f"fibo {args.n}: {total} calls")
+    print(f"{'engine':<10}{'calls/sec':>14}{'ns/call':>10}")
+    for name, run in engines.items():
+        elapsed = measure(run, asttree, args.repeat)
+        print(f"{name:<10}{total / elapsed:>14,.0f}{elapsed / total * 1e9:>10.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+#!/usr/bin/python3
+# compile time of many generated sources with lang.frontend.compile_many,
+# one after the other, in a thread pool and in a process pool
+#   python3 bench/compile.py [--files N] [--size KB] [--parser PARSER] [-j WORKERS]
+# the trees of the pools are compared to the ones compiled one after the
+# other, a difference exits with 1
+import os
+import sys
+import tempfile
+import time
+import argparse as ap
+
+root = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, root)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import lang.frontend as frontend
+from lexer import generate
+
+
+def main():
+    parser = ap.ArgumentParser(description="blang parallel front end")
+    parser.add_argument("--files", type=int, default=8)
+    parser.add_argument("--size", type=float, default=128, metavar="KB")
+    parser.add_argument("--parser", choices=["descent", "ply"], default="descent")
+    parser.add_argument("-j", "--workers", type=int, default=os.cpu_count())
+    args = parser.parse_args()
+    with tempfile.TemporaryDirectory() as directory:
+        paths = []
+        for n in range(args.files):
+            path = os.path.join(directory, f"source{n}.blang")
+            with open(path, "w") as f:
+                # the files differ, so do the trees
+                f.write(f"first := {n}\n" + generate(int(args.size * 1024)))
+            paths.append(path)
+        print(
+            f"{args.files} files of {args.size:.0f}KB, {args.parser} parser, {args.workers} workers"
+        )
+        print(f"{'mode':<10}{'seconds':>10}{'speedup':>10}")
+        start = time.perf_counter()
+        serial = [frontend.compile_file(path, parser=args.parser) for path in paths]
+        base = time.perf_counter() - start
+        print(f"{'serial':<10}{base:>10.2f}{1:>9.2f}x")
+        expected = [tree.to_json() for tree in serial]
+        del serial
+        for mode, processes in (("threads", False), ("processes", True)):
+            start = time.perf_counter()
+            trees = frontend.compile_many(
+                paths, args.workers, processes, parser=args.parser
+            )
+            seconds = time.perf_counter() - start
+            print(f"{mode:<10}{seconds:>10.2f}{base / seconds:>9.2f}x")
+            if [tree.to_json() for tree in trees] != expected:
+                print(f"{mode}: the trees differ from the serial ones")
+                sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
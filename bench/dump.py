@@ -0,0 +1,85 @@
+#!/usr/bin/python3
+# time and peak memory of the -d dumps of a generated program: the whole
+# tree as nested dicts through json.dumps, the json streamed a node at a time
+# by lang.dump and the binary dump, and the time to load the binary dump
+# against parsing the source again
+#   python3 bench/dump.py [--size MB]
+# the streamed json is compared to the one of json.dumps, a difference
+# exits with 1
+import gc
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+import argparse as ap
+
+root = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, root)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import lang.astnode as ast
+import lang.descent as descent
+import lang.dump as dump
+from lexer import generate
+
+
+def whole(tree, path):
+    # -d before lang.dump
+    text = json.dumps({"type": tree.type, "body": ast.json_value(tree.body)}, indent=4)
+    with open(path, "w") as f:
+        f.write(text)
+
+
+def measure(run):
+    # seconds and peak MB, the peak under tracemalloc
+    gc.collect()
+    start = time.perf_counter()
+    run()
+    seconds = time.perf_counter() - start
+    gc.collect()
+    tracemalloc.start()
+    run()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return seconds, peak / (1 << 20)
+
+
+def main():
+    parser = ap.ArgumentParser(description="blang tree dumps")
+    parser.add_argument("--size", type=float, default=1, metavar="MB")
+    args = parser.parse_args()
+    code = generate(int(args.size * (1 << 20))) + "\n"
+    tree = descent.parse(code)
+    print(f"{len(code) / (1 << 20):.1f}MB of source")
+    with tempfile.TemporaryDirectory() as directory:
+        base = os.path.join(directory, "tree")
+        print(f"{'dump':<12}{'seconds':>10}{'peak MB':>10}{'file MB':>10}")
+        for name, run, path in (
+            ("json.dumps", lambda: whole(tree, base + ".whole"), base + ".whole"),
+            ("streamed", lambda: dump.save(tree, base), base + ".json"),
+            ("binary", lambda: dump.save(tree, base, "binary"), base + ".bin"),
+        ):
+            seconds, peak = measure(run)
+            size = os.path.getsize(path) / (1 << 20)
+            print(f"{name:<12}{seconds:>10.3f}{peak:>10.1f}{size:>10.1f}")
+        if open(base + ".whole").read() != open(base + ".json").read():
+            print("the streamed json differs from json.dumps")
+            sys.exit(1)
+        print(f"{'load':<12}{'seconds':>10}")
+        for name, run in (
+            ("parse", lambda: descent.parse(code)),
+            ("binary", lambda: dump.load(base + ".bin")),
+        ):
+            gc.collect()
+            start = time.perf_counter()
+            run()
+            print(f"{name:<12}{time.perf_counter() - start:>10.3f}")
+        if dump.load(base + ".bin").to_json() != tree.to_json():
+            print("the loaded tree differs from the parsed one")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,158 @@
+#!/usr/bin/python3
+# lexing throughput of the ply lexer (lang/lexer.py) and of the hand written
+# one (lang/scanner.py) on a generated program of a few megabytes
+#   python3 bench/lexer.py [--size MB] [-r REPEAT]
+# the token streams are compared first, a difference exits with 1
+import os
+import sys
+import tempfile
+import time
+import argparse as ap
+
+root = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, root)
+
+import lang.astnode as ast
+import lang.lexer as plylexer
+import lang.scanner as scanner
+
+# one block of the generated program, {n} keeps the names apart
+block = """
+# block {n}
+class Point{n} {{
+    x := 0
+    y := 0.5
+    def move{n}(dx, dy) {{
+        this.x = this.x + dx
+        this.y = this.y + dy * 2.25
+    }}
+}}
+def fibo{n}(n) {{
+    if (n < 2) ret n
+    ret fibo{n}(n - 1) + fibo{n}(n - 2)
+}}
+total{n} := 0
+i{n} := 0
+while (i{n} <= 100 && !(total{n} >= 5000 || false)) {{
+    total{n} = total{n} + i{n} % 7; i{n} = i{n} + 1
+}}
+names{n} := list(3)
+names{n}[0] = "block {n}"
+if (total{n} == 0) {{ println "empty" }} else {{
+    println(names{n}[0], total{n}, -fibo{n}(10), ~{n})
+}}
+"""
+
+
+def generate(size):
+    parts = []
+    length = 0
+    n = 0
+    while length < size:
+        part = block.format(n=n)
+        parts.append(part)
+        length += len(part)
+        n += 1
+    return "".join(parts)
+
+
+def ply_tokens(code):
+    lexer = plylexer.lexer
+    lexer.paren_level = 0
+    lexer.last_token = None
+    lexer.rcurly_end = False
+    lexer.lineno = 1
+    lexer.input(code)
+    token = lexer.token
+    while True:
+        tok = token()
+        if tok is None:
+            return
+        yield tok.type, tok.value, tok.lineno, tok.lexpos
+
+
+def hand_tokens(code):
+    lexer = scanner.Lexer()
+    lexer.input(code)
+    token = lexer.token
+    while True:
+        tok = token()
+        if tok is None:
+            return
+        yield tok.type, tok.value, tok.lineno, tok.lexpos
+
+
+def plain(tok):
+    # the token without the ast nodes, the streams of both lexers compare equal
+    tokType, value, lineno, lexpos = tok
+    if type(value) == ast.AstConst:
+        value = value.value
+    elif type(value) == ast.AstField:
+        value = value.name
+    elif type(value) == ast.AstEnd:
+        value = None
+    if value is not None and not isinstance(value, str):
+        value = (type(value).__name__, str(value))
+    return tokType, value, lineno, lexpos
+
+
+def count(tokens):
+    n = 0
+    for _ in tokens:
+        n += 1
+    return n
+
+
+def best(run, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        tokens = run()
+        times.append(time.perf_counter() - start)
+    return min(times), tokens
+
+
+def main():
+    parser = ap.ArgumentParser(description="blang lexer throughput")
+    parser.add_argument("--size", type=float, default=4, metavar="MB")
+    parser.add_argument("-r", "--repeat", type=int, default=3)
+    args = parser.parse_args()
+    code = generate(int(args.size * (1 << 20)))
+    with tempfile.TemporaryDirectory() as directory:
+        source = os.path.join(directory, "lexer.blang")
+        with open(source, "w") as f:
+            f.write(code)
+        # scan_file adds the '\n' blang.py adds
+        code += "\n"
+        reference = [plain(tok) for tok in ply_tokens(code)]
+        streams = {
+            "hand": [plain(tok) for tok in hand_tokens(code)],
+            "scan str": [plain(tok) for tok in scanner.scan(code)],
+            "scan mmap": [plain(tok) for tok in scanner.scan_file(source)],
+        }
+        for name, stream in streams.items():
+            if stream != reference:
+                print(f"{name}: the tokens differ from the ply lexer")
+                sys.exit(1)
+        del reference, streams
+        runs = {
+            "ply": lambda: count(ply_tokens(code)),
+            "hand": lambda: count(hand_tokens(code)),
+            "scan str": lambda: count(scanner.scan(code)),
+            "scan mmap": lambda: count(scanner.scan_file(source)),
+        }
+        megabytes = len(code) / (1 << 20)
+        print(f"{megabytes:.1f}MB of source")
+        print(f"{'lexer':<12}{'seconds':>10}{'MB/s':>10}{'Mtok/s':>10}{'speedup':>10}")
+        base = None
+        for name, run in runs.items():
+            seconds, tokens = best(run, args.repeat)
+            base = base or seconds
+            print(
+                f"{name:<12}{seconds:>10.3f}{megabytes / seconds:>10.2f}"
+                f"{tokens / seconds / 1e6:>10.2f}{base / seconds:>9.2f}x"
+            )
+
+
+if __name__ == "__main__":
+    main()
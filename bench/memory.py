@@ -0,0 +1,99 @@
+#!/usr/bin/python3
+# memory per node of the trees of a generated program: the parsed tree, the
+# tree the engines run (optimized, resolved and typed) and the struct of
+# arrays encoding of lang/flat.py, with the time to encode and decode it;
+# "unslotted" is the parsed tree as it was before the nodes had __slots__:
+# the same attributes in a __dict__ and a node per constant and end
+#   python3 bench/memory.py [--size MB]
+# the decoded tree is compared to the parsed one, a difference exits with 1
+import copy
+import gc
+import os
+import sys
+import time
+import tracemalloc
+import argparse as ap
+
+root = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, root)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import lang.astnode as ast
+import lang.descent as descent
+import lang.flat as flat
+import lang.frontend as frontend
+import lang.optimizer as optimizer
+from lexer import generate
+
+
+def traced(build):
+    # the result of build() and the bytes it still holds
+    gc.collect()
+    tracemalloc.start()
+    result = build()
+    gc.collect()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return result, size
+
+
+# node class -> a class of the same name without __slots__
+unslotted_classes = {}
+
+
+def slots(kind):
+    return [name for base in kind.__mro__ for name in getattr(base, "__slots__", ())]
+
+
+def unslotted(node):
+    if isinstance(node, list):
+        return [unslotted(item) for item in node]
+    if not isinstance(node, ast.AstNode):
+        # the constant values were not shared either
+        return copy.copy(node)
+    kind = type(node)
+    if kind not in unslotted_classes:
+        unslotted_classes[kind] = type(kind.__name__, (), {})
+    copied = unslotted_classes[kind]()
+    for name in slots(kind):
+        setattr(copied, name, unslotted(getattr(node, name)))
+    return copied
+
+
+def main():
+    parser = ap.ArgumentParser(description="blang tree memory per node")
+    parser.add_argument("--size", type=float, default=1, metavar="MB")
+    args = parser.parse_args()
+    code = generate(int(args.size * (1 << 20))) + "\n"
+    print(f"{len(code) / (1 << 20):.1f}MB of source")
+    print(f"{'tree':<12}{'nodes':>10}{'MB':>10}{'bytes/node':>12}")
+
+    tree, size = traced(lambda: descent.parse(code))
+    nodes = sum(1 for _ in optimizer.walk(tree))
+    print(f"{'parsed':<12}{nodes:>10}{size / (1 << 20):>10.1f}{size / nodes:>12.1f}")
+
+    before, size = traced(lambda: unslotted(tree))
+    print(f"{'unslotted':<12}{nodes:>10}{size / (1 << 20):>10.1f}{size / nodes:>12.1f}")
+    del before
+
+    start = time.perf_counter()
+    encoded = flat.encode(tree)
+    encoding = time.perf_counter() - start
+    size = encoded.nbytes()
+    print(f"{'flat':<12}{nodes:>10}{size / (1 << 20):>10.1f}{size / nodes:>12.1f}")
+    start = time.perf_counter()
+    decoded = flat.decode(encoded)
+    decoding = time.perf_counter() - start
+    if decoded.to_json() != tree.to_json():
+        print("the decoded tree differs from the parsed one")
+        sys.exit(1)
+    del tree, decoded
+
+    tree, size = traced(lambda: frontend.compile_source(code))
+    nodes = sum(1 for _ in optimizer.walk(tree))
+    print(f"{'front end':<12}{nodes:>10}{size / (1 << 20):>10.1f}{size / nodes:>12.1f}")
+    print(f"encode {encoding:.3f}s, decode {decoding:.3f}s, {len(encoded)} flat nodes")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+#!/usr/bin/python3
+# parse time and peak memory of the ply parser (lang/syntax.py) and of the
+# recursive descent one (lang/descent.py) on a generated program
+#   python3 bench/parser.py [--size MB] [-r REPEAT]
+# the json of the trees of both parsers is compared first, on the examples
+# and on the generated program, a difference exits with 1
+import contextlib
+import gc
+import glob
+import io
+import os
+import sys
+import time
+import tracemalloc
+import argparse as ap
+
+root = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, root)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import lang.scanner as scanner
+import lang.syntax as syntax
+import lang.descent as descent
+from lexer import generate
+
+
+def ply_parse(code):
+    return syntax.parse(code)
+
+
+parsers = {
+    "ply": ply_parse,
+    "ply + scanner": lambda code: syntax.parse(code, scanner.Lexer()),
+    "descent": descent.parse,
+}
+
+
+def same_trees(code):
+    trees = [parse(code).to_json() for parse in parsers.values()]
+    return all(tree == trees[0] for tree in trees)
+
+
+def best(parse, code, repeat):
+    times = []
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        tree = parse(code)
+        times.append(time.perf_counter() - start)
+        del tree
+    return min(times)
+
+
+def memory(parse, code):
+    # bytes of the tree and bytes allocated at the peak of the parse
+    gc.collect()
+    tracemalloc.start()
+    tree = parse(code)
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del tree
+    return current, peak
+
+
+def main():
+    parser = ap.ArgumentParser(description="blang parser time and memory")
+    parser.add_argument("--size", type=float, default=2, metavar="MB")
+    parser.add_argument("-r", "--repeat", type=int, default=3)
+    args = parser.parse_args()
+    for path in sorted(glob.glob(os.path.join(root, "example", "*.blang"))):
+        code = open(path).read() + "\n"
+        try:
+            with contextlib.redirect_stdout(io.StringIO()):
+                ply_parse(code)
+        except Exception:
+            # does not parse, keywords.blang
+            continue
+        if not same_trees(code):
+            print(f"{os.path.basename(path)}: the trees of the parsers differ")
+            sys.exit(1)
+    code = generate(int(args.size * (1 << 20))) + "\n"
+    if not same_trees(code):
+        print("generated program: the trees of the parsers differ")
+        sys.exit(1)
+    megabytes = len(code) / (1 << 20)
+    print(f"{megabytes:.1f}MB of source")
+    print(
+        f"{'parser':<16}{'seconds':>10}{'MB/s':>10}{'speedup':>10}{'tree MB':>10}{'peak MB':>10}"
+    )
+    base = None
+    for name, parse in parsers.items():
+        seconds = best(parse, code, args.repeat)
+        tree, peak = memory(parse, code)
+        base = base or seconds
+        print(
+            f"{name:<16}{seconds:>10.3f}{megabytes / seconds:>10.2f}{base / seconds:>9.2f}x"
+            f"{tree / (1 << 20):>10.1f}{peak / (1 << 20):>10.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+#!/usr/bin/python3
+# measures the time from starting blang.py to the output of the first
+# statement of a program, with the tree cache warm and with --no-cache
+#   python3 bench/startup.py [-r REPEAT] [--engine ENGINE] [--target MS]
+# exits with 1 when the median warm start is slower than --target
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import argparse as ap
+
+root = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+
+program = """
+println "ready"
+def fibo(n) {
+    if (n < 2) ret n
+    ret fibo(n - 1) + fibo(n - 2)
+}
+x := fibo 5
+println x
+"""
+
+
+def first_statement(args, env):
+    # seconds until the first line is printed
+    start = time.perf_counter()
+    proc = subprocess.Popen(
+        [sys.executable, os.path.join(root, "blang.py")] + args,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.DEVNULL,
+        env=env,
+    )
+    proc.stdout.readline()
+    elapsed = time.perf_counter() - start
+    proc.communicate()
+    if proc.returncode:
+        raise SystemExit(f"blang.py {' '.join(args)} failed")
+    return elapsed
+
+
+def median(values):
+    values = sorted(values)
+    middle = len(values) // 2
+    if len(values) % 2:
+        return values[middle]
+    return (values[middle - 1] + values[middle]) / 2
+
+
+def main():
+    parser = ap.ArgumentParser(description="blang time to first statement")
+    parser.add_argument("-r", "--repeat", type=int, default=10)
+    parser.add_argument(
+        "--engine", choices=["interp", "closure", "vm"], default="interp"
+    )
+    parser.add_argument(
+        "--target",
+        type=float,
+        metavar="MS",
+        help="Fail when the median warm start is slower",
+    )
+    args = parser.parse_args()
+    with tempfile.TemporaryDirectory() as directory:
+        source = os.path.join(directory, "startup.blang")
+        with open(source, "w") as f:
+            f.write(program)
+        env = dict(os.environ, BLANG_CACHE_DIR=os.path.join(directory, "cache"))
+        modes = {
+            "cold": [source, "--engine", args.engine, "--no-cache"],
+            "warm": [source, "--engine", args.engine],
+        }
+        # fill the caches
+        first_statement(modes["warm"], env)
+        print(f"{'start':<8}{'min ms':>10}{'median ms':>12}")
+        results = {}
+        for name, blangArgs in modes.items():
+            times = [first_statement(blangArgs, env) for _ in range(args.repeat)]
+            results[name] = median(times) * 1000
+            print(f"{name:<8}{min(times) * 1000:>10.1f}{results[name]:>12.1f}")
+    if args.target is not None and results["warm"] > args.target:
+        print(
+            f"warm start {results['warm']:.1f}ms is over the {args.target:g}ms target"
+        )
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
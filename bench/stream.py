@@ -0,0 +1,94 @@
+#!/usr/bin/python3
+# peak memory and time of running a large generated straight-line script
+# as a whole and with --stream, the outputs have to be the same
+#   python3 bench/stream.py [--size MB] [--engine ENGINE]
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import argparse as ap
+
+root = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+
+header = """
+def scale(v, k) {
+    ret v * k + 1
+}
+class Counter {
+    n := 0
+    def add(k) {
+        this.n = this.n + k
+    }
+}
+counter := Counter()
+total := 0
+"""
+
+# one chunk of statements, {n} keeps the values apart
+chunk = """
+a := {n}
+b := a * 3 + {n} % 7
+total = total + scale(b, 2) - a
+counter.add(1)
+i := 0
+while (i < 3) {{ total = total + i; i = i + 1 }}
+"""
+
+footer = """
+println(total)
+println(counter.n)
+"""
+
+
+def generate(path, size):
+    with open(path, "w") as f:
+        f.write(header)
+        length = 0
+        n = 0
+        while length < size:
+            part = chunk.format(n=n % 1000)
+            f.write(part)
+            length += len(part)
+            n += 1
+        f.write(footer)
+
+
+def run(args):
+    # seconds, peak rss in MB and the output of blang.py
+    start = time.perf_counter()
+    proc = subprocess.Popen(
+        [sys.executable, os.path.join(root, "blang.py")] + args,
+        stdout=subprocess.PIPE,
+    )
+    output = proc.stdout.read()
+    _, status, usage = os.wait4(proc.pid, 0)
+    elapsed = time.perf_counter() - start
+    if status:
+        raise SystemExit(f"blang.py {' '.join(args)} failed")
+    return elapsed, usage.ru_maxrss / 1024, output
+
+
+def main():
+    parser = ap.ArgumentParser(description="blang streaming execution memory")
+    parser.add_argument("--size", type=float, default=8, metavar="MB")
+    parser.add_argument("--engine", choices=["interp", "closure"], default="interp")
+    args = parser.parse_args()
+    with tempfile.TemporaryDirectory() as directory:
+        source = os.path.join(directory, "stream.blang")
+        generate(source, int(args.size * (1 << 20)))
+        megabytes = os.path.getsize(source) / (1 << 20)
+        print(f"{megabytes:.1f}MB of source, {args.engine} engine")
+        print(f"{'mode':<10}{'seconds':>10}{'peak MB':>10}")
+        outputs = []
+        for mode, extra in (("whole", ["--no-cache"]), ("stream", ["--stream"])):
+            seconds, peak, output = run([source, "--engine", args.engine] + extra)
+            outputs.append(output)
+            print(f"{mode:<10}{seconds:>10.2f}{peak:>10.1f}")
+        if outputs[0] != outputs[1]:
+            print("the outputs differ")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
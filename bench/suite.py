@@ -0,0 +1,368 @@
+#!/usr/bin/python3
+# the benchmark suite: workloads made from the examples at a size of choice,
+# run by blang.py on every engine, and a generated program through the front
+# end only; for each workload and engine the median and p95 wall time, the
+# peak rss, the peak of the python heap under tracemalloc and the young
+# collections of the garbage collector (python counts no allocations, the
+# collections come every 700 container objects that are still alive)
+#   python3 bench/suite.py [-r REPEAT] [--engine ENGINE] [--workload NAME]
+#                          [--size NAME=N] [--save FILE] [--baseline FILE]
+#                          [--threshold PERCENT]
+# with --baseline a metric over the threshold above the one of the baseline
+# exits with 1; --save writes the results for a later
+# --baseline
+import gc
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+import argparse as ap
+
+bench = os.path.dirname(os.path.abspath(__file__))
+root = os.path.join(bench, "..")
+ENGINES = ["interp", "closure", "vm"]
+FRONTEND = "frontend"
+# metric -> (column, format, slack), a larger value is worse for all of them
+# and an increase within the slack is no regression of a small value
+METRICS = {
+    "median": ("median s", "{:.3f}", 0.01),
+    "p95": ("p95 s", "{:.3f}", 0.01),
+    "rss": ("rss MB", "{:.1f}", 1),
+    "heap": ("heap MB", "{:.1f}", 0.5),
+    "collections": ("gc0", "{:d}", 2),
+}
+
+
+def fibo(n):
+    return f"""
+def fibo(n) {{
+    if (n == 0) ret 0
+    if (n == 1) ret 1
+    ret fibo(n-1) + fibo(n-2)
+}}
+println fibo {n}
+"""
+
+
+def qsort(n):
+    with open(os.path.join(root, "example", "qsort.blang")) as f:
+        code = f.read()
+    code = code[: code.index("arr :=")]
+    # the same elements on every run, in an order far from sorted
+    values = random.Random(n).sample(range(-10 * n, 10 * n), n)
+    return (
+        code
+        + f'arr := list "{", ".join(map(str, values))}"\n'
+        + f"qsort(arr, {n})\nprintln arr[0]\nprintln arr[{n - 1}]\n"
+    )
+
+
+def sin(n):
+    with open(os.path.join(root, "example", "sin.blang")) as f:
+        code = f.read()
+    code = code[: code.index("math :=")]
+    return code + f"""
+math := Math()
+total := 0.0
+i := 0
+while (i < {n}) {{
+    total = total + math.sin(float i * 0.01)
+    i = i + 1
+}}
+println total
+"""
+
+
+def classes(n):
+    with open(os.path.join(root, "example", "class.blang")) as f:
+        code = f.read()
+    code = code[: code.index("a := complex()")]
+    # every add allocates a complex, the previous sum is garbage
+    return code + f"""
+one := complex()
+one.re = 1
+one.im = 2
+sum := complex()
+i := 0
+while (i < {n}) {{
+    sum = sum .add one
+    i = i + 1
+}}
+println sum.re
+println sum.im
+"""
+
+
+def tower(n):
+    with open(os.path.join(root, "example", "tower.blang")) as f:
+        code = f.read()
+    return code.replace("a := 10", f"a := {n}")
+
+
+def frontend(n):
+    sys.path.insert(0, bench)
+    from lexer import generate
+
+    return generate(n << 10) + "\n"
+
+
+# name -> (source of a size, default size, engines)
+WORKLOADS = {
+    "fibo": (fibo, 20, ENGINES),
+    "qsort": (qsort, 2000, ENGINES),
+    "sin": (sin, 200, ENGINES),
+    "class": (classes, 20000, ENGINES),
+    "tower": (tower, 100, ENGINES),
+    # the size in KB of source
+    "frontend": (frontend, 256, [FRONTEND]),
+}
+
+
+def child(result, engine, path, trace):
+    # one run in this process: blang.py on path, or the front end alone, with
+    # the wall time and the young collections written to result, or the peak
+    # of the heap with trace
+    sys.path.insert(0, root)
+    collections = [0]
+
+    def count(phase, info):
+        if phase == "start" and info["generation"] == 0:
+            collections[0] += 1
+
+    if engine == FRONTEND:
+        import lang.frontend as frontend
+
+        with open(path) as f:
+            code = f.read()
+        run = lambda: frontend.compile_source(code)
+    else:
+        import runpy
+
+        sys.argv = [
+            os.path.join(root, "blang.py"),
+            path,
+            "--engine",
+            engine,
+            "--no-cache",
+        ]
+
+        def run():
+            try:
+                runpy.run_path(sys.argv[0], run_name="__main__")
+            except SystemExit as e:
+                if e.code:
+                    raise
+
+    if trace == "trace":
+        import tracemalloc
+
+        tracemalloc.start()
+        run()
+        run = {"heap": tracemalloc.get_traced_memory()[1] / (1 << 20)}
+        tracemalloc.stop()
+    else:
+        gc.callbacks.append(count)
+        start = time.perf_counter()
+        run()
+        elapsed = time.perf_counter() - start
+        gc.callbacks.remove(count)
+        run = {"seconds": elapsed, "collections": collections[0]}
+    with open(result, "w") as f:
+        json.dump(run, f)
+
+
+def measure(engine, path, result, trace=""):
+    # the child result and its peak rss in MB, which wait4 gives per child
+    proc = subprocess.Popen(
+        [
+            sys.executable,
+            os.path.abspath(__file__),
+            "--child",
+            result,
+            engine,
+            path,
+            trace,
+        ],
+        stdout=subprocess.DEVNULL,
+    )
+    _, status, usage = os.wait4(proc.pid, 0)
+    proc.returncode = os.waitstatus_to_exitcode(status)
+    if proc.returncode:
+        raise SystemExit(f"{engine} on {path} failed")
+    with open(result) as f:
+        run = json.load(f)
+    # kilobytes on linux
+    run["rss"] = usage.ru_maxrss / 1024
+    return run
+
+
+def percentile(values, p):
+    # nearest rank
+    values = sorted(values)
+    return values[max(0, -(-len(values) * p // 100) - 1)]
+
+
+def median(values):
+    values = sorted(values)
+    middle = len(values) // 2
+    if len(values) % 2:
+        return values[middle]
+    return (values[middle - 1] + values[middle]) / 2
+
+
+def run_suite(workloads, engines, sizes, repeat, directory):
+    results = {}
+    for name in workloads:
+        source, size, supported = WORKLOADS[name]
+        size = sizes.get(name, size)
+        path = os.path.join(directory, f"{name}.blang")
+        with open(path, "w") as f:
+            f.write(source(size))
+        for engine in supported:
+            if engine != FRONTEND and engine not in engines:
+                continue
+            result = os.path.join(directory, "result.json")
+            runs = [measure(engine, path, result) for _ in range(repeat)]
+            # tracemalloc slows the run down, it is not timed
+            traced = measure(engine, path, result, "trace")
+            seconds = [run["seconds"] for run in runs]
+            results[f"{name}/{engine}"] = {
+                "size": size,
+                "median": median(seconds),
+                "p95": percentile(seconds, 95),
+                "rss": max(run["rss"] for run in runs),
+                "heap": traced["heap"],
+                # the same on every run
+                "collections": min(run["collections"] for run in runs),
+            }
+            print(
+                format_row(f"{name}/{engine}", results[f"{name}/{engine}"]), flush=True
+            )
+    return results
+
+
+def format_row(key, result, baseline=None):
+    row = f"{key:<18}{result['size']:>8}"
+    for metric, (column, form, _) in METRICS.items():
+        row += f"{form.format(result[metric]):>{len(column) + 3}}"
+        if baseline is not None:
+            row += f"{change(result[metric], baseline[metric]):>+8.1f}%"
+    return row
+
+
+def change(value, base):
+    return (value - base) / base * 100 if base else 0.0
+
+
+def compare(results, baseline, threshold):
+    # the regressions over threshold percent, as lines of text
+    regressions = []
+    print()
+    print(
+        f"{'baseline':<18}{'size':>8}"
+        + "".join(
+            f"{column:>{len(column) + 3}}{'':>9}" for column, _, _ in METRICS.values()
+        )
+    )
+    for key, result in results.items():
+        base = baseline.get(key)
+        if base is None or base["size"] != result["size"]:
+            print(f"{key:<18}{result['size']:>8}   not in the baseline")
+            continue
+        print(format_row(key, result, base))
+        for metric, (_, _, slack) in METRICS.items():
+            increase = change(result[metric], base[metric])
+            if increase > threshold and result[metric] - base[metric] > slack:
+                regressions.append(f"{key} {metric} {increase:+.1f}%")
+    return regressions
+
+
+def main():
+    if sys.argv[1:2] == ["--child"]:
+        child(*sys.argv[2:])
+        return
+    parser = ap.ArgumentParser(description="blang benchmark suite")
+    parser.add_argument("-r", "--repeat", type=int, default=5)
+    parser.add_argument(
+        "--engine",
+        action="append",
+        choices=ENGINES,
+        help="The engines to run, all of them by default",
+    )
+    parser.add_argument(
+        "--workload",
+        action="append",
+        choices=list(WORKLOADS),
+        help="The workloads to run, all of them by default",
+    )
+    parser.add_argument(
+        "--size",
+        action="append",
+        default=[],
+        metavar="NAME=N",
+        help="The size of a workload: "
+        + ", ".join(f"{name}={size}" for name, (_, size, _) in WORKLOADS.items()),
+    )
+    parser.add_argument("--save", metavar="FILE", help="Write the results as json")
+    parser.add_argument(
+        "--baseline",
+        metavar="FILE",
+        help="Compare with the results of an earlier --save",
+    )
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=10,
+        metavar="PERCENT",
+        help="The increase that is a regression",
+    )
+    args = parser.parse_args()
+    sizes = {}
+    for size in args.size:
+        name, _, n = size.partition("=")
+        if name not in WORKLOADS or not n.isdigit():
+            parser.error(f"bad --size {size}")
+        sizes[name] = int(n)
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)["results"]
+
+    print(
+        f"{'workload':<18}{'size':>8}"
+        + "".join(f"{column:>{len(column) + 3}}" for column, _, _ in METRICS.values())
+    )
+    with tempfile.TemporaryDirectory() as directory:
+        results = run_suite(
+            args.workload or list(WORKLOADS),
+            args.engine or ENGINES,
+            sizes,
+            args.repeat,
+            directory,
+        )
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump(
+                {
+                    "python": platform.python_version(),
+                    "repeat": args.repeat,
+                    "results": results,
+                },
+                f,
+                indent=4,
+            )
+    if baseline is not None:
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print(f"regressions over {args.threshold:g}%:")
+            for regression in regressions:
+                print(f"  {regression}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
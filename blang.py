@@ -1,18 +1,259 @@
 #!/usr/bin/python3
 import lang
-import lang.syntax
-import lang.visitor
-import lang.exec as exec
+import lang.optimizer as optimizer
+import lang.memo as memo
+import lang.cache as astcache
+import lang.frontend as frontend
 import argparse as ap
+import sys
 
+# the front end and the engines are imported where they are used, a cache
+# hit only loads the modules of the engine that runs the program
+
+
+# the files of the -d dumps per stage, the suffix comes from the format
+dump_files = {
+    "parsed": "astTree",
+    "optimized": "astTreeOptimized",
+    "executed": "astTreeExecuted",
+}
 
 parser = ap.ArgumentParser(description="Run the blang interpreter")
 # args[1] is the file to run
 parser.add_argument("file", nargs="?", help="The file to run")
 parser.add_argument(
-    "-d", "--dump_json", action="store_true", help="Dump the AST tree to a json file"
+    "-d",
+    "--dump_json",
+    action="store_true",
+    help="Dump the AST tree of every stage to a json file (the vm engine has no executed tree)",
+)
+parser.add_argument(
+    "--dump-stage",
+    action="append",
+    choices=list(dump_files),
+    metavar="STAGE",
+    help=f"Dump only this stage of the tree, one of {', '.join(dump_files)} (implies -d)",
+)
+parser.add_argument(
+    "--dump-format",
+    choices=["json", "binary"],
+    help="Write the dumps as json (default) or as the binary encoding of lang/flat.py (implies -d)",
+)
+parser.add_argument(
+    "--engine",
+    choices=["interp", "closure", "vm"],
+    default="interp",
+    help="The execution engine to run the program with",
+)
+parser.add_argument(
+    "--parser",
+    choices=["descent", "ply"],
+    default="descent",
+    help="The parser of the front end, lang/descent.py or the ply one in lang/syntax.py",
+)
+parser.add_argument(
+    "--lexer",
+    choices=["hand", "ply"],
+    default="hand",
+    help="The lexer of the ply parser, lang/scanner.py or the ply one in lang/lexer.py",
+)
+parser.add_argument(
+    "--dis", action="store_true", help="Print the bytecode (vm engine only)"
+)
+parser.add_argument(
+    "--unboxed",
+    action="store_true",
+    help="Keep numbers and booleans unboxed (closure engine only)",
+)
+parser.add_argument(
+    "--stats",
+    action="store_true",
+    help="Print the inline cache (interp engine) and memoization counters",
+)
+parser.add_argument(
+    "--disable-pass",
+    action="append",
+    default=[],
+    choices=list(optimizer.passes),
+    metavar="PASS",
+    help=f"Skip an optimizer pass, one of {', '.join(optimizer.passes)}",
+)
+parser.add_argument(
+    "--inline-threshold",
+    type=int,
+    default=optimizer.Inline.threshold,
+    metavar="N",
+    help="Largest function body (in ast nodes) the inline pass inlines",
+)
+parser.add_argument(
+    "--opt-report",
+    action="store_true",
+    help="Print what every optimizer pass did",
+)
+parser.add_argument(
+    "--memoize",
+    action="store_true",
+    help="Cache the results of pure functions (interp and closure engines)",
+)
+parser.add_argument(
+    "--memo-size",
+    type=int,
+    default=memo.Memo.size,
+    metavar="N",
+    help="Results kept per memoized function, least recently used go first",
+)
+parser.add_argument(
+    "--type-report",
+    action="store_true",
+    help="Print the inferred types of the variables of every function",
+)
+parser.add_argument(
+    "--no-cache",
+    action="store_true",
+    help="Do not read or write the tree and bytecode caches",
+)
+parser.add_argument(
+    "--clear-cache",
+    action="store_true",
+    help="Remove the cached trees and the cached bytecode of the file before running",
+)
+parser.add_argument(
+    "--cache-dir",
+    default=astcache.default_dir(),
+    metavar="DIR",
+    help="Directory of the cached trees (default $BLANG_CACHE_DIR or ~/.cache/blang)",
+)
+parser.add_argument(
+    "--stream",
+    action="store_true",
+    help="Parse and run the top-level statements one at a time (interp and closure engines)",
+)
+parser.add_argument(
+    "--profile",
+    action="store_true",
+    help="Print the calls and time per function, the hot lines and loops (interp engine)",
+)
+parser.add_argument(
+    "--profile-stacks",
+    default="profile.folded",
+    metavar="FILE",
+    help="Collapsed stack file of --profile and --sample for flamegraph tools (default profile.folded)",
+)
+parser.add_argument(
+    "--sample",
+    action="store_true",
+    help="Sample the blang stack from a thread, print the hot functions and lines (interp engine)",
+)
+parser.add_argument(
+    "--sample-interval",
+    type=float,
+    default=10,
+    metavar="MS",
+    help="Milliseconds between two samples of --sample",
 )
 args = parser.parse_args()
+for flag, used in (("--profile", args.profile), ("--sample", args.sample)):
+    if used and args.engine != "interp":
+        parser.error(f"{flag} needs --engine interp")
+if args.profile and args.sample:
+    parser.error("--profile and --sample do not work together")
+if args.memoize and args.engine == "vm":
+    parser.error("--memoize needs --engine interp or closure")
+if args.dis and args.engine != "vm":
+    parser.error("--dis needs --engine vm")
+if args.unboxed and args.engine != "closure":
+    parser.error("--unboxed needs --engine closure")
+if args.engine == "vm" and "executed" in (args.dump_stage or ()):
+    parser.error(
+        "--dump-stage executed needs --engine interp or closure, the vm runs bytecode"
+    )
+if args.dump_stage or args.dump_format:
+    args.dump_json = True
+dump_stages = set(args.dump_stage or dump_files) if args.dump_json else set()
+if args.engine == "vm":
+    dump_stages.discard("executed")
+
+
+def new_interpreter(memo=None):
+    # the frames of the interpreter keep their lines only for --sample
+    if args.sample:
+        import lang.profile as profile
+
+        return profile.SampledInterpreter(memo)
+    import lang.exec as exec
+
+    return exec.Interpreter(memo)
+
+
+def sampled(interpreter, run, source):
+    # run() under the sampler of --sample, source is the text of the report
+    if not args.sample:
+        return run()
+    import lang.profile as profile
+
+    sampler = profile.Sampler(interpreter, args.sample_interval / 1000)
+    sampler.start()
+    try:
+        return run()
+    finally:
+        sampler.stop()
+        print(sampler.formatReport(source()), file=sys.stderr)
+        sampler.writeStacks(args.profile_stacks)
+
+
+def dump_tree(stage, tree):
+    if stage in dump_stages:
+        import lang.dump as dump
+
+        dump.save(tree, dump_files[stage], args.dump_format or "json")
+
+
+cache = None if args.no_cache else astcache.AstCache(args.cache_dir)
+if args.clear_cache:
+    removed = astcache.AstCache(args.cache_dir).clear()
+    print(f"removed {removed} cached trees from {args.cache_dir}", file=sys.stderr)
+    if args.file:
+        import lang.bytecode as bytecode
+
+        if bytecode.clear_cache(args.file):
+            print(f"removed {bytecode.cache_path(args.file)}", file=sys.stderr)
+
+if args.stream:
+    # the file is never read as a whole, see lang/stream.py
+    unsupported = {
+        "--engine vm": args.engine == "vm",
+        "--parser ply": args.parser == "ply",
+        "--lexer ply": args.lexer == "ply",
+        "-d": args.dump_json,
+        "--dis": args.dis,
+        "--memoize": args.memoize,
+        "--opt-report": args.opt_report,
+        "--type-report": args.type_report,
+        "--profile": args.profile,
+    }
+    for flag, used in unsupported.items():
+        if used:
+            parser.error(f"--stream does not work with {flag}")
+    if not args.file:
+        exit()
+    import lang.stream as stream
+
+    if args.engine == "closure":
+        import lang.closure as closure
+
+        engine = closure.ClosureEngine(args.unboxed)
+    else:
+        engine = new_interpreter()
+    sampled(
+        engine,
+        lambda: stream.run_file(
+            args.file, engine, args.disable_pass, inlineThreshold=args.inline_threshold
+        ),
+        lambda: open(args.file).read(),
+    )
+    if args.stats and args.engine == "interp":
+        print(engine.formatStats(), file=sys.stderr)
+    exit()
 
 if args.file:
     code = open(args.file, "r").read()
@@ -20,19 +261,96 @@ if args.file:
 else:
     exit()
 
-asttree = lang.syntax.parser.parse(code)
-if args.dump_json:
-    open("astTree.json", "w").write(asttree.to_json())
+# the vm engine can skip the front end when the bytecode cache is fresh
+program = None
+memoizer = None
+options = frontend.options_key(args.disable_pass, args.inline_threshold)
+if args.engine == "vm":
+    import lang.bytecode as bytecode
+if args.engine == "vm" and not args.dump_json and not args.no_cache:
+    program = bytecode.load_cache(args.file, code, options, args.cache_dir)
+
+if program is None:
+    # the other engines (and a stale bytecode cache) start from the cached
+    # tree, the reports and the dumps need the whole front end
+    asttree = None
+    useCache = cache is not None and not (
+        args.dump_json or args.opt_report or args.type_report
+    )
+    if useCache:
+        asttree = cache.load(code, options)
+
+    if asttree is None:
+        import lang.resolver
+        import lang.infer as infer
 
-# optimize the tree (do some simple const expr folding)
-optimizer = lang.visitor.Optimizer()
-asttree = optimizer.visit(asttree)
-if args.dump_json:
-    open("astTreeOptimized.json", "w").write(asttree.to_json())
+        asttree = frontend.parse(code, args.parser, args.lexer)
+        dump_tree("parsed", asttree)
 
-# run the interpreter
-interpreter = exec.Interpreter()
+        # optimize the tree, see lang/optimizer.py for the passes
+        pipeline = optimizer.Pipeline(
+            args.disable_pass,
+            report=args.opt_report,
+            inlineThreshold=args.inline_threshold,
+        )
+        asttree = pipeline.run(asttree)
+        if args.opt_report:
+            print(pipeline.formatReport(), file=sys.stderr)
+        dump_tree("optimized", asttree)
+
+        # give every variable a slot, undefined variables are reported here
+        asttree = lang.resolver.resolve(asttree)
+
+        # the engines pick the operators for the operand types found here
+        inferrer = infer.Inferrer()
+        asttree = inferrer.infer(asttree)
+        if args.type_report:
+            print(inferrer.formatReport(), file=sys.stderr)
+        if useCache:
+            cache.save(code, asttree, options)
+
+    # find the functions without side effects, only they are memoized
+    if args.memoize:
+        purity = memo.analyze(asttree)
+        memoizer = memo.Memo(args.memo_size)
+
+    if args.engine == "vm":
+        program = bytecode.compile(asttree)
+        if not args.no_cache:
+            bytecode.save_cache(args.file, code, program, options, args.cache_dir)
+
+# run the program
+if args.engine == "vm":
+    import lang.vm as vm
+
+    if args.dis:
+        print(program.disassemble())
+    vm.VM().run(program)
+elif args.engine == "closure":
+    import lang.closure as closure
+
+    closure.ClosureEngine(args.unboxed, memoizer).run(asttree)
+elif args.profile:
+    import lang.profile as profile
+
+    interpreter = profile.ProfilingInterpreter(memoizer)
+    try:
+        interpreter.run(asttree)
+    finally:
+        print(interpreter.profile.formatReport(code), file=sys.stderr)
+        interpreter.profile.writeStacks(args.profile_stacks)
+    if args.stats:
+        print(interpreter.formatStats(), file=sys.stderr)
+else:
+    interpreter = new_interpreter(memoizer)
+    sampled(interpreter, lambda: interpreter.visit(asttree), lambda: code)
+    if args.stats:
+        print(interpreter.formatStats(), file=sys.stderr)
+if args.stats and memoizer is not None:
+    for func, reason in purity.items():
+        if reason:
+            print(f"not memoized: {func.name}, {reason}", file=sys.stderr)
+    print(memoizer.formatStats(), file=sys.stderr)
 
-interpreter.visit(asttree)
-if args.dump_json:
-    open("astTreeExecuted.json", "w").write(asttree.to_json())
+if args.engine != "vm":
+    dump_tree("executed", asttree)
@@ -1,43 +1,77 @@
 import lang
 from abc import ABC
-import json
 
 
 class AstNode(ABC):
+    # the attributes are slots, no node has a __dict__; every __init__ sets
+    # all of them (a slot has no class level default)
+    __slots__ = ("valueType", "lineno")
     type = None
 
+    def __init__(self):
+        # filled in by lang.infer on expressions that can only have one type
+        self.valueType = None
+        # the line of a statement, set by the parsers (lang.profile)
+        self.lineno = None
+
     def __str__(self):
         raise NotImplementedError("should not be called")
 
+    def fields(self):
+        # the (key, value) pairs of the json dump in their order, a value is
+        # a node, a list of nodes or a json value (lang.dump streams them)
+        return [("type", self.type)]
+
     def to_json(self):
-        raise NotImplementedError("should not be called")
+        return {key: json_value(value) for key, value in self.fields()}
 
     def getChild(self):
         return []
 
 
+def json_value(value):
+    if isinstance(value, AstNode):
+        return value.to_json()
+    elif type(value) == list:
+        return [item.to_json() for item in value]
+    return value
+
+
 class AstProgram(AstNode):
+    __slots__ = ("body", "nslots", "varnames")
     type = "Program"
-    body = None
 
     def __init__(self, body):
+        self.valueType = None
+        self.lineno = None
         self.body = body
+        # filled in by the resolver
+        self.nslots = None
+        self.varnames = None
 
     def __str__(self):
         return f"{self.type}({self.body})"
 
+    def fields(self):
+        return [("type", self.type), ("body", self.body)]
+
     def to_json(self):
-        return json.dumps({"type": self.type, "body": self.body.to_json()}, indent=4)
+        # the text of the dump, lang.dump is only needed for -d
+        import lang.dump as dump
+
+        return dump.json_text(self)
 
     def getChild(self):
         return [self.body]
 
 
 class AstStatList(AstNode):
+    __slots__ = ("body",)
     type = "StatList"
-    body = []
 
     def __init__(self, body=None, next=None):
+        self.valueType = None
+        self.lineno = None
         self.body = []
         if body:
             if type(body) == AstStatList:
@@ -53,57 +87,77 @@ class AstStatList(AstNode):
     def __str__(self):
         return f"{self.type}({[str(x) for x in self.body]})"
 
-    def to_json(self):
-        return {"type": self.type, "body": [x.to_json() for x in self.body]}
+    def fields(self):
+        return [("type", self.type), ("body", self.body)]
 
     def getChild(self):
         return self.body
 
 
 class AstClassDecl(AstNode):
+    __slots__ = (
+        "name",
+        "body",
+        "nslots",
+        "varnames",
+        "slots",
+        "memberlist",
+        "defaults",
+        "methods",
+        "init",
+    )
     type = "ClassDecl"
-    name = None
-    body = None
 
     def __init__(self, name, body):
+        self.valueType = None
+        self.lineno = None
         self.name = name
         self.body = body
+        # filled in by the resolver
+        self.nslots = None
+        self.varnames = None
+        self.slots = None
+        self.memberlist = None
+        self.defaults = None
+        self.methods = None
+        self.init = None
 
     def __str__(self):
         return f"{self.type}({self.name}, {self.body})"
 
-    def to_json(self):
-        return {"type": self.type, "name": self.name, "body": self.body.to_json()}
+    def fields(self):
+        return [("type", self.type), ("name", self.name), ("body", self.body)]
 
     def getChild(self):
         return [self.body]
 
 
 class AstMbrSel(AstNode):
+    __slots__ = ("object", "member", "cache")
     type = "MbrSel"
-    object = None
-    member = None
 
     def __init__(self, object, member):
+        self.valueType = None
+        self.lineno = None
         self.object = object
         self.member = member
+        # inline cache of the interpreter
+        self.cache = None
 
     def __str__(self):
         return f"{self.type}({self.object}, {self.member})"
 
-    def to_json(self):
-        return {
-            "type": self.type,
-            "object": self.object.to_json(),
-            "member": self.member.to_json(),
-        }
+    def fields(self):
+        return [("type", self.type), ("object", self.object), ("member", self.member)]
 
 
 class AstParamsList(AstNode):
+    __slots__ = ("params",)
     type = "ParamsList"
-    params = []
 
     def __init__(self, params, next=None):
+        self.valueType = None
+        self.lineno = None
         if type(params) == AstParamsList:
             self.params = params.params
         else:
@@ -119,15 +173,22 @@ class AstParamsList(AstNode):
 
 
 class AstFuncDecl(AstNode):
+    __slots__ = ("name", "params", "body", "nslots", "varnames", "nested", "pure")
     type = "FuncDecl"
-    name = None
-    params = None
-    body = None
 
     def __init__(self, name, body, params=None):
+        self.valueType = None
+        self.lineno = None
         self.name = name
         self.params = params
         self.body = body
+        # filled in by the resolver
+        self.nslots = None
+        self.varnames = None
+        # declared in a function body, bound once to its lexical scope
+        self.nested = False
+        # filled in by lang.memo, the result only depends on the arguments
+        self.pure = False
 
     def __str__(self):
         if self.params:
@@ -135,41 +196,33 @@ class AstFuncDecl(AstNode):
         else:
             return f"{self.type}({self.name}, {self.body})"
 
-    def to_json(self):
-        if self.params:
-            return {
-                "type": self.type,
-                "name": self.name,
-                "params": [param.to_json() for param in self.params],
-                "body": self.body.to_json(),
-            }
-        else:
-            return {
-                "type": self.type,
-                "name": self.name,
-                "params": "no params",
-                "body": self.body.to_json(),
-            }
+    def fields(self):
+        params = self.params if self.params else "no params"
+        return [
+            ("type", self.type),
+            ("name", self.name),
+            ("params", params),
+            ("body", self.body),
+        ]
 
     def getChild(self):
         return [self.body]
 
 
 class AstRet(AstNode):
+    __slots__ = ("expr",)
     type = "Ret"
-    expr = None
 
     def __init__(self, expr=None):
+        self.valueType = None
+        self.lineno = None
         self.expr = expr
 
     def __str__(self):
         return f"{self.type}({self.expr})"
 
-    def to_json(self):
-        if self.expr:
-            return {"type": self.type, "expr": self.expr.to_json()}
-        else:
-            return {"type": self.type, "expr": "none"}
+    def fields(self):
+        return [("type", self.type), ("expr", self.expr if self.expr else "none")]
 
     def getChild(self):
         if self.expr:
@@ -179,44 +232,44 @@ class AstRet(AstNode):
 
 
 class AstVarDecl(AstNode):
+    __slots__ = ("varname", "expr", "varType", "autoType", "depth", "slot")
     type = "VarDecl"
-    varname = None
-    expr = None
-    varType = None
 
     def __init__(self, name, expr, varType=None):
+        self.valueType = None
+        self.lineno = None
         self.varname = name
         self.expr = expr
         self.varType = varType
+        # varType of an auto typed declaration is only filled in for the dump
+        self.autoType = varType is None
+        # filled in by the resolver
+        self.depth = None
+        self.slot = None
 
     def __str__(self):
         return f"{self.type}({self.varname}, {self.expr})"
 
-    def to_json(self):
-        if self.varType:
-            return {
-                "type": self.type,
-                "varname": self.varname,
-                "varType": self.varType,
-                "expr": self.expr.to_json(),
-            }
-        else:
-            return {
-                "type": self.type,
-                "varname": self.varname,
-                "varType": "auto type",
-                "expr": self.expr.to_json(),
-            }
+    def fields(self):
+        varType = self.varType if self.varType else "auto type"
+        return [
+            ("type", self.type),
+            ("varname", self.varname),
+            ("varType", varType),
+            ("expr", self.expr),
+        ]
 
     def getChild(self):
         return [self.expr]
 
 
 class AstCallParamsList(AstNode):
+    __slots__ = ("params",)
     type = "CallParamsList"
-    params = []
 
     def __init__(self, params, next=None):
+        self.valueType = None
+        self.lineno = None
         if type(params) == AstCallParamsList:
             self.params = params.params
         else:
@@ -232,12 +285,15 @@ class AstCallParamsList(AstNode):
 
 
 class AstFuncCall(AstNode):
+    __slots__ = ("name", "params", "func")
     type = "FuncCall"
-    name = None
-    params = []
 
     def __init__(self, name, params=None):
+        self.valueType = None
+        self.lineno = None
         self.name = name
+        # filled in by the resolver when the name is a nested function
+        self.func = None
         self.params = []
         if params:
             if type(params) == AstCallParamsList:
@@ -248,41 +304,41 @@ class AstFuncCall(AstNode):
     def __str__(self):
         return f"{self.type}({self.name}, {[str(x) for x in self.params]})"
 
-    def to_json(self):
+    def fields(self):
         if self.params:
-            return {
-                "type": self.type,
-                "name": self.name,
-                "params": [x.to_json() for x in self.params],
-            }
-        else:
-            return {"type": self.type, "name": self.name}
+            return [("type", self.type), ("name", self.name), ("params", self.params)]
+        return [("type", self.type), ("name", self.name)]
 
     def getChild(self):
         return self.params
 
 
 class AstField(AstNode):
+    __slots__ = ("name", "depth", "slot")
     type = "Field"
-    name = None
 
     def __init__(self, name):
+        self.valueType = None
+        self.lineno = None
         self.name = name
+        # filled in by the resolver
+        self.depth = None
+        self.slot = None
 
     def __str__(self):
         return f"{self.type}({self.name})"
 
-    def to_json(self):
-        return {"type": self.type, "name": self.name}
+    def fields(self):
+        return [("type", self.type), ("name", self.name)]
 
 
 class AstIf(AstNode):
+    __slots__ = ("condition", "then", "else_")
     type = "If"
-    condition = None
-    then = None
-    else_ = None
 
     def __init__(self, condition, then, else_=None):
+        self.valueType = None
+        self.lineno = None
         self.condition = condition
         self.then = then
         self.else_ = else_
@@ -290,20 +346,15 @@ class AstIf(AstNode):
     def __str__(self):
         return f"{self.type}({self.condition}, {self.then}, {self.else_})"
 
-    def to_json(self):
+    def fields(self):
         if self.else_:
-            return {
-                "type": self.type,
-                "condition": self.condition.to_json(),
-                "then": self.then.to_json(),
-                "else": self.else_.to_json(),
-            }
-        else:
-            return {
-                "type": self.type,
-                "condition": self.condition.to_json(),
-                "then": self.then.to_json(),
-            }
+            return [
+                ("type", self.type),
+                ("condition", self.condition),
+                ("then", self.then),
+                ("else", self.else_),
+            ]
+        return [("type", self.type), ("condition", self.condition), ("then", self.then)]
 
     def getChild(self):
         if self.else_:
@@ -313,134 +364,151 @@ class AstIf(AstNode):
 
 
 class AstWhile(AstNode):
+    __slots__ = ("condition", "body")
     type = "While"
-    condition = None
-    body = None
 
     def __init__(self, condition, body):
+        self.valueType = None
+        self.lineno = None
         self.condition = condition
         self.body = body
 
     def __str__(self):
         return f"{self.type}({self.condition}, {self.body})"
 
-    def to_json(self):
-        return {
-            "type": self.type,
-            "condition": self.condition.to_json(),
-            "body": self.body.to_json(),
-        }
+    def fields(self):
+        return [("type", self.type), ("condition", self.condition), ("body", self.body)]
 
     def getChild(self):
         return [self.condition, self.body]
 
 
 class AstAssign(AstNode):
+    __slots__ = ("lvalue", "expr")
     type = "Assign"
-    lvalue = None
-    expr = None
 
     def __init__(self, lvalue, expr):
+        self.valueType = None
+        self.lineno = None
         self.lvalue = lvalue
         self.expr = expr
 
     def __str__(self):
         return f"{self.type}({self.lvalue}, {self.expr})"
 
-    def to_json(self):
-        return {
-            "type": self.type,
-            "lvalue": self.lvalue.to_json(),
-            "expr": self.expr.to_json(),
-        }
+    def fields(self):
+        return [("type", self.type), ("lvalue", self.lvalue), ("expr", self.expr)]
 
     def getChild(self):
         return [self.expr]
 
 
 class AstIndex(AstNode):
+    __slots__ = ("point", "index")
     type = "Index"
-    point = None
-    index = None
 
     def __init__(self, point, index):
+        self.valueType = None
+        self.lineno = None
         self.point = point
         self.index = index
 
     def __str__(self):
         return f"{self.type}({self.point}, {self.index})"
 
-    def to_json(self):
-        return {
-            "type": self.type,
-            "point": self.point.to_json(),
-            "index": self.index.to_json(),
-        }
+    def fields(self):
+        return [("type", self.type), ("point", self.point), ("index", self.index)]
 
 
 class AstUnaryOper(AstNode):
+    __slots__ = ("operator", "expr", "cache", "handler")
     type = "UnaryOper"
-    operator = None
-    expr = None
 
     def __init__(self, operator, expr):
+        self.valueType = None
+        self.lineno = None
         self.operator = operator
         self.expr = expr
+        # inline cache of the interpreter
+        self.cache = None
+        # operator of the interpreter for the inferred operand types
+        self.handler = None
 
     def __str__(self):
         return f"{self.type}({self.operator}, {self.expr})"
 
-    def to_json(self):
-        return {
-            "type": self.type,
-            "operator": self.operator,
-            "expr": self.expr.to_json(),
-        }
+    def fields(self):
+        return [("type", self.type), ("operator", self.operator), ("expr", self.expr)]
 
     def getChild(self):
         return [self.expr]
 
 
 class AstBinaryOper(AstNode):
+    __slots__ = ("operator", "left", "right", "cache", "handler")
     type = "BinaryOper"
-    operator = None
-    left = None
-    right = None
 
     def __init__(self, operator, left, right):
+        self.valueType = None
+        self.lineno = None
         self.operator = operator
         self.left = left
         self.right = right
+        # inline cache of the interpreter
+        self.cache = None
+        # operator of the interpreter for the inferred operand types
+        self.handler = None
 
     def __str__(self):
         return f"{self.type}({self.operator}, {self.left}, {self.right})"
 
-    def to_json(self):
-        return {
-            "type": self.type,
-            "operator": self.operator,
-            "left": self.left.to_json(),
-            "right": self.right.to_json(),
-        }
+    def fields(self):
+        return [
+            ("type", self.type),
+            ("operator", self.operator),
+            ("left", self.left),
+            ("right", self.right),
+        ]
 
     def getChild(self):
         return [self.left, self.right]
 
 
 class AstConst(AstNode):
+    __slots__ = ("value",)
     type = "Const"
-    value = None
 
     def __init__(self, value):
+        self.valueType = None
+        self.lineno = None
         self.value = value
 
     def __str__(self):
         return f"{self.type}({self.value})"
 
-    # to json
-    def to_json(self):
-        return {"type": self.type, "value": self.value.to_json()}
+    def fields(self):
+        return [("type", self.type), ("value", self.value.to_json())]
 
 
 class AstEnd(AstNode):
+    __slots__ = ()
     type = "End"
+
+
+# the lexers hand out this one for every newline and ';'
+END = AstEnd()
+
+
+class Constants:
+    # one AstConst per distinct constant of a parse, the nodes are shared
+    # (the values of the typeclasses are never changed in place, TypeInt
+    # compares to a TypeBool and has no hash, the key is the text)
+    def __init__(self):
+        self.nodes = {}
+
+    def get(self, value):
+        key = (type(value), str(value))
+        node = self.nodes.get(key)
+        if node is None:
+            node = self.nodes[key] = AstConst(value)
+        return node
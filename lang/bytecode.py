@@ -0,0 +1,490 @@
+import lang.visitor as vis
+import lang.resolver as resolver
+import lang.astnode as ast
+import lang.typeclass as tc
+import lang.cache as astcache
+import hashlib
+import marshal
+import os
+
+# opcodes, followed by zero, one or two argument words in the code list
+LOAD = 0  # slot
+STORE = 1  # slot
+ASSIGN = 2  # slot, the variable has to exist already
+CONST = 3  # const
+BINARY = 4  # index into binary_oper
+UNARY = 5  # index into unary_oper
+JUMP = 6  # target
+JUMP_IF_FALSE = 7  # target
+CALL = 8  # name, argc
+CALL_METHOD = 9  # name, argc
+RET = 10
+POP = 11
+DUP = 12
+LOAD_INDEX = 13
+STORE_INDEX = 14
+GET_MEMBER = 15  # name
+SET_MEMBER = 16  # name
+GET_SLOT = 22  # slot, member of the object on the stack
+SET_SLOT = 23  # slot
+DECL_TYPED = 17  # slot, const (type name)
+CONVERT = 18  # const (type name)
+DEF_FUNC = 19  # const (code)
+DEF_CLASS = 20  # const (code)
+RET_OUTSIDE = 21
+CALL_FUNC = 24  # index into the nested functions, argc
+CALL_FUNC_BOUND = 25  # index, argc, called on the object below the arguments
+BINARY_TYPED = 26  # index into typed_binary, operand types known from lang.infer
+UNARY_TYPED = 27  # index into typed_unary
+CALL_BOUND = (
+    28  # name, argc, a call of a class body bound to the object below the arguments
+)
+
+opnames = {
+    value: name
+    for name, value in globals().items()
+    if name.isupper() and type(value) == int
+}
+
+# instructions without an argument and with two arguments
+noarg_ops = (RET, POP, DUP, LOAD_INDEX, STORE_INDEX, RET_OUTSIDE)
+wide_ops = (CALL, CALL_METHOD, CALL_FUNC, CALL_FUNC_BOUND, CALL_BOUND, DECL_TYPED)
+
+binary_opers = ("+", "-", "*", "/", "%", "<", ">", "<=", ">=", "==", "!=", "&&", "||")
+unary_opers = ("-", "!", "~")
+# (operator, operand types) of the type specialized operators
+typed_binary = tuple(tc.fast_binary)
+typed_unary = tuple(tc.fast_unary)
+
+# bump when the compiled format changes, old cache files are ignored
+VERSION = 6
+MAGIC = b"BLNG" + VERSION.to_bytes(2, "little")
+
+
+class Code:
+    # kind: "module", "func" or "class"
+    # locals use the resolver slots, slot 0 is 'this' in every code object,
+    # class code only has 'this' and accesses the member slots through it,
+    # its instructions are the part of the class body that is not a method
+    # or a constant member
+    def __init__(self, name, kind, nparams=0, varnames=("this",)):
+        self.name = name
+        self.kind = kind
+        self.nparams = nparams
+        self.nlocals = len(varnames)
+        self.code = []
+        self.consts = []
+        self.names = []
+        self.varnames = list(varnames)
+        # class code only
+        self.slots = {}
+        self.memberlist = {}
+        self.defaults = []
+        self.methods = []
+        # module code only, the nested functions called by CALL_FUNC
+        self.functions = []
+
+    def __str__(self) -> str:
+        return f"code({self.kind} {self.name})"
+
+    def disassemble(self, indent=""):
+        lines = [f"{indent}{self}: params={self.nparams} locals={self.nlocals}"]
+        code = self.code
+        ip = 0
+        while ip < len(code):
+            op = code[ip]
+            width = 0 if op in noarg_ops else 2 if op in wide_ops else 1
+            args = code[ip + 1 : ip + 1 + width]
+            lines.append(
+                f"{indent}  {ip:4} {opnames[op]:<14} {' '.join(map(str, args))}"
+            )
+            ip += 1 + len(args)
+        for const in self.consts + self.methods + self.functions:
+            if type(const) == Code:
+                lines.append(const.disassemble(indent + "  "))
+        return "\n".join(lines)
+
+
+class Scope:
+    def __init__(self, code: Code, parent=None):
+        self.code = code
+        self.parent = parent
+        self.constIndex = {}
+
+
+class Compiler(vis.NodeVisitor):
+    # compiles the (optimized) ast into Code objects
+    # visit() emits code leaving the node value on the stack,
+    # statement() emits code leaving the stack unchanged
+    def __init__(self):
+        self.scope = None
+        self.functions = {}
+
+    def compile(self, node: ast.AstProgram) -> Code:
+        if node.nslots is None:
+            resolver.resolve(node)
+        code = self.module = Code("<module>", "module", 0, node.varnames)
+        self.enter(code)
+        self.statement(node.body)
+        self.emit(CONST, self.const(None))
+        self.emit(RET)
+        self.leave()
+        return code
+
+    def enter(self, code):
+        self.scope = Scope(code, self.scope)
+
+    def leave(self):
+        self.scope = self.scope.parent
+
+    @property
+    def inClass(self):
+        return self.scope.code.kind == "class"
+
+    def emit(self, op, *args):
+        code = self.scope.code.code
+        code.append(op)
+        code.extend(args)
+        return len(code) - 1
+
+    def label(self):
+        return len(self.scope.code.code)
+
+    def patch(self, at, target):
+        self.scope.code.code[at] = target
+
+    def const(self, value):
+        consts = self.scope.code.consts
+        if type(value) in (tc.TypeInt, tc.TypeFloat, tc.TypeString):
+            # the typeclasses are not hashable, key on the plain value
+            key = (type(value), type(value).__bases__[0](value))
+            index = self.scope.constIndex.get(key)
+            if index is None:
+                index = self.scope.constIndex[key] = len(consts)
+                consts.append(value)
+            return index
+        consts.append(value)
+        return len(consts) - 1
+
+    def name(self, name):
+        names = self.scope.code.names
+        if name in names:
+            return names.index(name)
+        names.append(name)
+        return len(names) - 1
+
+    def generic_visit(self, node):
+        raise SyntaxError(f"Cannot compile node '{type(node).__name__}'")
+
+    # statements
+
+    def statement(self, node):
+        kind = type(node)
+        if kind == ast.AstStatList:
+            for stat in node.body:
+                self.statement(stat)
+        elif kind == ast.AstNode:
+            # empty compound statement
+            pass
+        elif kind == ast.AstIf:
+            self.visit(node.condition)
+            jumpElse = self.emit(JUMP_IF_FALSE, 0)
+            self.statement(node.then)
+            if node.else_:
+                jumpEnd = self.emit(JUMP, 0)
+                self.patch(jumpElse, self.label())
+                self.statement(node.else_)
+                self.patch(jumpEnd, self.label())
+            else:
+                self.patch(jumpElse, self.label())
+        elif kind == ast.AstWhile:
+            start = self.label()
+            self.visit(node.condition)
+            jumpEnd = self.emit(JUMP_IF_FALSE, 0)
+            self.statement(node.body)
+            self.emit(JUMP, start)
+            self.patch(jumpEnd, self.label())
+        elif kind == ast.AstRet:
+            if self.scope.code.kind != "func":
+                self.emit(RET_OUTSIDE)
+            else:
+                if node.expr:
+                    self.visit(node.expr)
+                else:
+                    self.emit(CONST, self.const(None))
+                self.emit(RET)
+        elif kind == ast.AstVarDecl:
+            self.varDecl(node)
+        elif kind == ast.AstAssign:
+            self.assign(node, False)
+        elif kind == ast.AstFuncDecl:
+            if node.nested:
+                # bound when the program is compiled
+                self.nestedFunction(node)
+            else:
+                self.emit(DEF_FUNC, self.const(self.function(node)))
+        elif kind == ast.AstClassDecl:
+            self.emit(DEF_CLASS, self.const(self.classBody(node)))
+        else:
+            self.visit(node)
+            self.emit(POP)
+
+    def varDecl(self, node: ast.AstVarDecl):
+        self.visit(node.expr)
+        explicit = node.varType and not node.autoType
+        if self.inClass:
+            # class body declarations are members of 'this'
+            if explicit:
+                self.emit(CONVERT, self.const(node.varType))
+            self.emit(LOAD, 0)
+            self.emit(SET_SLOT, node.slot)
+        elif explicit:
+            self.emit(DECL_TYPED, node.slot, self.const(node.varType))
+        else:
+            self.emit(STORE, node.slot)
+
+    def assign(self, node: ast.AstAssign, keep):
+        self.visit(node.expr)
+        if keep:
+            self.emit(DUP)
+        lvalue = node.lvalue
+        if type(lvalue) == ast.AstField:
+            if self.inClass:
+                self.emit(LOAD, 0)
+                self.emit(SET_SLOT, lvalue.slot)
+            else:
+                self.emit(ASSIGN, lvalue.slot)
+        elif type(lvalue) == ast.AstIndex:
+            self.visit(lvalue.point)
+            self.visit(lvalue.index)
+            self.emit(STORE_INDEX)
+        elif type(lvalue) == ast.AstMbrSel:
+            assert type(lvalue.member) == ast.AstField
+            self.visit(lvalue.object)
+            self.emit(SET_MEMBER, self.name(lvalue.member.name))
+        else:
+            raise SyntaxError(f"Unsupport lvalue type {type(lvalue)}")
+
+    def nestedFunction(self, node: ast.AstFuncDecl):
+        # the index is taken before compiling so recursive calls can use it
+        index = self.functions.get(node)
+        if index is None:
+            functions = self.module.functions
+            index = self.functions[node] = len(functions)
+            functions.append(None)
+            functions[index] = self.function(node)
+        return index
+
+    def function(self, node: ast.AstFuncDecl):
+        params = node.params or []
+        code = Code(node.name, "func", len(params), node.varnames)
+        self.enter(code)
+        self.statement(node.body)
+        self.emit(CONST, self.const(None))
+        self.emit(RET)
+        self.leave()
+        return code
+
+    def classBody(self, node: ast.AstClassDecl):
+        code = Code(node.name, "class")
+        code.slots = dict(node.slots)
+        code.memberlist = dict(node.memberlist)
+        code.defaults = list(node.defaults)
+        code.methods = [self.function(method) for method in node.methods]
+        if not node.init:
+            # nothing to run when an instance is created
+            return code
+        self.enter(code)
+        for stat in node.init:
+            self.statement(stat)
+        # instantiation returns the new object
+        self.emit(LOAD, 0)
+        self.emit(RET)
+        self.leave()
+        return code
+
+    # expressions
+
+    def visit_AstConst(self, node: ast.AstConst):
+        self.emit(CONST, self.const(node.value))
+
+    def visit_AstField(self, node: ast.AstField):
+        if self.inClass:
+            self.emit(LOAD, 0)
+            self.emit(GET_SLOT, node.slot)
+        else:
+            self.emit(LOAD, node.slot)
+
+    def visit_AstAssign(self, node: ast.AstAssign):
+        self.assign(node, True)
+
+    def visit_AstIndex(self, node: ast.AstIndex):
+        self.visit(node.point)
+        self.visit(node.index)
+        self.emit(LOAD_INDEX)
+
+    def visit_AstUnaryOper(self, node: ast.AstUnaryOper):
+        self.visit(node.expr)
+        if node.operator == "+":
+            return
+        if node.operator not in unary_opers:
+            raise SyntaxError(f"Unknown operator {node.operator}")
+        key = (node.operator, node.expr.valueType)
+        if key in typed_unary:
+            self.emit(UNARY_TYPED, typed_unary.index(key))
+        else:
+            self.emit(UNARY, unary_opers.index(node.operator))
+
+    def visit_AstBinaryOper(self, node: ast.AstBinaryOper):
+        self.visit(node.left)
+        self.visit(node.right)
+        if node.operator not in binary_opers:
+            raise Exception(f"Unknown operator {node.operator}")
+        key = (node.operator, node.left.valueType, node.right.valueType)
+        if key in typed_binary:
+            self.emit(BINARY_TYPED, typed_binary.index(key))
+        else:
+            self.emit(BINARY, binary_opers.index(node.operator))
+
+    def visit_AstFuncCall(self, node: ast.AstFuncCall):
+        if self.inClass:
+            # calls made by a class body are bound to the new instance
+            self.emit(LOAD, 0)
+        for param in node.params:
+            self.visit(param)
+        if node.func is not None:
+            op = CALL_FUNC_BOUND if self.inClass else CALL_FUNC
+            self.emit(op, self.nestedFunction(node.func), len(node.params))
+            return
+        # a class body looks the name up like any call, not in its methods
+        op = CALL_BOUND if self.inClass else CALL
+        self.emit(op, self.name(node.name), len(node.params))
+
+    def visit_AstMbrSel(self, node: ast.AstMbrSel):
+        self.visit(node.object)
+        member = node.member
+        if type(member) == ast.AstFuncCall:
+            for param in member.params:
+                self.visit(param)
+            self.emit(CALL_METHOD, self.name(member.name), len(member.params))
+        else:
+            self.emit(GET_MEMBER, self.name(member.name))
+
+
+def compile(node: ast.AstProgram) -> Code:
+    return Compiler().compile(node)
+
+
+# on-disk format: MAGIC, 16 bytes of the source hash, then the marshalled code
+# typeclass constants are tagged so they come back with the same type
+
+
+def encode_const(const):
+    if type(const) == Code:
+        return ("code", encode(const))
+    elif type(const) == tc.TypeBool:
+        return ("bool", const.value)
+    elif isinstance(const, (tc.TypeInt, tc.TypeFloat, tc.TypeString)):
+        return (type(const).__name__, type(const).__bases__[0](const))
+    elif const is tc.UNBOUND:
+        return ("unbound", None)
+    return ("py", const)
+
+
+def decode_const(tag, value):
+    if tag == "code":
+        return decode(value)
+    elif tag == "bool":
+        return tc.TypeBool(value)
+    elif tag == "unbound":
+        return tc.UNBOUND
+    elif tag == "py":
+        return value
+    return getattr(tc, tag)(value)
+
+
+def encode(code: Code):
+    return (
+        code.name,
+        code.kind,
+        code.nparams,
+        tuple(code.code),
+        tuple(encode_const(const) for const in code.consts),
+        tuple(code.names),
+        tuple(code.varnames),
+        tuple(code.slots.items()),
+        tuple(code.memberlist.items()),
+        tuple(encode_const(value) for value in code.defaults),
+        tuple(encode(method) for method in code.methods),
+        tuple(encode(function) for function in code.functions),
+    )
+
+
+def decode(data) -> Code:
+    name, kind, nparams, instructions, consts, names, varnames = data[:7]
+    slots, members, defaults, methods, functions = data[7:]
+    code = Code(name, kind, nparams, varnames)
+    code.code = list(instructions)
+    code.consts = [decode_const(tag, value) for tag, value in consts]
+    code.names = list(names)
+    code.slots = dict(slots)
+    code.memberlist = dict(members)
+    code.defaults = [decode_const(tag, value) for tag, value in defaults]
+    code.methods = [decode(method) for method in methods]
+    code.functions = [decode(function) for function in functions]
+    return code
+
+
+def source_hash(source: str, options: str = "", cacheDir=None) -> bytes:
+    # options are the compile options that change the code, e.g. the optimizer
+    # passes; a changed compiler does not read the code of the old one either,
+    # cacheDir keeps the stamp of its version (see lang/cache.py)
+    digest = hashlib.sha256(astcache.interpreter_version(cacheDir))
+    digest.update(source.encode() + b"\0" + options.encode())
+    return digest.digest()[:16]
+
+
+def dumps(code: Code, source: str, options: str = "", cacheDir=None) -> bytes:
+    return MAGIC + source_hash(source, options, cacheDir) + marshal.dumps(encode(code))
+
+
+def loads(data: bytes, source: str, options: str = "", cacheDir=None):
+    # returns None when the data is stale or was written by another version
+    header = MAGIC + source_hash(source, options, cacheDir)
+    if not data.startswith(header):
+        return None
+    return decode(marshal.loads(data[len(header) :]))
+
+
+def cache_path(path: str) -> str:
+    directory, filename = os.path.split(os.path.abspath(path))
+    return os.path.join(directory, "__blangcache__", filename + "c")
+
+
+def load_cache(path: str, source: str, options: str = "", cacheDir=None):
+    try:
+        with open(cache_path(path), "rb") as f:
+            return loads(f.read(), source, options, cacheDir)
+    except (OSError, ValueError, EOFError, TypeError):
+        return None
+
+
+def save_cache(path: str, source: str, code: Code, options: str = "", cacheDir=None):
+    cache = cache_path(path)
+    try:
+        os.makedirs(os.path.dirname(cache), exist_ok=True)
+        with open(cache + ".tmp", "wb") as f:
+            f.write(dumps(code, source, options, cacheDir))
+        os.replace(cache + ".tmp", cache)
+    except OSError:
+        # read-only location, run without a cache
+        pass
+
+
+def clear_cache(path: str) -> bool:
+    # True when the cached bytecode of path was removed
+    try:
+        os.remove(cache_path(path))
+        return True
+    except OSError:
+        return False
@@ -0,0 +1,158 @@
+import hashlib
+import os
+import pickle
+import sys
+import threading
+
+# bump when the cached tree format changes
+VERSION = 1
+SUFFIX = ".ast"
+
+
+def default_dir():
+    base = os.environ.get("XDG_CACHE_HOME") or os.path.join(
+        os.path.expanduser("~"), ".cache"
+    )
+    return os.environ.get("BLANG_CACHE_DIR") or os.path.join(base, "blang")
+
+
+def sources():
+    # (name, mtime, size) of the sources of the front end and the engines
+    directory = os.path.dirname(os.path.abspath(__file__))
+    stats = []
+    for name in sorted(os.listdir(directory)):
+        if name.endswith(".py"):
+            stat = os.stat(os.path.join(directory, name))
+            stats.append((name, stat.st_mtime_ns, stat.st_size))
+    return directory, stats
+
+
+def compute_version(directory, stats) -> bytes:
+    digest = hashlib.sha256(f"{VERSION} {sys.version}".encode())
+    for name, _, _ in stats:
+        with open(os.path.join(directory, name), "rb") as f:
+            digest.update(name.encode() + b"\0" + f.read())
+    return digest.digest()
+
+
+def load_version(cacheDir) -> bytes:
+    # the hash of the sources is kept in cacheDir with their mtimes and
+    # sizes, it is computed again only when one of them changes
+    directory, stats = sources()
+    key = hashlib.sha256(f"{VERSION} {sys.version} {stats}".encode()).hexdigest()
+    stamp = os.path.join(cacheDir, "version")
+    try:
+        with open(stamp) as f:
+            saved, version = f.read().split()
+        if saved == key:
+            return bytes.fromhex(version)
+    except (OSError, ValueError):
+        pass
+    version = compute_version(directory, stats)
+    try:
+        os.makedirs(cacheDir, exist_ok=True)
+        temporary = f"{stamp}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(temporary, "w") as f:
+            f.write(f"{key} {version.hex()}\n")
+        os.replace(temporary, stamp)
+    except OSError:
+        pass
+    return version
+
+
+# the sources of the front end and the engines, a changed interpreter (or
+# another python) never reads the trees of the old one; loaded on the first
+# use, an import alone neither hashes nor writes anything
+_version = None
+
+
+def interpreter_version(cacheDir=None) -> bytes:
+    global _version
+    if _version is None:
+        _version = load_version(cacheDir or default_dir())
+    return _version
+
+
+class AstCache:
+    # the resolved and type annotated trees of the programs, one file per
+    # source hash + options + interpreter version in a shared directory;
+    # a hit touches the file, when the directory holds more than maxEntries
+    # files or maxBytes the least recently used ones are removed
+    maxEntries = 512
+    maxBytes = 64 << 20
+
+    def __init__(self, directory=None, maxEntries=maxEntries, maxBytes=maxBytes):
+        self.directory = directory or default_dir()
+        self.maxEntries = maxEntries
+        self.maxBytes = maxBytes
+
+    def path(self, source: str, options: str = "") -> str:
+        digest = hashlib.sha256(interpreter_version(self.directory))
+        digest.update(source.encode() + b"\0" + options.encode())
+        return os.path.join(self.directory, digest.hexdigest()[:32] + SUFFIX)
+
+    def load(self, source: str, options: str = ""):
+        # None when the tree is not cached or can not be read
+        path = self.path(source, options)
+        try:
+            with open(path, "rb") as f:
+                tree = pickle.load(f)
+            os.utime(path)
+            return tree
+        except Exception:
+            return None
+
+    def save(self, source: str, tree, options: str = ""):
+        path = self.path(source, options)
+        try:
+            data = pickle.dumps(tree, pickle.HIGHEST_PROTOCOL)
+            os.makedirs(self.directory, exist_ok=True)
+            # a temporary of its own per process and thread, lang.frontend
+            # may save the same tree from several of them at once
+            temporary = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(temporary, "wb") as f:
+                f.write(data)
+            os.replace(temporary, path)
+            self.evict()
+        except (OSError, RecursionError, pickle.PicklingError):
+            # read-only location or a tree too deep to pickle, run without a cache
+            pass
+
+    def entries(self):
+        # (mtime, size, path) of the cached trees, oldest first
+        entries = []
+        for name in os.listdir(self.directory):
+            if name.endswith(SUFFIX):
+                path = os.path.join(self.directory, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+        return sorted(entries)
+
+    def evict(self):
+        entries = self.entries()
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in entries:
+            if len(entries) <= self.maxEntries and total <= self.maxBytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            entries = entries[1:]
+            total -= size
+
+    def clear(self):
+        # returns the number of removed trees
+        try:
+            entries = self.entries()
+        except OSError:
+            return 0
+        for _, _, path in entries:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+        return len(entries)
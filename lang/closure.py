@@ -0,0 +1,484 @@
+import lang.visitor as vis
+import lang.astnode as ast
+import lang.typeclass as tc
+import lang.exec as exec
+import lang.resolver as resolver
+
+UNBOUND = tc.UNBOUND
+
+# returned by a compiled statement when a 'ret' was executed
+RET = object()
+
+
+class Frame:
+    # varlist is indexed by the slots the resolver assigned
+    __slots__ = ("varlist", "this", "retVal")
+
+    def __init__(self, varlist, this=None):
+        self.varlist = varlist
+        self.this = this
+        self.retVal = None
+
+
+def builtin(func):
+    def call(f, args, this):
+        return func(*[arg(f) for arg in args])
+
+    return call
+
+
+def unboxed_builtin(func):
+    def call(f, args, this):
+        return tc.unbox(func(*[arg(f) for arg in args]))
+
+    return call
+
+
+class ClosureCompiler(vis.NodeVisitor):
+    # turns the (optimized) ast into a tree of python closures
+    # every closure takes the current Frame and returns the node value
+    # in unboxed mode numbers and booleans are plain python values, the
+    # blang types only come back at print and in explicit declarations
+    funclist = {}
+    classlist = {}
+
+    def __init__(self, unboxed=False, memo=None):
+        wrap = unboxed_builtin if unboxed else builtin
+        self.funclist = {name: wrap(func) for name, func in exec.build_in_func.items()}
+        self.classlist = {}
+        self.unboxed = unboxed
+        # result caches of the pure functions (lang.memo), None when off
+        self.memo = memo
+        # compiled nested functions, a cell per AstFuncDecl so that calls
+        # can be compiled before (or inside) the function they call
+        self.nested = {}
+        self.inFunction = False
+        self.inClass = False
+
+    def generic_visit(self, node):
+        raise SyntaxError(f"Cannot compile node '{type(node).__name__}'")
+
+    def visit_AstNode(self, node: ast.AstNode):
+        # empty compound statement
+        def nop(f):
+            return None
+
+        return nop
+
+    def visit_AstProgram(self, node: ast.AstProgram):
+        if node.nslots is None:
+            resolver.resolve(node)
+        return self.visit(node.body)
+
+    def visit_AstStatList(self, node: ast.AstStatList):
+        stats = tuple(self.visit(stat) for stat in node.body)
+
+        def statList(f):
+            for stat in stats:
+                if stat(f) is RET:
+                    return RET
+
+        return statList
+
+    def visit_AstIf(self, node: ast.AstIf):
+        cond = self.visit(node.condition)
+        then = self.visit(node.then)
+        if node.else_:
+            else_ = self.visit(node.else_)
+
+            def ifElse(f):
+                if cond(f):
+                    return then(f)
+                return else_(f)
+
+            return ifElse
+
+        def if_(f):
+            if cond(f):
+                return then(f)
+
+        return if_
+
+    def visit_AstWhile(self, node: ast.AstWhile):
+        cond = self.visit(node.condition)
+        body = self.visit(node.body)
+
+        def while_(f):
+            while cond(f):
+                if body(f) is RET:
+                    return RET
+
+        return while_
+
+    def visit_AstRet(self, node: ast.AstRet):
+        if not self.inFunction:
+
+            def retOutside(f):
+                raise Exception("Return statement not in function")
+
+            return retOutside
+        if node.expr:
+            expr = self.visit(node.expr)
+
+            def ret(f):
+                f.retVal = expr(f)
+                return RET
+
+            return ret
+
+        def retNone(f):
+            f.retVal = None
+            return RET
+
+        return retNone
+
+    def visit_AstVarDecl(self, node: ast.AstVarDecl):
+        name = node.varname
+        slot = node.slot
+        expr = self.visit(node.expr)
+        if node.varType and not node.autoType:
+            # explicit type
+            varType = node.varType
+            typeclass = convert = getattr(tc, "Type" + varType.capitalize(), None)
+            if self.unboxed:
+                typeclass, convert = tc.unboxed_types.get(varType, (None, None))
+            what = "Member" if self.inClass and not self.inFunction else "Variable"
+
+            def varDecl(f):
+                if not typeclass:
+                    raise SyntaxError(f"Unknown type '{varType}'")
+                varlist = f.varlist
+                old = varlist[slot]
+                if old is not UNBOUND and old and type(old) != typeclass:
+                    raise SyntaxError(f"{what} '{name}' already exists")
+                var = varlist[slot] = convert(expr(f))
+                return var
+
+            return varDecl
+
+        def autoDecl(f):
+            var = f.varlist[slot] = expr(f)
+            if node.varType is None:
+                # record the type for the executed tree dump
+                node.varType = type(var).__name__.lower().replace("type", "")
+            return var
+
+        return autoDecl
+
+    def visit_AstAssign(self, node: ast.AstAssign):
+        expr = self.visit(node.expr)
+        lvalue = node.lvalue
+        if type(lvalue) == ast.AstField:
+            name = lvalue.name
+            slot = lvalue.slot
+
+            def assignField(f):
+                rvalue = expr(f)
+                varlist = f.varlist
+                old = varlist[slot]
+                if old is None or old is UNBOUND:
+                    raise SyntaxError(f"Variable '{name}' not found")
+                varlist[slot] = rvalue
+                return rvalue
+
+            return assignField
+        elif type(lvalue) == ast.AstIndex:
+            point = self.visit(lvalue.point)
+            index = self.visit(lvalue.index)
+
+            def assignIndex(f):
+                rvalue = expr(f)
+                point(f)[index(f)] = rvalue
+                return rvalue
+
+            return assignIndex
+        elif type(lvalue) == ast.AstMbrSel:
+            obj = self.visit(lvalue.object)
+            assert type(lvalue.member) == ast.AstField
+            memberName = lvalue.member.name
+            cachedLayout = cachedSlot = None
+
+            def assignMember(f):
+                nonlocal cachedLayout, cachedSlot
+                rvalue = expr(f)
+                this = obj(f)
+                if this.layout is not cachedLayout:
+                    cachedSlot = this.member(memberName)
+                    cachedLayout = this.layout
+                this.varlist[cachedSlot] = rvalue
+                return rvalue
+
+            return assignMember
+        else:
+            raise SyntaxError(f"Unsupport lvalue type {type(lvalue)}")
+
+    def visit_AstUnaryOper(self, node: ast.AstUnaryOper):
+        expr = self.visit(node.expr)
+        if node.operator == "+":
+            return expr
+        oper = tc.unary_oper.get(node.operator)
+        if not oper:
+            raise SyntaxError(f"Unknown operator {node.operator}")
+        if not self.unboxed and node.expr.valueType is not None:
+            oper = tc.specialize_unary(node.operator, node.expr.valueType)
+
+        def unary(f):
+            return oper(expr(f))
+
+        return unary
+
+    def visit_AstBinaryOper(self, node: ast.AstBinaryOper):
+        left = self.visit(node.left)
+        right = self.visit(node.right)
+        oper = tc.binary_oper.get(node.operator)
+        if not oper:
+            raise Exception(f"Unknown operator {node.operator}")
+        if self.unboxed:
+            oper = tc.specialize_unboxed(
+                node.operator, self.staticType(node.left), self.staticType(node.right)
+            )
+        elif node.left.valueType is not None and node.right.valueType is not None:
+            # operand types from lang.infer
+            oper = tc.specialize_binary(
+                node.operator, node.left.valueType, node.right.valueType
+            )
+        if type(node.right) == ast.AstConst:
+            value = self.constValue(node.right)
+
+            def binaryConst(f):
+                return oper(left(f), value)
+
+            return binaryConst
+
+        def binary(f):
+            return oper(left(f), right(f))
+
+        return binary
+
+    def constValue(self, node: ast.AstConst):
+        return tc.unbox(node.value) if self.unboxed else node.value
+
+    def staticType(self, node):
+        # type of an unboxed expression when it is known at compile time
+        kind = type(node)
+        if kind == ast.AstConst:
+            return type(self.constValue(node))
+        elif kind == ast.AstBinaryOper:
+            left = self.staticType(node.left)
+            right = self.staticType(node.right)
+            return tc.unboxed_result_type(node.operator, left, right)
+        elif kind == ast.AstUnaryOper:
+            if node.operator == "!":
+                return bool
+            return self.staticType(node.expr)
+        # the unboxed type of the type lang.infer found
+        return tc.unboxed_static.get(node.valueType)
+
+    def visit_AstConst(self, node: ast.AstConst):
+        value = self.constValue(node)
+
+        def const(f):
+            return value
+
+        return const
+
+    def visit_AstField(self, node: ast.AstField):
+        name = node.name
+        slot = node.slot
+
+        def field(f):
+            value = f.varlist[slot]
+            if value is UNBOUND:
+                raise SyntaxError(f"Variable '{name}' not found")
+            return value
+
+        return field
+
+    def visit_AstIndex(self, node: ast.AstIndex):
+        point = self.visit(node.point)
+        index = self.visit(node.index)
+
+        def index_(f):
+            return point(f)[index(f)]
+
+        return index_
+
+    def visit_AstFuncDecl(self, node: ast.AstFuncDecl):
+        if node.nested:
+            self.nestedFunction(node)
+            return self.visit_AstNode(node)
+        name = node.name
+        call = self.function(node)
+        funclist = self.funclist
+
+        def funcDecl(f):
+            funclist[name] = call
+
+        return funcDecl
+
+    def nestedFunction(self, node: ast.AstFuncDecl):
+        cell = self.nested.get(node)
+        if cell is None:
+            cell = self.nested[node] = [None]
+            cell[0] = self.function(node)
+        return cell
+
+    def function(self, node: ast.AstFuncDecl):
+        name = node.name
+        nparams = len(node.params or ())
+        padding = [UNBOUND] * (node.nslots - 1 - nparams)
+        inFunction, inClass = self.inFunction, self.inClass
+        self.inFunction, self.inClass = True, False
+        body = self.visit(node.body)
+        self.inFunction, self.inClass = inFunction, inClass
+        memo = self.memo
+        if memo is not None and node.pure:
+
+            def memoCall(f, args, this):
+                if len(args) < nparams:
+                    raise SyntaxError(f"Function '{name}' expects {nparams} arguments")
+                values = [args[i](f) for i in range(nparams)]
+
+                def compute():
+                    frame = Frame(
+                        [UNBOUND if this is None else this] + values + padding
+                    )
+                    body(frame)
+                    return frame.retVal
+
+                return memo.call(node, values, compute)
+
+            return memoCall
+
+        def call(f, args, this):
+            if len(args) < nparams:
+                raise SyntaxError(f"Function '{name}' expects {nparams} arguments")
+            # slot 0 is 'this' followed by the parameters
+            varlist = [UNBOUND if this is None else this]
+            for i in range(nparams):
+                varlist.append(args[i](f))
+            frame = Frame(varlist + padding)
+            body(frame)
+            return frame.retVal
+
+        return call
+
+    def visit_AstClassDecl(self, node: ast.AstClassDecl):
+        name = node.name
+        defaults = node.defaults
+        if self.unboxed:
+            defaults = [tc.unbox(value) for value in defaults]
+        methods = {method.name: self.function(method) for method in node.methods}
+        layout = tc.ClassLayout(name, node.slots, node.memberlist, defaults, methods)
+        inFunction, inClass = self.inFunction, self.inClass
+        self.inFunction, self.inClass = False, True
+        init = tuple(self.visit(stat) for stat in node.init)
+        self.inFunction, self.inClass = inFunction, inClass
+
+        def new(f, args, this):
+            obj = tc.TypeObject(layout)
+            if init:
+                frame = Frame(obj.varlist, obj)
+                for stat in init:
+                    stat(frame)
+            return obj
+
+        funclist = self.funclist
+        classlist = self.classlist
+
+        def classDecl(f):
+            # methods stay callable by name from the method bodies
+            funclist.update(methods)
+            classlist[name] = new
+
+        return classDecl
+
+    def visit_AstFuncCall(self, node: ast.AstFuncCall):
+        calleeName = node.name
+        args = tuple(self.visit(param) for param in node.params)
+        funclist = self.funclist
+        classlist = self.classlist
+        inClass = self.inClass and not self.inFunction
+        if node.func is not None:
+            cell = self.nestedFunction(node.func)
+
+            def nestedCall(f):
+                return cell[0](f, args, f.this if inClass else None)
+
+            return nestedCall
+
+        def funcCall(f):
+            callee = funclist.get(calleeName) or classlist.get(calleeName)
+            if callee is None:
+                raise SyntaxError(f"Function '{calleeName}' not found")
+            # calls made by a class body are bound to the new instance
+            return callee(f, args, f.this if inClass else None)
+
+        return funcCall
+
+    def visit_AstMbrSel(self, node: ast.AstMbrSel):
+        obj = self.visit(node.object)
+        member = node.member
+        if type(member) == ast.AstFuncCall:
+            calleeName = member.name
+            args = tuple(self.visit(param) for param in member.params)
+            funclist = self.funclist
+            # inline cache of the method found in the last class layout seen
+            cachedLayout = cachedMethod = None
+
+            def methodCall(f):
+                nonlocal cachedLayout, cachedMethod
+                this = obj(f)
+                if type(this) != tc.TypeObject:
+                    raise SyntaxError(f"'{calleeName}' called on a non class value")
+                if this.layout is cachedLayout:
+                    return cachedMethod(f, args, this)
+                method = this.layout.methods.get(calleeName)
+                if method is not None:
+                    cachedLayout, cachedMethod = this.layout, method
+                else:
+                    method = funclist.get(calleeName)
+                if method is None:
+                    raise SyntaxError(
+                        f"Function '{calleeName}' not found in class '{this.name}'"
+                    )
+                return method(f, args, this)
+
+            return methodCall
+        memberName = member.name
+        cachedLayout = cachedSlot = None
+
+        def member_(f):
+            nonlocal cachedLayout, cachedSlot
+            this = obj(f)
+            if this.layout is not cachedLayout:
+                cachedSlot = this.member(memberName)
+                cachedLayout = this.layout
+            value = this.varlist[cachedSlot]
+            if value is UNBOUND:
+                raise SyntaxError(f"Member '{memberName}' not found")
+            return value
+
+        return member_
+
+
+class ClosureEngine:
+    def __init__(self, unboxed=False, memo=None):
+        self.compiler = ClosureCompiler(unboxed, memo)
+        # program frame of a streamed program
+        self.frame = None
+
+    def compile(self, node: ast.AstProgram):
+        return self.compiler.visit(node)
+
+    def run(self, node: ast.AstProgram):
+        program = self.compile(node)
+        program(Frame([UNBOUND] * node.nslots))
+
+    def statement(self, node, nslots):
+        # compiles and runs a top-level statement of a streamed program (lang.stream)
+        if self.frame is None:
+            self.frame = Frame([])
+        varlist = self.frame.varlist
+        varlist.extend([UNBOUND] * (nslots - len(varlist)))
+        self.compiler.visit(node)(self.frame)
@@ -0,0 +1,272 @@
+import gc
+import lang.astnode as ast
+import lang.scanner as scanner
+
+# recursive descent parser of the grammar in lang/syntax.py, the trees are
+# the same as the ones of the ply parser (the precedence table and the way
+# the conflicts of the LALR tables are resolved are built in):
+#   - the binary operators are left associative, ASSIGN binds the weakest,
+#     then OPERLV3, OPERLV2, OPERLV1, OPERLV0; they are parsed by
+#     precedence climbing
+#   - UNARY and a leading OPERLV1 bind tighter than any binary operator
+#   - a name followed by a constant or a name is a call with one argument
+#     ('f g 1' is f(g(1)), 'f x - 1' is f(x) - 1)
+#   - else belongs to the nearest if
+# it reads the (type, value, lineno, lexpos) tokens of lang.scanner.scan as
+# they are lexed, no tables are built
+
+# binding power of the binary operators
+binary = {
+    "ASSIGN": 1,
+    "OPERLV3": 2,
+    "OPERLV2": 3,
+    "OPERLV1": 4,
+    "OPERLV0": 5,
+}
+
+
+# the token after the last one
+EOF = ("$end", None, None, None)
+
+
+class Parser:
+    def __init__(self, tokens):
+        self.next = iter(tokens).__next__
+        # the current token and the type of the next one
+        self.token = None
+        self.kind = None
+        self.value = None
+        self.lineno = None
+        self.following = ("$start", None, None, None)
+        self.nextKind = None
+        # the constant nodes are shared
+        self.constants = ast.Constants()
+        self.advance()
+        self.advance()
+
+    def advance(self):
+        token = self.token = self.following
+        self.kind, self.value, self.lineno, _ = token
+        try:
+            following = self.following = self.next()
+        except StopIteration:
+            following = self.following = EOF
+        self.nextKind = following[0]
+
+    def take(self, kind):
+        if self.kind != kind:
+            self.error()
+        value = self.value
+        self.advance()
+        return value
+
+    def error(self):
+        if self.kind == "$end":
+            raise Exception("Syntax error at the end of the input")
+        print(scanner.Token(*self.token))
+        raise Exception(f"Syntax error at line {self.lineno}")
+
+    def program(self):
+        # the tree only grows while parsing, the collections of the cycle
+        # collector would walk it again and again
+        enabled = gc.isenabled()
+        gc.disable()
+        try:
+            return ast.AstProgram(self.statList("$end"))
+        finally:
+            if enabled:
+                gc.enable()
+
+    def statements(self):
+        # the top-level statements one at a time, each one is parsed when
+        # the previous one has been taken (lang.stream)
+        while self.kind != "$end":
+            if self.kind == "END":
+                self.advance()
+            else:
+                yield self.stat()
+
+    def statList(self, stop):
+        body = None
+        while self.kind != stop:
+            if self.kind == "END":
+                self.advance()
+                if body is None:
+                    body = ast.AstStatList()
+            elif body is None:
+                # a single statement is not wrapped in a list
+                body = self.stat()
+            else:
+                body = ast.AstStatList(body, self.stat())
+        if body is None:
+            self.error()
+        return body
+
+    def stat(self):
+        kind = self.kind
+        if kind == "LCURLY":
+            return self.compound()
+        line = self.lineno
+        if kind == "IF":
+            self.advance()
+            self.take("LPAREN")
+            condition = self.expr()
+            self.take("RPAREN")
+            then = self.stat()
+            if self.kind == "ELSE":
+                self.advance()
+                node = ast.AstIf(condition, then, self.stat())
+            else:
+                node = ast.AstIf(condition, then)
+        elif kind == "WHILE":
+            self.advance()
+            self.take("LPAREN")
+            condition = self.expr()
+            self.take("RPAREN")
+            node = ast.AstWhile(condition, self.stat())
+        elif kind == "DEF":
+            node = self.funcDecl()
+        elif kind == "CLASS":
+            self.advance()
+            name = self.take("FIELD")
+            node = ast.AstClassDecl(name, self.compound())
+        elif kind == "RET":
+            self.advance()
+            if self.kind == "END":
+                self.advance()
+                node = ast.AstRet()
+            else:
+                node = ast.AstRet(self.statExpr())
+        else:
+            node = self.statExpr()
+            if type(node) == ast.AstConst:
+                # shared with the other uses of the constant
+                return node
+        node.lineno = line
+        return node
+
+    def compound(self):
+        self.take("LCURLY")
+        if self.kind == "RCURLY":
+            self.advance()
+            return ast.AstNode()
+        body = self.statList("RCURLY")
+        self.advance()
+        return body
+
+    def funcDecl(self):
+        self.advance()
+        name = self.take("FIELD")
+        self.take("LPAREN")
+        params = []
+        if self.kind == "FIELD":
+            params.append(ast.AstField(self.value))
+            self.advance()
+            while self.kind == "COMMA":
+                self.advance()
+                params.append(ast.AstField(self.take("FIELD")))
+        self.take("RPAREN")
+        body = self.compound()
+        if params:
+            return ast.AstFuncDecl(name, body, params)
+        return ast.AstFuncDecl(name, body)
+
+    def statExpr(self):
+        if self.kind == "FIELD" and self.nextKind == "COLON":
+            name = self.value
+            self.advance()
+            self.advance()
+            if self.kind == "ASSIGN":
+                self.advance()
+                node = ast.AstVarDecl(name, self.expr())
+            else:
+                varType = self.take("FIELD")
+                self.take("ASSIGN")
+                node = ast.AstVarDecl(name, self.expr(), varType)
+        else:
+            node = self.expr()
+        self.take("END")
+        return node
+
+    def expr(self, power=1):
+        left = self.unary()
+        while True:
+            kind = self.kind
+            strength = binary.get(kind)
+            if strength is None or strength < power:
+                return left
+            oper = self.value
+            self.advance()
+            right = self.expr(strength + 1)
+            if kind == "ASSIGN":
+                left = ast.AstAssign(left, right)
+            else:
+                left = ast.AstBinaryOper(oper, left, right)
+
+    def unary(self):
+        kind = self.kind
+        if kind == "UNARY" or kind == "OPERLV1":
+            oper = self.value
+            self.advance()
+            return ast.AstUnaryOper(oper, self.unary())
+        elif kind == "LPAREN":
+            self.advance()
+            node = self.expr()
+            self.take("RPAREN")
+            return node
+        return self.single()
+
+    def single(self):
+        # a constant, a name, a call, an index or a member
+        kind = self.kind
+        if kind == "CONST":
+            node = self.constants.get(self.value)
+            self.advance()
+            return node
+        elif kind != "FIELD":
+            self.error()
+        name = self.value
+        self.advance()
+        kind = self.kind
+        if kind == "LPAREN" or kind == "CONST" or kind == "FIELD":
+            return self.call(name)
+        elif kind == "LSQUARE":
+            self.advance()
+            index = self.expr()
+            self.take("RSQUARE")
+            return ast.AstIndex(ast.AstField(name), index)
+        elif kind == "DOT":
+            self.advance()
+            member = self.take("FIELD")
+            kind = self.kind
+            if kind == "LPAREN" or kind == "CONST" or kind == "FIELD":
+                return ast.AstMbrSel(ast.AstField(name), self.call(member))
+            return ast.AstMbrSel(ast.AstField(name), ast.AstField(member))
+        return ast.AstField(name)
+
+    def call(self, name):
+        # after the name, at '(' or at the single argument
+        if self.kind != "LPAREN":
+            return ast.AstFuncCall(name, self.single())
+        self.advance()
+        node = ast.AstFuncCall(name)
+        if self.kind == "RPAREN":
+            self.advance()
+            return node
+        params = [self.expr()]
+        while self.kind == "COMMA":
+            self.advance()
+            params.append(self.expr())
+        self.take("RPAREN")
+        node.params = params
+        return node
+
+
+def parse(code):
+    # code is a str, bytes or an mmap, see lang.scanner.scan
+    return Parser(scanner.scan(code)).program()
+
+
+def parse_file(path):
+    # the file is read through an mmap, with the '\n' blang.py adds
+    return Parser(scanner.scan_file(path)).program()
@@ -0,0 +1,83 @@
+import io
+import json
+import lang.astnode as ast
+import lang.flat as flat
+
+# the -d dumps of blang.py: the json text of json.dumps(tree, indent=4)
+# written a node at a time, without the nested dicts and without recursion,
+# or the binary lang.flat encoding of the tree
+
+INDENT = "    "
+FORMATS = {"json": ".json", "binary": ".bin"}
+
+
+def scalar(value):
+    if isinstance(value, str):
+        return json.encoder.encode_basestring_ascii(value)
+    return json.dumps(value)
+
+
+def write_json(tree, out):
+    write = out.write
+    # the open objects and arrays: [(key, value) pairs, closing bracket,
+    # level, no item written yet]
+    stack = []
+    value = tree
+    level = 0
+    while True:
+        if isinstance(value, ast.AstNode):
+            write("{")
+            stack.append([iter(value.fields()), "}", level, True])
+        elif type(value) == list or type(value) == dict:
+            if not value:
+                write("[]" if type(value) == list else "{}")
+            elif type(value) == list:
+                write("[")
+                stack.append([((None, item) for item in value), "]", level, True])
+            else:
+                write("{")
+                stack.append([iter(value.items()), "}", level, True])
+        else:
+            write(scalar(value))
+        # the next value, after closing the finished objects and arrays
+        while stack:
+            frame = stack[-1]
+            item = next(frame[0], None)
+            if item is None:
+                stack.pop()
+                write("\n" + INDENT * frame[2] + frame[1])
+                continue
+            key, value = item
+            level = frame[2] + 1
+            write(("\n" if frame[3] else ",\n") + INDENT * level)
+            frame[3] = False
+            if key is not None:
+                write(scalar(key) + ": ")
+            break
+        else:
+            return
+
+
+def json_text(tree):
+    out = io.StringIO()
+    write_json(tree, out)
+    return out.getvalue()
+
+
+def save(tree, path, format="json"):
+    # path without the suffix of the format
+    path += FORMATS[format]
+    if format == "json":
+        with open(path, "w", buffering=1 << 16) as out:
+            write_json(tree, out)
+    else:
+        with open(path, "wb") as out:
+            out.write(flat.dumps(flat.encode(tree)))
+    return path
+
+
+def load(path):
+    # the tree of a binary dump, as parsed (the resolver and lang.infer run
+    # again on it)
+    with open(path, "rb") as f:
+        return flat.decode(flat.loads(f.read()))
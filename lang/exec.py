@@ -1,4 +1,5 @@
 import lang.visitor as vis
+import lang.resolver as resolver
 import lang.astnode as ast
 import lang.typeclass as tc
 import time
@@ -8,6 +9,8 @@ import os
 def print_(val):
     if type(val) == tc.TypeString:
         val = val.replace("\\n", "\n")
+    elif type(val) == bool:
+        val = tc.TypeBool(val)
     print(val, end="")
 
 
@@ -50,15 +53,127 @@ build_in_func = {
 }
 
 
+UNBOUND = tc.UNBOUND
+
+
+class CacheStats:
+    # counters of one kind of inline cache, 'static' counts the operators
+    # whose handler was picked from the inferred types and skip the cache
+    __slots__ = ("hits", "misses", "generic", "static")
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self.generic = 0
+        self.static = 0
+
+    def __str__(self) -> str:
+        total = self.hits + self.misses + self.generic + self.static
+        rate = (self.hits + self.static) / total * 100 if total else 0.0
+        return f"{self.hits:>12}{self.misses:>10}{self.generic:>10}{self.static:>10}{rate:>9.2f}%"
+
+
+class Frame:
+    # activation record of a function call or a class body,
+    # varlist is indexed by the slots the resolver assigned
+    __slots__ = ("varlist", "retVal", "retFlag", "caller", "func", "obj", "line")
+
+    def __init__(self, varlist, caller=None, func=None, obj=None):
+        self.varlist = varlist
+        self.retVal = None
+        self.retFlag = False
+        self.caller = caller
+        self.func = func
+        # the instance whose class body is executed
+        self.obj = obj
+        # the line of the running statement, kept by lang.profile.SampledInterpreter
+        self.line = None
+
+
 class Interpreter(vis.NodeVisitor):
-    varlist = {}
     funclist = {}
     classlist = {}
 
-    def __init__(self):
-        self.varlist = {}
-        self.funclist = build_in_func
+    def __init__(self, memo=None):
+        self.frame = None
+        # result caches of the pure functions (lang.memo), None when off
+        self.memo = memo
+        self.funclist = dict(build_in_func)
         self.classlist = {}
+        self.binaryStats = CacheStats()
+        self.unaryStats = CacheStats()
+        self.memberStats = CacheStats()
+        self.methodStats = CacheStats()
+
+    def cacheStats(self):
+        return {
+            "binary oper": self.binaryStats,
+            "unary oper": self.unaryStats,
+            "member": self.memberStats,
+            "method": self.methodStats,
+        }
+
+    def formatStats(self):
+        lines = [
+            f"{'inline cache':<14}{'hits':>12}{'misses':>10}{'generic':>10}{'static':>10}{'hit rate':>10}"
+        ]
+        for name, stats in self.cacheStats().items():
+            lines.append(f"{name:<14}{stats}")
+        return "\n".join(lines)
+
+    @property
+    def varlist(self):
+        return self.frame.varlist
+
+    def visit_AstProgram(self, node: ast.AstProgram):
+        if node.nslots is None:
+            resolver.resolve(node)
+        self.frame = Frame([UNBOUND] * node.nslots)
+        self.visit(node.body)
+
+    def statement(self, node, nslots):
+        # runs a top-level statement of a streamed program (lang.stream),
+        # the program frame grows with the slots the resolver handed out
+        if self.frame is None:
+            self.frame = Frame([])
+        varlist = self.frame.varlist
+        varlist.extend([UNBOUND] * (nslots - len(varlist)))
+        self.visit(node)
+
+    def call(self, funcDecl: ast.AstFuncDecl, varlist: list, obj=None):
+        frame = self.frame = Frame(varlist, self.frame, funcDecl, obj)
+        self.visit(funcDecl.body)
+        self.frame = frame.caller
+        return frame.retVal
+
+    def callFunc(self, funcCall: ast.AstFuncCall, funcDecl, this=None):
+        if type(funcDecl) != ast.AstFuncDecl:
+            # built-in function
+            if funcCall.params:
+                return funcDecl(*[self.visit(arg) for arg in funcCall.params])
+            return funcDecl()
+        # user-defined function, arguments are evaluated in the caller frame
+        # slot 0 is 'this' followed by the parameters
+        varlist = [UNBOUND] * funcDecl.nslots
+        if this is not None:
+            varlist[0] = this
+        if funcDecl.params:
+            args = funcCall.params
+            for i in range(len(funcDecl.params)):
+                varlist[i + 1] = self.visit(args[i])
+        if funcDecl.pure and self.memo is not None:
+            values = varlist[1 : len(funcDecl.params or ()) + 1]
+            return self.memo.call(
+                funcDecl, values, lambda: self.call(funcDecl, varlist)
+            )
+        return self.call(funcDecl, varlist)
+
+    def visit_AstStatList(self, node: ast.AstStatList):
+        frame = self.frame
+        for stat in node.body:
+            self.visit(stat)
+            if frame.retFlag:
+                return
 
     def visit_AstIf(self, node: ast.AstIf):
         if self.visit(node.condition):
@@ -67,33 +182,39 @@ class Interpreter(vis.NodeVisitor):
             self.visit(node.else_)
 
     def visit_AstWhile(self, node: ast.AstWhile):
+        frame = self.frame
         while self.visit(node.condition):
             self.visit(node.body)
+            if frame.retFlag:
+                return
 
     def visit_AstVarDecl(self, node: ast.AstVarDecl):
         varType = node.varType
-        if varType:
+        varlist = self.frame.varlist
+        if varType and not node.autoType:
             # explicit type
             typeclass = getattr(tc, "Type" + varType.capitalize(), None)
             if not typeclass:
                 raise SyntaxError(f"Unknown type '{varType}'")
-            if self.varlist.get(node.varname):
-                if type(self.varlist[node.varname]) != typeclass:
-                    raise SyntaxError(f"Variable '{node.varname}' already exists")
-            self.varlist[node.varname] = typeclass(self.visit(node.expr))
+            old = varlist[node.slot]
+            if old is not UNBOUND and old and type(old) != typeclass:
+                what = "Variable" if self.frame.obj is None else "Member"
+                raise SyntaxError(f"{what} '{node.varname}' already exists")
+            varlist[node.slot] = typeclass(self.visit(node.expr))
         else:
             # auto type
             var = self.visit(node.expr)
             node.varType = type(var).__name__.lower().replace("type", "")
-            self.varlist[node.varname] = var
+            varlist[node.slot] = var
 
     def visit_AstAssign(self, node: ast.AstAssign):
         rvalue = self.visit(node.expr)
         if type(node.lvalue) == ast.AstField:
-            if self.varlist.get(node.lvalue.name) is not None:
-                self.varlist[node.lvalue.name] = rvalue
-            else:
+            varlist = self.frame.varlist
+            old = varlist[node.lvalue.slot]
+            if old is None or old is UNBOUND:
                 raise SyntaxError(f"Variable '{node.lvalue.name}' not found")
+            varlist[node.lvalue.slot] = rvalue
         elif type(node.lvalue) == ast.AstIndex:
             arr = self.visit(node.lvalue.point)
             index = self.visit(node.lvalue.index)
@@ -101,56 +222,78 @@ class Interpreter(vis.NodeVisitor):
         elif type(node.lvalue) == ast.AstMbrSel:
             obj = self.visit(node.lvalue.object)
             assert type(node.lvalue.member) == ast.AstField
-            memberName = node.lvalue.member.name
-            obj.varlist[memberName] = rvalue
+            obj.varlist[self.memberSlot(node.lvalue, obj)] = rvalue
         else:
             raise SyntaxError(f"Unsupport lvalue type {type(node.lvalue)}")
         return rvalue
 
+    # the operator nodes keep an inline cache (leftType, rightType, handler):
+    # a handler specialized for the operand types seen on the first
+    # evaluation, or the generic operator once a second type pair shows up;
+    # when lang.infer knows the operand types the first evaluation sets
+    # 'handler' instead and the types are not checked again
+
     def visit_AstUnaryOper(self, node: ast.AstUnaryOper):
         expr = self.visit(node.expr)
-        if node.operator == "+":
-            return expr
-        elif node.operator == "-":
-            return -expr
-        elif node.operator == "!":
-            return not expr
-        elif node.operator == "~":
-            return ~expr
-        else:
+        handler = node.handler
+        if handler is not None:
+            self.unaryStats.static += 1
+            return handler(expr)
+        cache = node.cache
+        if cache is not None:
+            exprType, handler = cache
+            if exprType is type(expr):
+                self.unaryStats.hits += 1
+                return handler(expr)
+            if exprType is None:
+                self.unaryStats.generic += 1
+                return handler(expr)
+        self.unaryStats.misses += 1
+        if node.operator not in tc.unary_oper:
             raise SyntaxError(f"Unknown operator {node.operator}")
+        if node.expr.valueType is not None:
+            handler = node.handler = tc.specialize_unary(
+                node.operator, node.expr.valueType
+            )
+        elif cache is None:
+            handler = tc.specialize_unary(node.operator, type(expr))
+            node.cache = (type(expr), handler)
+        else:
+            handler = tc.unary_oper[node.operator]
+            node.cache = (None, handler)
+        return handler(expr)
 
     def visit_AstBinaryOper(self, node: ast.AstBinaryOper):
         left = self.visit(node.left)
         right = self.visit(node.right)
-        if node.operator == "+":
-            return left + right
-        elif node.operator == "-":
-            return left - right
-        elif node.operator == "*":
-            return left * right
-        elif node.operator == "/":
-            return left / right
-        elif node.operator == "%":
-            return left % right
-        elif node.operator == "<":
-            return left < right
-        elif node.operator == ">":
-            return left > right
-        elif node.operator == "<=":
-            return left <= right
-        elif node.operator == ">=":
-            return left >= right
-        elif node.operator == "==":
-            return left == right
-        elif node.operator == "!=":
-            return left != right
-        elif node.operator == "&&":
-            return left and right
-        elif node.operator == "||":
-            return left or right
-        else:
+        handler = node.handler
+        if handler is not None:
+            self.binaryStats.static += 1
+            return handler(left, right)
+        cache = node.cache
+        if cache is not None:
+            leftType, rightType, handler = cache
+            if leftType is type(left) and rightType is type(right):
+                self.binaryStats.hits += 1
+                return handler(left, right)
+            if leftType is None:
+                self.binaryStats.generic += 1
+                return handler(left, right)
+        self.binaryStats.misses += 1
+        if node.operator not in tc.binary_oper:
             raise Exception(f"Unknown operator {node.operator}")
+        leftType, rightType = node.left.valueType, node.right.valueType
+        if leftType is not None and rightType is not None:
+            handler = node.handler = tc.specialize_binary(
+                node.operator, leftType, rightType
+            )
+        elif cache is None:
+            handler = tc.specialize_binary(node.operator, type(left), type(right))
+            node.cache = (type(left), type(right), handler)
+        else:
+            handler = tc.binary_oper[node.operator]
+            node.cache = (None, None, handler)
+        return handler(left, right)
 
     def visit_AstConst(self, node: ast.AstConst):
         return node.value
@@ -161,160 +304,98 @@ class Interpreter(vis.NodeVisitor):
         return point[index]
 
     def visit_AstField(self, node: ast.AstField):
-        field = node.name
-        return self.varlist[field]
+        value = self.frame.varlist[node.slot]
+        if value is UNBOUND:
+            raise SyntaxError(f"Variable '{node.name}' not found")
+        return value
 
     def visit_AstClassDecl(self, node: ast.AstClassDecl):
-        self.classlist[node.name] = node
+        methods = {method.name: method for method in node.methods}
+        layout = tc.ClassLayout(
+            node.name, node.slots, node.memberlist, node.defaults, methods, node.init
+        )
+        # methods stay callable by name from the method bodies
+        self.funclist.update(methods)
+        self.classlist[node.name] = layout
+
+    # member selections keep an inline cache (layout, target): the member
+    # slot or the method found in the class layout of the last object seen
+
+    def memberSlot(self, node: ast.AstMbrSel, obj):
+        cache = node.cache
+        if cache is not None and cache[0] is obj.layout:
+            self.memberStats.hits += 1
+            return cache[1]
+        self.memberStats.misses += 1
+        slot = obj.member(node.member.name)
+        node.cache = (obj.layout, slot)
+        return slot
+
+    def method(self, node: ast.AstMbrSel, obj):
+        cache = node.cache
+        if cache is not None and cache[0] is obj.layout:
+            self.methodStats.hits += 1
+            return cache[1]
+        name = node.member.name
+        funcDecl = obj.layout.methods.get(name)
+        if funcDecl is not None:
+            self.methodStats.misses += 1
+            node.cache = (obj.layout, funcDecl)
+            return funcDecl
+        # not a method of the class, the global function can be redefined
+        self.methodStats.generic += 1
+        funcDecl = self.funclist.get(name)
+        if funcDecl is None:
+            raise SyntaxError(f"Function '{name}' not found in class '{obj.name}'")
+        return funcDecl
 
     def visit_AstMbrSel(self, node: ast.AstMbrSel):
         obj = self.visit(node.object)
-        assert type(obj) == ClassDefiner
+        if type(obj) != tc.TypeObject:
+            raise SyntaxError(f"'{node.member.name}' selected on a non class value")
         if type(node.member) == ast.AstFuncCall:
-            callee = node.member
-            additonalVarlist = {
-                'this': obj,
-            }
-            memberFuncDecl = obj.funclist.get(callee.name)
-            if memberFuncDecl:
-                funcExecutor = FuncCaller(
-                    self, callee, memberFuncDecl, additonalVarlist
-                )
-                return funcExecutor.retVal
-            else:
-                raise SyntaxError(
-                    f"Function '{callee.name}' not found in class '{obj.name}'"
-                )
+            return self.callFunc(node.member, self.method(node, obj), obj)
         elif type(node.member) == ast.AstField:
-            return obj.varlist[node.member.name]
+            value = obj.varlist[self.memberSlot(node, obj)]
+            if value is UNBOUND:
+                raise SyntaxError(f"Member '{node.member.name}' not found")
+            return value
 
     def visit_AstFuncDecl(self, node: ast.AstFuncDecl):
-        self.funclist[node.name] = node
+        if not node.nested:
+            self.funclist[node.name] = node
 
     def visit_AstFuncCall(self, node: ast.AstFuncCall):
         calleeName = node.name
-        # search in function list
-        funcDecl = self.funclist.get(calleeName)
-        classDecl = self.classlist.get(calleeName)
+        # nested functions are bound by the resolver, then the function list
+        funcDecl = node.func
+        if funcDecl is None:
+            funcDecl = self.funclist.get(calleeName)
         if funcDecl:
-            funcExecutor = FuncCaller(self, node, funcDecl)
-            return funcExecutor.retVal
+            # calls made by a class body are bound to the new instance
+            return self.callFunc(node, funcDecl, self.frame.obj)
         # search in class list
-        elif classDecl:
-            newInstance = ClassDefiner(classDecl)
-            return newInstance
-        else:
-            raise SyntaxError(f"Function '{calleeName}' not found")
-
-    def visit_AstRet(self, node: ast.AstRet):
-        raise Exception("Return statement not in function")
-
-
-class FuncCaller(Interpreter):
-    retVal = None
-    retFlag = False
-
-    def __init__(
-        self,
-        passing: Interpreter,
-        funcCall: ast.AstFuncCall,
-        funcDecl: ast.AstFuncDecl,
-        additonalVarlist: dict = None,
-    ):
-        super().__init__()
-        self.retVal = None
-        self.retFlag = False
-        self.funclist = passing.funclist
-        self.classlist = passing.classlist
-
-        if additonalVarlist:
-            self.varlist = additonalVarlist
-
-        if type(funcDecl) != ast.AstFuncDecl:
-            # built-in function
-            if funcCall.params:
-                self.retVal = funcDecl(*[passing.visit(arg) for arg in funcCall.params])
-            else:
-                self.retVal = funcDecl()
-        else:
-            # user-defined function
-            if funcDecl.params:
-                for i in range(len(funcDecl.params)):
-                    self.varlist[funcDecl.params[i].name] = passing.visit(
-                        funcCall.params[i]
-                    )
-            self.visit(funcDecl.body)
-
-    def visit_AstStatList(self, node: ast.AstStatList):
-        for i in range(len(node.body)):
-            self.visit(node.body[i])
-            if self.retFlag:
-                return
+        layout = self.classlist.get(calleeName)
+        if layout:
+            return self.newInstance(layout)
+        raise SyntaxError(f"Function '{calleeName}' not found")
+
+    def newInstance(self, layout: tc.ClassLayout):
+        obj = tc.TypeObject(layout)
+        if layout.init:
+            # the rest of the class body runs in a frame that writes the members
+            frame = self.frame = Frame(obj.varlist, self.frame, None, obj)
+            for stat in layout.init:
+                self.visit(stat)
+            self.frame = frame.caller
+        return obj
 
     def visit_AstRet(self, node: ast.AstRet):
+        frame = self.frame
+        if frame.func is None:
+            raise Exception("Return statement not in function")
         if node.expr:
-            self.retVal = self.visit(node.expr)
+            frame.retVal = self.visit(node.expr)
         else:
-            self.retVal = None
-        self.retFlag = True
-
-
-class ClassDefiner(Interpreter):
-    name = ""
-    memberlist = {}
-
-    def __init__(self, node: Interpreter):
-        self.name = node.name
-        self.memberlist = node.memberlist
-        self.varlist = node.varlist
-        self.funclist = node.funclist
-
-    def __init__(self, node: ast.AstClassDecl, params=None):
-        # create class definition
-        super().__init__()
-        self.name = node.name
-        self.memberlist = {}
-        self.visit(node.body)
-
-    def visit_AstFuncCall(self, callee: ast.AstFuncCall):
-        calleeName = callee.name
-        additonalVarlist = {
-            'this': self,
-        }
-        # search in function list
-        funcDecl = self.funclist.get(calleeName)
-        classDecl = self.classlist.get(calleeName)
-        if funcDecl:
-            funcExecutor = FuncCaller(self, callee, funcDecl, additonalVarlist)
-            return funcExecutor.retVal
-        # search in class list
-        elif classDecl:
-            if classDecl.name == self.name:
-                raise SyntaxError(f"Cannot create instance by it self '{self.name}'")
-            newInstance = ClassDefiner(classDecl)
-            return newInstance
-
-    def visit_AstVarDecl(self, node: ast.AstVarDecl):
-        varType = node.varType
-        if varType:
-            # explicit type
-            typeclass = getattr(tc, "Type" + varType.capitalize(), None)
-            if not typeclass:
-                raise SyntaxError(f"Unknown type '{varType}'")
-            if self.varlist.get(node.varname):
-                if type(self.varlist[node.varname]) != typeclass:
-                    raise SyntaxError(f"Member '{node.varname}' already exists")
-            self.varlist[node.varname] = typeclass(self.visit(node.expr))
-        else:
-            # auto type
-            var = self.visit(node.expr)
-            node.varType = type(var).__name__.lower().replace("type", "")
-            self.varlist[node.varname] = var
-        self.memberlist[node.varname] = "var"
-
-    def visit_AstFuncDecl(self, node: ast.AstFuncDecl):
-        self.funclist[node.name] = node
-        self.memberlist[node.name] = "func"
-
-    def __str__(self) -> str:
-        return f"class({self.name}, {self.memberlist})"
+            frame.retVal = None
+        frame.retFlag = True
@@ -0,0 +1,350 @@
+import array
+import struct
+import sys
+import lang.astnode as ast
+import lang.typeclass as tc
+
+# the tree as a struct of arrays: node i has the kind kinds[i], the line
+# lines[i] and up to three operands a[i], b[i], c[i] (-1 when not used,
+# the same for a node without a line); an operand is the
+# index of a child node, of a name in names, of a value in consts or of a
+# list in lists (its length followed by the indices of the nodes)
+# the children come before their parent, the root is the last node; every
+# constant is stored once and shared, like the nodes of ast.Constants
+# it holds the parsed (and optimized) tree, not what the resolver and
+# lang.infer fill in; it is a storage format (the binary dumps of
+# lang.dump), the passes and the engines run on the decoded nodes
+#
+#   kind        a           b           c
+#   Program     body
+#   StatList    list
+#   ClassDecl   name        body
+#   MbrSel      object      member
+#   FuncDecl    name        body        params list or -1
+#   Ret         expr or -1
+#   VarDecl     name        expr        varType name or -1
+#   FuncCall    name        params list
+#   Field       name
+#   If          condition   then        else or -1
+#   While       condition   body
+#   Assign      lvalue      expr
+#   Index       point       index
+#   UnaryOper   operator    expr
+#   BinaryOper  operator    left        right
+#   Const       const
+#   Node, End
+
+kinds = [
+    ast.AstNode,
+    ast.AstProgram,
+    ast.AstStatList,
+    ast.AstClassDecl,
+    ast.AstMbrSel,
+    ast.AstFuncDecl,
+    ast.AstRet,
+    ast.AstVarDecl,
+    ast.AstFuncCall,
+    ast.AstField,
+    ast.AstIf,
+    ast.AstWhile,
+    ast.AstAssign,
+    ast.AstIndex,
+    ast.AstUnaryOper,
+    ast.AstBinaryOper,
+    ast.AstConst,
+    ast.AstEnd,
+]
+kind_index = {kind: i for i, kind in enumerate(kinds)}
+
+
+class FlatTree:
+    def __init__(self):
+        self.kinds = array.array("B")
+        self.a = array.array("i")
+        self.b = array.array("i")
+        self.c = array.array("i")
+        self.lines = array.array("i")
+        self.lists = array.array("i")
+        self.names = []
+        self.consts = []
+
+    def __len__(self):
+        return len(self.kinds)
+
+    def items(self, offset):
+        # the node indices of the list at offset
+        return self.lists[offset + 1 : offset + 1 + self.lists[offset]]
+
+    def nbytes(self):
+        # the memory of the arrays and the pools
+        size = sum(
+            sys.getsizeof(part)
+            for part in (self.kinds, self.a, self.b, self.c, self.lines, self.lists)
+        )
+        size += sys.getsizeof(self.names) + sum(
+            sys.getsizeof(name) for name in self.names
+        )
+        size += sys.getsizeof(self.consts) + sum(
+            sys.getsizeof(value) for value in self.consts
+        )
+        return size
+
+
+def operands(node):
+    # the sub nodes encode() stores before the node
+    kind = type(node)
+    if kind == ast.AstProgram or kind == ast.AstClassDecl:
+        return [node.body]
+    elif kind == ast.AstWhile:
+        return [node.condition, node.body]
+    elif kind == ast.AstStatList:
+        return node.body
+    elif kind == ast.AstFuncDecl:
+        return (node.params or []) + [node.body]
+    elif kind == ast.AstFuncCall:
+        return node.params
+    elif kind == ast.AstRet:
+        return [node.expr] if node.expr is not None else []
+    elif kind == ast.AstVarDecl or kind == ast.AstUnaryOper:
+        return [node.expr]
+    elif kind == ast.AstIf:
+        return [node.condition, node.then] + (
+            [node.else_] if node.else_ is not None else []
+        )
+    elif kind == ast.AstAssign:
+        return [node.lvalue, node.expr]
+    elif kind == ast.AstIndex:
+        return [node.point, node.index]
+    elif kind == ast.AstMbrSel:
+        return [node.object, node.member]
+    elif kind == ast.AstBinaryOper:
+        return [node.left, node.right]
+    return []
+
+
+class Encoder:
+    def __init__(self):
+        self.tree = FlatTree()
+        # id of a node -> its index, the name and constant pools
+        self.index = {}
+        self.nameIndex = {}
+        self.constIndex = {}
+
+    def name(self, name):
+        index = self.nameIndex.get(name)
+        if index is None:
+            index = self.nameIndex[name] = len(self.tree.names)
+            self.tree.names.append(name)
+        return index
+
+    def list(self, nodes):
+        if nodes is None:
+            return -1
+        lists = self.tree.lists
+        offset = len(lists)
+        lists.append(len(nodes))
+        lists.extend(self.index[id(node)] for node in nodes)
+        return offset
+
+    def node(self, node):
+        return -1 if node is None else self.index[id(node)]
+
+    def append(self, node, a=-1, b=-1, c=-1):
+        tree = self.tree
+        self.index[id(node)] = len(tree.kinds)
+        tree.kinds.append(kind_index[type(node)])
+        tree.a.append(a)
+        tree.b.append(b)
+        tree.c.append(c)
+        tree.lines.append(-1 if node.lineno is None else node.lineno)
+
+    def add(self, node):
+        kind = type(node)
+        ref = self.node
+        if kind == ast.AstConst:
+            key = (type(node.value), str(node.value))
+            index = self.constIndex.get(key)
+            if index is None:
+                # the first node of the constant, the others share it
+                index = self.constIndex[key] = len(self.tree.kinds)
+                self.tree.consts.append(node.value)
+                self.append(node, len(self.tree.consts) - 1)
+            self.index[id(node)] = index
+        elif kind == ast.AstProgram:
+            self.append(node, ref(node.body))
+        elif kind == ast.AstStatList:
+            self.append(node, self.list(node.body))
+        elif kind == ast.AstClassDecl:
+            self.append(node, self.name(node.name), ref(node.body))
+        elif kind == ast.AstMbrSel:
+            self.append(node, ref(node.object), ref(node.member))
+        elif kind == ast.AstFuncDecl:
+            self.append(
+                node, self.name(node.name), ref(node.body), self.list(node.params)
+            )
+        elif kind == ast.AstRet:
+            self.append(node, ref(node.expr))
+        elif kind == ast.AstVarDecl:
+            varType = -1 if node.autoType else self.name(node.varType)
+            self.append(node, self.name(node.varname), ref(node.expr), varType)
+        elif kind == ast.AstFuncCall:
+            self.append(node, self.name(node.name), self.list(node.params))
+        elif kind == ast.AstField:
+            self.append(node, self.name(node.name))
+        elif kind == ast.AstIf:
+            self.append(node, ref(node.condition), ref(node.then), ref(node.else_))
+        elif kind == ast.AstWhile:
+            self.append(node, ref(node.condition), ref(node.body))
+        elif kind == ast.AstAssign:
+            self.append(node, ref(node.lvalue), ref(node.expr))
+        elif kind == ast.AstIndex:
+            self.append(node, ref(node.point), ref(node.index))
+        elif kind == ast.AstUnaryOper:
+            self.append(node, self.name(node.operator), ref(node.expr))
+        elif kind == ast.AstBinaryOper:
+            self.append(node, self.name(node.operator), ref(node.left), ref(node.right))
+        elif kind == ast.AstNode or kind == ast.AstEnd:
+            self.append(node)
+        else:
+            raise Exception(f"can not encode a {kind.__name__}")
+
+    def encode(self, program):
+        # children first with a stack of its own, deep trees do not hit the
+        # recursion limit
+        stack = [(program, False)]
+        while stack:
+            node, ready = stack.pop()
+            if ready:
+                if id(node) not in self.index:
+                    self.add(node)
+                continue
+            stack.append((node, True))
+            for child in reversed(operands(node)):
+                stack.append((child, False))
+        return self.tree
+
+
+def encode(program: ast.AstProgram) -> FlatTree:
+    return Encoder().encode(program)
+
+
+def decode(tree: FlatTree) -> ast.AstProgram:
+    # one loop over the arrays, the children are built before their parent
+    nodes = []
+    append = nodes.append
+    names = tree.names
+    items = tree.items
+    for index, a, b, c, line in zip(tree.kinds, tree.a, tree.b, tree.c, tree.lines):
+        kind = kinds[index]
+        if kind == ast.AstConst:
+            node = ast.AstConst(tree.consts[a])
+        elif kind == ast.AstField:
+            node = ast.AstField(names[a])
+        elif kind == ast.AstBinaryOper:
+            node = ast.AstBinaryOper(names[a], nodes[b], nodes[c])
+        elif kind == ast.AstFuncCall:
+            node = ast.AstFuncCall(names[a])
+            node.params = [nodes[j] for j in items(b)]
+        elif kind == ast.AstStatList:
+            node = ast.AstStatList()
+            node.body = [nodes[j] for j in items(a)]
+        elif kind == ast.AstVarDecl:
+            node = ast.AstVarDecl(names[a], nodes[b], names[c] if c >= 0 else None)
+        elif kind == ast.AstAssign:
+            node = ast.AstAssign(nodes[a], nodes[b])
+        elif kind == ast.AstIf:
+            node = ast.AstIf(nodes[a], nodes[b], nodes[c] if c >= 0 else None)
+        elif kind == ast.AstWhile:
+            node = ast.AstWhile(nodes[a], nodes[b])
+        elif kind == ast.AstIndex:
+            node = ast.AstIndex(nodes[a], nodes[b])
+        elif kind == ast.AstMbrSel:
+            node = ast.AstMbrSel(nodes[a], nodes[b])
+        elif kind == ast.AstUnaryOper:
+            node = ast.AstUnaryOper(names[a], nodes[b])
+        elif kind == ast.AstRet:
+            node = ast.AstRet(nodes[a] if a >= 0 else None)
+        elif kind == ast.AstFuncDecl:
+            params = [nodes[j] for j in items(c)] if c >= 0 else None
+            node = ast.AstFuncDecl(names[a], nodes[b], params)
+        elif kind == ast.AstClassDecl:
+            node = ast.AstClassDecl(names[a], nodes[b])
+        elif kind == ast.AstProgram:
+            node = ast.AstProgram(nodes[a])
+        elif kind == ast.AstEnd:
+            node = ast.END
+        else:
+            node = ast.AstNode()
+        if line >= 0:
+            node.lineno = line
+        append(node)
+    return nodes[-1]
+
+
+# the binary form of a FlatTree (lang.dump): the header, the arrays little
+# endian, the names separated by '\0' and the constants as a tag, the byte
+# length and the utf-8 text
+MAGIC = b"BLANGAST"
+VERSION = 2
+header = struct.Struct("<8sIIIII")
+constant = struct.Struct("<BI")
+const_tags = [tc.TypeInt, tc.TypeFloat, tc.TypeString, tc.TypeBool]
+const_tag = {kind: i for i, kind in enumerate(const_tags)}
+
+
+def little(part):
+    if sys.byteorder == "big":
+        part = array.array(part.typecode, part)
+        part.byteswap()
+    return part.tobytes()
+
+
+def dumps(tree: FlatTree) -> bytes:
+    names = "\0".join(tree.names).encode()
+    parts = [
+        header.pack(
+            MAGIC,
+            VERSION,
+            len(tree.kinds),
+            len(tree.lists),
+            len(names),
+            len(tree.consts),
+        ),
+        tree.kinds.tobytes(),
+        little(tree.a),
+        little(tree.b),
+        little(tree.c),
+        little(tree.lines),
+        little(tree.lists),
+        names,
+    ]
+    for value in tree.consts:
+        text = str(value).encode()
+        parts.append(constant.pack(const_tag[type(value)], len(text)))
+        parts.append(text)
+    return b"".join(parts)
+
+
+def loads(data: bytes) -> FlatTree:
+    magic, version, nodes, nlists, nnames, nconsts = header.unpack_from(data)
+    if magic != MAGIC or version != VERSION:
+        raise Exception("not a binary tree dump of this version")
+    tree = FlatTree()
+    offset = header.size
+    tree.kinds.frombytes(data[offset : offset + nodes])
+    offset += nodes
+    parts = (tree.a, tree.b, tree.c, tree.lines)
+    for part, count in [(part, nodes) for part in parts] + [(tree.lists, nlists)]:
+        part.frombytes(data[offset : offset + count * part.itemsize])
+        if sys.byteorder == "big":
+            part.byteswap()
+        offset += count * part.itemsize
+    names = data[offset : offset + nnames].decode()
+    tree.names = names.split("\0") if names else []
+    offset += nnames
+    for _ in range(nconsts):
+        tag, length = constant.unpack_from(data, offset)
+        offset += constant.size
+        tree.consts.append(const_tags[tag](data[offset : offset + length].decode()))
+        offset += length
+    return tree
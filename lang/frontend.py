@@ -0,0 +1,82 @@
+import functools
+import lang.cache as astcache
+import lang.optimizer as optimizer
+
+# the front end of blang.py as functions: every call parses with a lexer and
+# a parser of its own, any number of sources can be compiled at the same
+# time (the module level lexer and parser of lang/lexer.py and
+# lang/syntax.py keep their state from one parse to the next)
+
+
+def options_key(disabled=(), inlineThreshold=optimizer.Inline.threshold):
+    # the options the trees depend on, part of the key of the caches
+    return repr((sorted(disabled), inlineThreshold))
+
+
+def parse(code, parser="descent", lexer="hand"):
+    # the tree of the source, parser is "descent" or "ply", lexer is the
+    # lexer of the ply parser, "hand" or "ply"
+    if parser == "descent":
+        import lang.descent as descent
+
+        return descent.parse(code)
+    import lang.syntax as syntax
+
+    if lexer == "hand":
+        import lang.scanner as scanner
+
+        return syntax.parse(code, scanner.Lexer())
+    return syntax.parse(code)
+
+
+def compile_source(
+    code,
+    disabled=(),
+    inlineThreshold=optimizer.Inline.threshold,
+    parser="descent",
+    lexer="hand",
+):
+    # the optimized, resolved and type annotated tree the engines run
+    import lang.resolver as resolver
+    import lang.infer as infer
+
+    tree = parse(code, parser, lexer)
+    tree = optimizer.Pipeline(
+        disabled, report=False, inlineThreshold=inlineThreshold
+    ).run(tree)
+    tree = resolver.resolve(tree)
+    return infer.infer(tree)
+
+
+def compile_file(
+    path,
+    cacheDir=None,
+    disabled=(),
+    inlineThreshold=optimizer.Inline.threshold,
+    **options
+):
+    # with a cacheDir the trees are shared with blang.py through lang.cache
+    code = open(path, "r").read() + "\n"
+    cache = None if cacheDir is None else astcache.AstCache(cacheDir)
+    key = options_key(disabled, inlineThreshold)
+    if cache is not None:
+        tree = cache.load(code, key)
+        if tree is not None:
+            return tree
+    tree = compile_source(code, disabled, inlineThreshold, **options)
+    if cache is not None:
+        cache.save(code, tree, key)
+    return tree
+
+
+def compile_many(paths, workers=None, processes=True, cacheDir=None, **options):
+    # the trees of the files in the order of paths, compiled in a pool of
+    # processes; the threads of a thread pool share one interpreter lock
+    # and only overlap the reads of the files and the caches
+    # a syntax or a name error of a file is raised here
+    import concurrent.futures as futures
+
+    pool = futures.ProcessPoolExecutor if processes else futures.ThreadPoolExecutor
+    task = functools.partial(compile_file, cacheDir=cacheDir, **options)
+    with pool(workers) as executor:
+        return list(executor.map(task, paths))
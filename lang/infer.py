@@ -0,0 +1,332 @@
+import lang.visitor as vis
+import lang.astnode as ast
+import lang.typeclass as tc
+import lang.optimizer as optimizer
+
+# a type is the python class of the runtime value (tc.TypeInt, str, ...) or
+# the name of a blang class for its instances; the type of an expression is
+# the set of the types it can have, a set with ANY means it is not known
+ANY = object
+NoneType = type(None)
+
+builtin_results = {
+    "print": NoneType,
+    "println": NoneType,
+    "input": str,
+    "float": tc.TypeFloat,
+    "int": tc.TypeInt,
+    "cls": NoneType,
+    "time": tc.TypeInt,
+    "list": list,
+}
+
+# a value of each type the operators are tried on to find the result type
+samples = {
+    tc.TypeInt: tc.TypeInt(7),
+    tc.TypeFloat: tc.TypeFloat(2.5),
+    tc.TypeString: tc.TypeString("s"),
+    tc.TypeBool: tc.TypeBool(True),
+    float: 2.5,
+    str: "s",
+    bool: True,
+}
+
+# some operators give plain python values, they keep their python name
+type_names = {
+    tc.TypeInt: "int",
+    tc.TypeFloat: "float",
+    tc.TypeString: "string",
+    tc.TypeBool: "bool",
+    float: "pyfloat",
+    str: "str",
+    bool: "pybool",
+    NoneType: "none",
+    list: "list",
+}
+
+
+def type_name(kind):
+    if type(kind) == str:
+        return kind
+    return type_names.get(kind, "?")
+
+
+def single(types):
+    # the type when there is exactly one known type, else None
+    if len(types) == 1 and ANY not in types:
+        return next(iter(types))
+    return None
+
+
+def binary_result(oper, left, right):
+    # type of the result of an operator, ANY when it depends on the values
+    # (the operator raises on the sample values or has no samples)
+    if oper in ("&&", "||"):
+        # the result is one of the operands
+        return ANY
+    if left not in samples or right not in samples:
+        return ANY
+    try:
+        return type(tc.binary_oper[oper](samples[left], samples[right]))
+    except Exception:
+        return ANY
+
+
+def unary_result(oper, kind):
+    if oper == "!":
+        return bool
+    if oper == "+":
+        # the closure engine and the vm return the operand itself
+        return tc.TypeInt if kind == tc.TypeInt else ANY
+    if kind not in samples:
+        return ANY
+    try:
+        return type(tc.unary_oper[oper](samples[kind]))
+    except Exception:
+        return ANY
+
+
+class Inferrer(vis.NodeVisitor):
+    # flow insensitive type inference over the resolved tree: every variable
+    # slot, parameter, member and function result gets the union of the
+    # types of all the values that can be stored in it, the tree is walked
+    # until nothing grows; the types of a call come from every function that
+    # can be called by that name (the global defs, the methods of the class
+    # of the object, the built-in functions and the class constructors)
+    # 'this' is never typed: a method found in the global function list can
+    # be called on an instance of any class
+    # expression nodes get 'valueType', the type when only one is possible
+    def __init__(self):
+        self.scope = None
+        self.func = None
+        self.changed = False
+        # (scope node, slot) -> types, the members use (class name, name)
+        self.vars = {}
+        self.returns = {}
+        self.types = {}
+
+    def infer(self, node: ast.AstProgram):
+        self.program = node
+        nodes = list(optimizer.walk(node))
+        self.funcs = [child for child in nodes if type(child) == ast.AstFuncDecl]
+        self.classes = {}
+        for child in nodes:
+            if type(child) == ast.AstClassDecl:
+                self.classes.setdefault(child.name, []).append(child)
+        self.byName = {}
+        for func in self.funcs:
+            if not func.nested:
+                self.byName.setdefault(func.name, []).append(func)
+        for func in self.funcs:
+            self.returns[func] = set() if optimizer.returns(func.body) else {NoneType}
+        self.changed = True
+        while self.changed:
+            self.changed = False
+            self.scan(node, node.body)
+            for decls in self.classes.values():
+                for decl in decls:
+                    self.scan(decl, decl.body)
+            for func in self.funcs:
+                self.func = func
+                self.scan(func, func.body)
+                self.func = None
+        for child, types in self.types.items():
+            child.valueType = single(types)
+        return node
+
+    def scan(self, scope, body):
+        self.scope = scope
+        self.visit(body)
+
+    def add(self, key, types):
+        known = self.vars.setdefault(key, set())
+        if not types <= known:
+            known |= types
+            self.changed = True
+
+    def slotKey(self, slot, name):
+        if type(self.scope) == ast.AstClassDecl:
+            return (self.scope.name, name)
+        return (self.scope, slot)
+
+    def expr(self, node, types):
+        self.types[node] = types
+        return types
+
+    def generic_visit(self, node):
+        # the empty compound statement
+        return {ANY}
+
+    def visit_AstStatList(self, node: ast.AstStatList):
+        for stat in node.body:
+            self.visit(stat)
+
+    def visit_AstFuncDecl(self, node: ast.AstFuncDecl):
+        # the bodies are scanned on their own
+        pass
+
+    def visit_AstClassDecl(self, node: ast.AstClassDecl):
+        pass
+
+    def visit_AstIf(self, node: ast.AstIf):
+        self.visit(node.condition)
+        self.visit(node.then)
+        if node.else_:
+            self.visit(node.else_)
+
+    def visit_AstWhile(self, node: ast.AstWhile):
+        self.visit(node.condition)
+        self.visit(node.body)
+
+    def visit_AstRet(self, node: ast.AstRet):
+        types = self.visit(node.expr) if node.expr else {NoneType}
+        if self.func is not None and not types <= self.returns[self.func]:
+            self.returns[self.func] |= types
+            self.changed = True
+
+    def visit_AstVarDecl(self, node: ast.AstVarDecl):
+        types = self.visit(node.expr)
+        if node.varType and not node.autoType:
+            typeclass = getattr(tc, "Type" + node.varType.capitalize(), None)
+            types = {typeclass} if typeclass else {ANY}
+        self.add(self.slotKey(node.slot, node.varname), types)
+
+    def visit_AstAssign(self, node: ast.AstAssign):
+        types = self.visit(node.expr)
+        lvalue = node.lvalue
+        if type(lvalue) == ast.AstField:
+            self.add(self.slotKey(lvalue.slot, lvalue.name), types)
+        elif type(lvalue) == ast.AstIndex:
+            self.visit(lvalue.point)
+            self.visit(lvalue.index)
+        elif type(lvalue) == ast.AstMbrSel:
+            for name in self.objectClasses(
+                self.visit(lvalue.object), lvalue.member.name
+            ):
+                self.add((name, lvalue.member.name), types)
+        return self.expr(node, types)
+
+    def objectClasses(self, types, member):
+        # classes of an object that have the member
+        names = (
+            self.classes
+            if ANY in types
+            else [kind for kind in types if type(kind) == str]
+        )
+        return [
+            name
+            for name in names
+            if name in self.classes
+            and any(member in decl.slots for decl in self.classes[name])
+        ]
+
+    def visit_AstConst(self, node: ast.AstConst):
+        return self.expr(node, {type(node.value)})
+
+    def visit_AstField(self, node: ast.AstField):
+        if node.name == "this" and type(self.scope) != ast.AstClassDecl:
+            return self.expr(node, {ANY})
+        return self.expr(
+            node, set(self.vars.get(self.slotKey(node.slot, node.name), ()))
+        )
+
+    def visit_AstIndex(self, node: ast.AstIndex):
+        self.visit(node.point)
+        self.visit(node.index)
+        return self.expr(node, {ANY})
+
+    def visit_AstUnaryOper(self, node: ast.AstUnaryOper):
+        types = self.visit(node.expr)
+        return self.expr(node, {unary_result(node.operator, kind) for kind in types})
+
+    def visit_AstBinaryOper(self, node: ast.AstBinaryOper):
+        left = self.visit(node.left)
+        right = self.visit(node.right)
+        if node.operator in ("&&", "||"):
+            return self.expr(node, left | right)
+        return self.expr(
+            node, {binary_result(node.operator, l, r) for l in left for r in right}
+        )
+
+    def call(self, node: ast.AstFuncCall, funcs, builtin):
+        args = [self.visit(param) for param in node.params]
+        types = set()
+        for func in funcs:
+            for i, param in enumerate(func.params or ()):
+                if i < len(args):
+                    self.add((func, i + 1), args[i])
+            types |= self.returns[func]
+        if builtin and node.name in builtin_results:
+            types.add(builtin_results[node.name])
+        return types
+
+    def visit_AstFuncCall(self, node: ast.AstFuncCall):
+        if node.func is not None:
+            return self.expr(node, self.call(node, [node.func], False))
+        types = self.call(node, self.byName.get(node.name, ()), True)
+        if node.name in self.classes:
+            types.add(node.name)
+        return self.expr(node, types)
+
+    def visit_AstMbrSel(self, node: ast.AstMbrSel):
+        objTypes = self.visit(node.object)
+        member = node.member
+        if type(member) == ast.AstField:
+            types = set()
+            for name in self.objectClasses(objTypes, member.name):
+                types |= self.vars.get((name, member.name), set())
+            return self.expr(node, types)
+        # a method of the class of the object, else a global function
+        names = (
+            self.classes
+            if ANY in objTypes
+            else [kind for kind in objTypes if type(kind) == str]
+        )
+        funcs = []
+        fallback = ANY in objTypes
+        for name in names:
+            for decl in self.classes.get(name, ()):
+                methods = [
+                    method for method in decl.methods if method.name == member.name
+                ]
+                funcs.extend(methods)
+                fallback = fallback or not methods
+        if fallback:
+            funcs.extend(self.byName.get(member.name, ()))
+        return self.expr(node, self.call(member, funcs, fallback))
+
+    def formatReport(self):
+        # per scope: the variables with one type, the types of all variables
+        lines = [f"{'types':<24}{'monomorphic':>12}  variables"]
+        scopes = [("<program>", self.program, 1)]
+        for name, decls in self.classes.items():
+            scopes.extend((f"class {name}", decl, 0) for decl in decls[:1])
+        for func in self.funcs:
+            result = " | ".join(sorted(type_name(kind) for kind in self.returns[func]))
+            scopes.append((f"{func.name} -> {result or 'unused'}", func, 1))
+        for label, scope, first in scopes:
+            variables = []
+            mono = 0
+            for slot, name in enumerate(scope.varnames[first:], first):
+                key = (
+                    (scope.name, name)
+                    if type(scope) == ast.AstClassDecl
+                    else (scope, slot)
+                )
+                types = self.vars.get(key, set())
+                if single(types) is not None:
+                    mono += 1
+                if not types:
+                    names = "unused"
+                elif ANY in types:
+                    names = "?"
+                else:
+                    names = " | ".join(sorted(type_name(kind) for kind in types))
+                variables.append(f"{name}: {names}")
+            count = f"{mono}/{len(variables)}"
+            lines.append(f"{label:<24}{count:>12}  {', '.join(variables)}")
+        return "\n".join(lines)
+
+
+def infer(node: ast.AstProgram):
+    return Inferrer().infer(node)
@@ -1,4 +1,5 @@
 import ply.lex as lex
+import importlib.util
 import lang.typeclass as tc
 import lang.astnode as ast
 
@@ -46,7 +47,7 @@ def t_NumFloat(t):
     r'\d+\.\d+'
     set_last_token(t.lexer, 'const')
     t.type = 'CONST'
-    t.value = ast.AstConst(tc.TypeFloat(t.value))
+    t.value = t.lexer.constants.get(tc.TypeFloat(t.value))
     return t
 
 
@@ -54,7 +55,7 @@ def t_NumInt(t):
     r'\d+'
     set_last_token(t.lexer, 'const')
     t.type = 'CONST'
-    t.value = ast.AstConst(tc.TypeInt(t.value))
+    t.value = t.lexer.constants.get(tc.TypeInt(t.value))
     return t
 
 
@@ -62,7 +63,7 @@ def t_STRING(t):
     r'"[^"]*"'
     set_last_token(t.lexer, 'const')
     t.type = 'CONST'
-    t.value = ast.AstConst(tc.TypeString(t.value[1:-1]))
+    t.value = t.lexer.constants.get(tc.TypeString(t.value[1:-1]))
     return t
 
 
@@ -70,7 +71,7 @@ def t_Boolean(t):
     r'true|false'
     set_last_token(t.lexer, 'const')
     t.type = 'CONST'
-    t.value = ast.AstConst(tc.TypeBool(t.value))
+    t.value = t.lexer.constants.get(tc.TypeBool(t.value))
     return t
 
 
@@ -146,7 +147,7 @@ def t_RCURLY(t):
     else:
         t.lexer.rcurly_end = True
         t.type = 'END'
-        t.value = ast.AstEnd()
+        t.value = ast.END
         t.lexer.lexpos -= 1
     return t
 
@@ -174,14 +175,14 @@ def t_NEWLINE(t):
     if t.lexer.last_token == 'else':
         return
     t.type = 'END'
-    t.value = ast.AstEnd()
+    t.value = ast.END
     return t
 
 
 def t_SEMI(t):
     r';'
     t.type = 'END'
-    t.value = ast.AstEnd()
+    t.value = ast.END
     return t
 
 
@@ -201,7 +202,27 @@ def set_last_token(lexer, name):
         lexer.last_token = name
 
 
-lexer = lex.lex(optimize=True, outputdir='generated')
-lexer.paren_level = 0
-lexer.last_token = None
-lexer.rcurly_end = False
+# the master regex is prebuilt in lang/lextab.py (python3 -m lang.tables),
+# without it the lexer is built in memory, nothing is written
+if importlib.util.find_spec('lang.lextab'):
+    lexer = lex.lex(optimize=True, lextab='lang.lextab')
+else:
+    lexer = lex.lex()
+
+
+def reset(lexer):
+    lexer.paren_level = 0
+    lexer.last_token = None
+    lexer.rcurly_end = False
+    lexer.lineno = 1
+    lexer.constants = ast.Constants()
+    return lexer
+
+
+def new_lexer():
+    # a lexer with its own state, the master regex is shared; the module
+    # level lexer keeps its state from one input to the next
+    return reset(lexer.clone())
+
+
+reset(lexer)
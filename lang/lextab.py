@@ -0,0 +1,10 @@
+# lextab.py. This file automatically created by PLY (version 3.11). Don't edit!
+_tabversion   = '3.10'
+_lextokens    = set(('ASSIGN', 'CLASS', 'COLON', 'COMMA', 'CONST', 'DEF', 'DOT', 'ELSE', 'END', 'FIELD', 'IF', 'LCURLY', 'LPAREN', 'LSQUARE', 'OPERLV0', 'OPERLV1', 'OPERLV2', 'OPERLV3', 'RCURLY', 'RET', 'RPAREN', 'RSQUARE', 'UNARY', 'WHILE'))
+_lexreflags   = 64
+_lexliterals  = ''
+_lexstateinfo = {'INITIAL': 'inclusive'}
+_lexstatere   = {'INITIAL': [('(?P<t_NumFloat>\\d+\\.\\d+)|(?P<t_NumInt>\\d+)|(?P<t_STRING>"[^"]*")|(?P<t_Boolean>true|false)|(?P<t_DOT>\\.)|(?P<t_UNARY>!|~)|(?P<t_OPERLV0>\\*|/|%)|(?P<t_OPERLV1>\\+|-)|(?P<t_OPERLV2>>=|<=|==|!=|>|<)|(?P<t_OPERLV3>&&|\\|\\|)|(?P<t_LPAREN>\\()|(?P<t_RPAREN>\\))|(?P<t_LSQUARE>\\[)|(?P<t_RSQUARE>\\])|(?P<t_LCURLY>\\{)|(?P<t_RCURLY>\\})|(?P<t_FIELD>[a-zA-Z_][a-zA-Z0-9_]*)|(?P<t_NEWLINE>[ \\n]+)|(?P<t_SEMI>;)|(?P<t_COMMENT>\\#.*)|(?P<t_ASSIGN>=)|(?P<t_COLON>:)|(?P<t_COMMA>,)', [None, ('t_NumFloat', 'NumFloat'), ('t_NumInt', 'NumInt'), ('t_STRING', 'STRING'), ('t_Boolean', 'Boolean'), ('t_DOT', 'DOT'), ('t_UNARY', 'UNARY'), ('t_OPERLV0', 'OPERLV0'), ('t_OPERLV1', 'OPERLV1'), ('t_OPERLV2', 'OPERLV2'), ('t_OPERLV3', 'OPERLV3'), ('t_LPAREN', 'LPAREN'), ('t_RPAREN', 'RPAREN'), ('t_LSQUARE', 'LSQUARE'), ('t_RSQUARE', 'RSQUARE'), ('t_LCURLY', 'LCURLY'), ('t_RCURLY', 'RCURLY'), ('t_FIELD', 'FIELD'), ('t_NEWLINE', 'NEWLINE'), ('t_SEMI', 'SEMI'), ('t_COMMENT', 'COMMENT'), (None, 'ASSIGN'), (None, 'COLON'), (None, 'COMMA')])]}
+_lexstateignore = {'INITIAL': ' \t'}
+_lexstateerrorf = {'INITIAL': 't_error'}
+_lexstateeoff = {}
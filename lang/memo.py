@@ -0,0 +1,168 @@
+import lang.astnode as ast
+import lang.typeclass as tc
+import lang.optimizer as optimizer
+from collections import OrderedDict
+
+# built-in functions without side effects that return a new immutable value
+pure_builtins = {"float", "int"}
+
+# values a result cache can be keyed on, with the python type of the key
+key_types = {
+    tc.TypeInt: int,
+    tc.TypeFloat: float,
+    tc.TypeString: str,
+    int: int,
+    float: float,
+    str: str,
+    bool: bool,
+}
+
+MISSING = object()
+
+
+def impurity(func: ast.AstFuncDecl):
+    # reason why the body of func alone is not pure, None if it is
+    for node in optimizer.scope_nodes(func.body):
+        kind = type(node)
+        if kind == ast.AstAssign and type(node.lvalue) != ast.AstField:
+            return "writes through an index or a member"
+        elif kind == ast.AstMbrSel:
+            return "uses an object"
+        elif kind == ast.AstField and node.name == "this":
+            return "uses 'this'"
+        elif kind == ast.AstClassDecl:
+            return "declares a class"
+    return None
+
+
+def calls(func: ast.AstFuncDecl):
+    return [
+        node
+        for node in optimizer.scope_nodes(func.body)
+        if type(node) == ast.AstFuncCall
+    ]
+
+
+def analyze(program: ast.AstProgram):
+    # marks the functions whose result only depends on their arguments:
+    # no output, input or time, no writes through an index or a member, no
+    # objects, and only pure callees; a call by name is pure when every
+    # def of that name in the program is, nested functions are known from
+    # the resolver (AstFuncCall.func); needs the resolved tree
+    # returns {function: None or the reason it is not pure}
+    funcs = [node for node in optimizer.walk(program) if type(node) == ast.AstFuncDecl]
+    classes = {
+        node.name for node in optimizer.walk(program) if type(node) == ast.AstClassDecl
+    }
+    byName = {}
+    for func in funcs:
+        if not func.nested:
+            byName.setdefault(func.name, []).append(func)
+    reasons = {func: impurity(func) for func in funcs}
+    changed = True
+    while changed:
+        changed = False
+        for func in funcs:
+            if reasons[func]:
+                continue
+            for call in calls(func):
+                reason = callImpurity(call, byName, classes, reasons)
+                if reason:
+                    reasons[func] = reason
+                    changed = True
+                    break
+    for func in funcs:
+        func.pure = reasons[func] is None
+    return reasons
+
+
+def callImpurity(call: ast.AstFuncCall, byName, classes, reasons):
+    if call.func is not None:
+        return reasons[call.func] and f"calls '{call.name}'"
+    if call.name in byName:
+        if any(reasons[func] for func in byName[call.name]):
+            return f"calls '{call.name}'"
+        return None
+    if call.name in pure_builtins and call.name not in classes:
+        return None
+    return f"calls '{call.name}'"
+
+
+def make_key(values):
+    # None when a value can change or has no value equality (lists, objects)
+    key = []
+    for value in values:
+        kind = type(value)
+        if kind == tc.TypeBool:
+            key.append((kind, value.value))
+        elif kind in key_types:
+            # the blang types are not hashable, the type keeps 1 and 1.0 apart
+            key.append((kind, key_types[kind](value)))
+        else:
+            return None
+    return tuple(key)
+
+
+class LruCache:
+    __slots__ = ("entries", "size", "hits", "misses", "evictions", "bypassed")
+
+    def __init__(self, size):
+        self.entries = OrderedDict()
+        self.size = size
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        # calls with arguments that can not be a key
+        self.bypassed = 0
+
+    def get(self, key):
+        value = self.entries.get(key, MISSING)
+        if value is MISSING:
+            self.misses += 1
+        else:
+            self.hits += 1
+            self.entries.move_to_end(key)
+        return value
+
+    def put(self, key, value):
+        self.entries[key] = value
+        if len(self.entries) > self.size:
+            self.entries.popitem(last=False)
+            self.evictions += 1
+
+    def __str__(self) -> str:
+        return (
+            f"{self.hits:>10}{self.misses:>10}{self.evictions:>10}"
+            f"{self.bypassed:>10}{len(self.entries):>8}"
+        )
+
+
+class Memo:
+    # result caches of the pure functions, one bounded LRU cache per function
+    size = 4096
+
+    def __init__(self, size=size):
+        self.size = size
+        self.caches = {}
+
+    def call(self, func: ast.AstFuncDecl, values, compute):
+        cache = self.caches.get(func)
+        if cache is None:
+            cache = self.caches[func] = LruCache(self.size)
+        key = make_key(values)
+        if key is None:
+            cache.bypassed += 1
+            return compute()
+        value = cache.get(key)
+        if value is MISSING:
+            value = compute()
+            cache.put(key, value)
+        return value
+
+    def formatStats(self):
+        lines = [
+            f"{'memoized':<14}{'hits':>10}{'misses':>10}{'evicted':>10}{'bypassed':>10}{'size':>8}"
+        ]
+        for func, cache in self.caches.items():
+            lines.append(f"{func.name:<14}{cache}")
+        return "\n".join(lines)
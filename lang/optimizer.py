@@ -0,0 +1,948 @@
+import lang.visitor as vis
+import lang.astnode as ast
+import lang.typeclass as tc
+import copy
+import json
+
+# returned by evaluate() when an expression is not a compile time constant
+NOTCONST = object()
+
+# values an AstConst can hold, other results of a fold are left unfolded
+const_types = (tc.TypeInt, tc.TypeFloat, tc.TypeString, tc.TypeBool)
+
+
+def children(node):
+    # every sub node, getChild() leaves out lvalues, indexes and members
+    kind = type(node)
+    if kind == ast.AstAssign:
+        return [node.lvalue, node.expr]
+    elif kind == ast.AstIndex:
+        return [node.point, node.index]
+    elif kind == ast.AstMbrSel:
+        return [node.object, node.member]
+    return [child for child in node.getChild() if child is not None]
+
+
+def count_nodes(node):
+    return 1 + sum(count_nodes(child) for child in children(node))
+
+
+def walk(node):
+    # the node and all its sub nodes
+    yield node
+    for child in children(node):
+        yield from walk(child)
+
+
+def scope_nodes(node):
+    # the nodes of a scope body, without the bodies of nested functions and classes
+    yield node
+    for child in children(node):
+        if type(child) in (ast.AstFuncDecl, ast.AstClassDecl):
+            yield child
+        else:
+            yield from scope_nodes(child)
+
+
+def returns(stat):
+    # True when the statement always ends with a 'ret'
+    kind = type(stat)
+    if kind == ast.AstRet:
+        return True
+    elif kind == ast.AstStatList:
+        return any(returns(child) for child in stat.body)
+    elif kind == ast.AstIf:
+        return stat.else_ is not None and returns(stat.then) and returns(stat.else_)
+    return False
+
+
+class Pass(vis.NodeVisitor):
+    # one optimization over the tree, visit() returns the node that takes
+    # the place of the visited one, 'stats' counts what the pass did
+    name = None
+
+    def __init__(self, **options):
+        self.stats = {}
+        # lines printed below the pass in the report
+        self.details = []
+        self.inFunction = False
+
+    def count(self, what, n=1):
+        self.stats[what] = self.stats.get(what, 0) + n
+
+    def generic_visit(self, node):
+        # AstConst, AstField and the empty AstNode have nothing to rewrite
+        return node
+
+    def statements(self, stats):
+        return [self.visit(stat) for stat in stats]
+
+    def removed(self, node):
+        # the nested defs of dropped code are kept, they are bound to the
+        # function and not executed where they are written
+        if not self.inFunction:
+            return []
+        return [child for child in scope_nodes(node) if type(child) == ast.AstFuncDecl]
+
+    def replace(self, stats):
+        # statement standing for a list of statements
+        if len(stats) == 1:
+            return stats[0]
+        node = ast.AstStatList()
+        node.body = stats
+        return node
+
+    def visit_AstProgram(self, node: ast.AstProgram):
+        node.body = self.visit(node.body)
+        return node
+
+    def visit_AstStatList(self, node: ast.AstStatList):
+        node.body = self.statements(node.body)
+        return node
+
+    def visit_AstFuncDecl(self, node: ast.AstFuncDecl):
+        inFunction, self.inFunction = self.inFunction, True
+        node.body = self.visit(node.body)
+        self.inFunction = inFunction
+        return node
+
+    def visit_AstClassDecl(self, node: ast.AstClassDecl):
+        inFunction, self.inFunction = self.inFunction, False
+        node.body = self.visit(node.body)
+        self.inFunction = inFunction
+        return node
+
+    def visit_AstIf(self, node: ast.AstIf):
+        node.condition = self.visit(node.condition)
+        node.then = self.visit(node.then)
+        if node.else_:
+            node.else_ = self.visit(node.else_)
+        return node
+
+    def visit_AstWhile(self, node: ast.AstWhile):
+        node.condition = self.visit(node.condition)
+        node.body = self.visit(node.body)
+        return node
+
+    def visit_AstRet(self, node: ast.AstRet):
+        if node.expr:
+            node.expr = self.visit(node.expr)
+        return node
+
+    def visit_AstVarDecl(self, node: ast.AstVarDecl):
+        node.expr = self.visit(node.expr)
+        return node
+
+    def visit_AstAssign(self, node: ast.AstAssign):
+        node.expr = self.visit(node.expr)
+        lvalue = node.lvalue
+        if type(lvalue) == ast.AstIndex:
+            self.visit_AstIndex(lvalue)
+        elif type(lvalue) == ast.AstMbrSel:
+            lvalue.object = self.visit(lvalue.object)
+        return node
+
+    def visit_AstFuncCall(self, node: ast.AstFuncCall):
+        node.params = [self.visit(param) for param in node.params]
+        return node
+
+    def visit_AstMbrSel(self, node: ast.AstMbrSel):
+        node.object = self.visit(node.object)
+        if type(node.member) == ast.AstFuncCall:
+            self.visit_AstFuncCall(node.member)
+        return node
+
+    def visit_AstIndex(self, node: ast.AstIndex):
+        node.point = self.visit(node.point)
+        node.index = self.visit(node.index)
+        return node
+
+    def visit_AstUnaryOper(self, node: ast.AstUnaryOper):
+        node.expr = self.visit(node.expr)
+        return node
+
+    def visit_AstBinaryOper(self, node: ast.AstBinaryOper):
+        node.left = self.visit(node.left)
+        node.right = self.visit(node.right)
+        return node
+
+
+def evaluate(node):
+    # value of a constant expression with the runtime operator semantics,
+    # NOTCONST if it depends on anything else or raises
+    kind = type(node)
+    try:
+        if kind == ast.AstConst:
+            return node.value
+        elif kind == ast.AstUnaryOper:
+            value = evaluate(node.expr)
+            if value is not NOTCONST:
+                return tc.unary_oper[node.operator](value)
+        elif kind == ast.AstBinaryOper:
+            left = evaluate(node.left)
+            right = evaluate(node.right)
+            if left is not NOTCONST and right is not NOTCONST:
+                return tc.binary_oper[node.operator](left, right)
+    except Exception:
+        pass
+    return NOTCONST
+
+
+class ConstFold(Pass):
+    # folds unary and binary operators on constants; results that would
+    # not have a blang type at runtime (plain bool, str) are left alone,
+    # a plain float only differs from TypeFloat by its name and is boxed
+    name = "fold"
+
+    def fold(self, node):
+        value = evaluate(node)
+        if type(value) == float:
+            value = tc.TypeFloat(value)
+        if type(value) not in const_types:
+            return node
+        self.count("folds")
+        return ast.AstConst(value)
+
+    def visit_AstUnaryOper(self, node: ast.AstUnaryOper):
+        node.expr = self.visit(node.expr)
+        if type(node.expr) != ast.AstConst:
+            return node
+        return self.fold(node)
+
+    def visit_AstBinaryOper(self, node: ast.AstBinaryOper):
+        node.left = self.visit(node.left)
+        node.right = self.visit(node.right)
+        if type(node.left) != ast.AstConst or type(node.right) != ast.AstConst:
+            return node
+        return self.fold(node)
+
+
+class ConstProp(ConstFold):
+    # replaces the uses of a variable by its value when the variable is
+    # declared once with ':=' at the top level of its function (or the
+    # program) from a constant and never assigned; only the uses after the
+    # declaration are replaced and the expressions that get constant are
+    # folded, so chains of such declarations are followed
+    # class bodies are left alone, their members are written through objects
+    name = "constprop"
+
+    def __init__(self, **options):
+        super().__init__(**options)
+        self.consts = {}
+
+    def candidates(self, body):
+        decls = {}
+        written = set()
+        for node in scope_nodes(body):
+            if type(node) == ast.AstVarDecl:
+                decls[node.varname] = decls.get(node.varname, 0) + 1
+                if not node.autoType:
+                    written.add(node.varname)
+            elif type(node) == ast.AstAssign and type(node.lvalue) == ast.AstField:
+                written.add(node.lvalue.name)
+        return {
+            name for name, count in decls.items() if count == 1 and name not in written
+        }
+
+    def scope(self, body):
+        consts, self.consts = self.consts, {}
+        candidates = self.candidates(body)
+        stats = body.body if type(body) == ast.AstStatList else [body]
+        for i, stat in enumerate(stats):
+            stats[i] = stat = self.visit(stat)
+            if (
+                type(stat) == ast.AstVarDecl
+                and stat.varname in candidates
+                and type(stat.expr) == ast.AstConst
+            ):
+                self.consts[stat.varname] = stat.expr.value
+        self.consts = consts
+        return stats[0] if type(body) != ast.AstStatList else body
+
+    def visit_AstProgram(self, node: ast.AstProgram):
+        node.body = self.scope(node.body)
+        return node
+
+    def visit_AstFuncDecl(self, node: ast.AstFuncDecl):
+        inFunction, self.inFunction = self.inFunction, True
+        node.body = self.scope(node.body)
+        self.inFunction = inFunction
+        return node
+
+    def visit_AstClassDecl(self, node: ast.AstClassDecl):
+        consts, self.consts = self.consts, {}
+        node = super().visit_AstClassDecl(node)
+        self.consts = consts
+        return node
+
+    def visit_AstField(self, node: ast.AstField):
+        value = self.consts.get(node.name)
+        if value is None:
+            return node
+        self.count("propagated")
+        return ast.AstConst(value)
+
+
+class BranchElim(Pass):
+    # replaces an 'if' with a constant condition by the branch it takes
+    # and drops 'while' loops whose condition is constant false
+    name = "branches"
+
+    def statements(self, stats):
+        result = []
+        for stat in stats:
+            stat = self.visit(stat)
+            if type(stat) == ast.AstStatList:
+                result.extend(stat.body)
+            elif type(stat) != ast.AstNode:
+                result.append(stat)
+        return result
+
+    def visit_AstIf(self, node: ast.AstIf):
+        node = super().visit_AstIf(node)
+        value = evaluate(node.condition)
+        if value is NOTCONST:
+            return node
+        self.count("branches removed")
+        taken, dropped = (node.then, node.else_) if value else (node.else_, node.then)
+        stats = self.removed(dropped) if dropped else []
+        if taken is not None:
+            stats.append(taken)
+        return self.replace(stats) if stats else ast.AstNode()
+
+    def visit_AstWhile(self, node: ast.AstWhile):
+        node = super().visit_AstWhile(node)
+        value = evaluate(node.condition)
+        if value is NOTCONST or value:
+            return node
+        self.count("loops removed")
+        stats = self.removed(node.body)
+        return self.replace(stats) if stats else ast.AstNode()
+
+
+class DeadCode(Pass):
+    # drops the statements after one that always returns
+    name = "deadcode"
+
+    def statements(self, stats):
+        result = []
+        for i, stat in enumerate(stats):
+            result.append(self.visit(stat))
+            if returns(stat):
+                for dead in stats[i + 1 :]:
+                    kept = self.removed(dead)
+                    if dead not in kept:
+                        self.count("statements removed")
+                    result.extend(kept)
+                break
+        return result
+
+
+def pure(node):
+    # an expression without side effects, it can be evaluated any number of times
+    kind = type(node)
+    if kind in (ast.AstConst, ast.AstField):
+        return True
+    elif kind == ast.AstUnaryOper:
+        return pure(node.expr)
+    elif kind == ast.AstBinaryOper:
+        return pure(node.left) and pure(node.right)
+    elif kind == ast.AstIndex:
+        return pure(node.point) and pure(node.index)
+    elif kind == ast.AstMbrSel:
+        return type(node.member) == ast.AstField and pure(node.object)
+    return False
+
+
+def called(node):
+    # names of the functions called anywhere below node
+    names = set()
+    for child in children(node):
+        if type(child) == ast.AstFuncCall:
+            names.add(child.name)
+        names |= called(child)
+    return names
+
+
+def rename(node, names):
+    # renames the variables of a copied function body in place
+    kind = type(node)
+    if kind == ast.AstField:
+        node.name = names.get(node.name, node.name)
+        return
+    elif kind == ast.AstVarDecl:
+        node.varname = names.get(node.varname, node.varname)
+    elif kind == ast.AstMbrSel:
+        # the member is a name in the object, not a variable
+        rename(node.object, names)
+        if type(node.member) == ast.AstFuncCall:
+            rename(node.member, names)
+        return
+    for child in children(node):
+        rename(child, names)
+
+
+class Inline(Pass):
+    # replaces calls of small global functions by their body
+    # a function is inlined when it is declared once at the top level of
+    # the program, can not reach itself through calls, has no nested defs
+    # or classes, does not use 'this' and its body has at most 'threshold'
+    # nodes; the call has to pass as many arguments as there are parameters
+    # and must not come before the def in the program or from a class body
+    # - a body that is a single 'ret expr' replaces a call with pure
+    #   arguments by expr with the parameters replaced by the arguments
+    # - otherwise a call that is a statement, a declaration, an assignment
+    #   or a 'ret' expression is replaced by declarations of the renamed
+    #   parameters, the renamed body and the value of its final 'ret'
+    name = "inline"
+    threshold = 24
+
+    def __init__(self, inlineThreshold=threshold, **options):
+        super().__init__(**options)
+        self.threshold = inlineThreshold
+        self.functions = {}
+        # inlined function -> the names its body calls
+        self.calls = {}
+        self.defined = set()
+        # nested defs of the enclosing functions hide the global functions
+        self.hidden = []
+        self.caller = "<program>"
+        self.inClass = False
+        self.programBody = None
+
+    def candidates(self, program: ast.AstProgram):
+        body = program.body
+        stats = body.body if type(body) == ast.AstStatList else [body]
+        decls = {stat.name: stat for stat in stats if type(stat) == ast.AstFuncDecl}
+        count = {}
+        self.countDefs(program, count)
+        calls = {name: called(func.body) for name, func in decls.items()}
+        for name, func in decls.items():
+            if (
+                count[name] == 1
+                and not self.recursive(name, calls)
+                and self.inlinable(func)
+            ):
+                self.functions[name] = func
+                self.calls[name] = calls[name]
+
+    def countDefs(self, node, count):
+        if type(node) == ast.AstFuncDecl:
+            count[node.name] = count.get(node.name, 0) + 1
+        for child in children(node):
+            self.countDefs(child, count)
+
+    def recursive(self, name, calls):
+        seen = set()
+        todo = list(calls[name])
+        while todo:
+            callee = todo.pop()
+            if callee == name:
+                return True
+            if callee not in seen:
+                seen.add(callee)
+                todo.extend(calls.get(callee, ()))
+        return False
+
+    def inlinable(self, func: ast.AstFuncDecl):
+        if count_nodes(func.body) > self.threshold:
+            return False
+        stats = func.body.body if type(func.body) == ast.AstStatList else [func.body]
+        names = {param.name for param in func.params or ()}
+        for node in scope_nodes(func.body):
+            kind = type(node)
+            if kind in (ast.AstFuncDecl, ast.AstClassDecl):
+                return False
+            elif kind == ast.AstRet and node is not stats[-1]:
+                return False
+            elif kind == ast.AstVarDecl:
+                names.add(node.varname)
+        for node in scope_nodes(func.body):
+            if type(node) == ast.AstField and node.name not in names:
+                # 'this' or a name the resolver will report
+                return False
+        return True
+
+    def expression(self, func: ast.AstFuncDecl):
+        # the expression of a body that only returns it
+        stats = func.body.body if type(func.body) == ast.AstStatList else [func.body]
+        if len(stats) != 1 or type(stats[0]) != ast.AstRet or stats[0].expr is None:
+            return None
+        if any(type(node) == ast.AstAssign for node in scope_nodes(stats[0])):
+            return None
+        return stats[0].expr
+
+    def callee(self, node: ast.AstFuncCall):
+        func = self.functions.get(node.name)
+        if func is None or self.inClass:
+            return None
+        # the copied body resolves its calls at the call site, a nested def
+        # there must not capture them
+        names = self.calls[node.name] | {node.name}
+        if any(names & hidden for hidden in self.hidden):
+            return None
+        if not self.inFunction and node.name not in self.defined:
+            return None
+        if len(node.params) != len(func.params or ()):
+            return None
+        return func
+
+    def site(self, func, form):
+        self.count("call sites")
+        self.details.append(f"{func.name} into {self.caller} ({form})")
+        return self.stats["call sites"]
+
+    def visit_AstProgram(self, node: ast.AstProgram):
+        self.candidates(node)
+        self.programBody = node.body
+        return super().visit_AstProgram(node)
+
+    def visit_AstFuncDecl(self, node: ast.AstFuncDecl):
+        caller, self.caller = self.caller, node.name
+        inClass, self.inClass = self.inClass, False
+        hidden = {
+            child.name
+            for child in scope_nodes(node.body)
+            if type(child) == ast.AstFuncDecl
+        }
+        self.hidden.append(hidden)
+        node = super().visit_AstFuncDecl(node)
+        self.hidden.pop()
+        self.caller, self.inClass = caller, inClass
+        return node
+
+    def visit_AstClassDecl(self, node: ast.AstClassDecl):
+        inClass, self.inClass = self.inClass, True
+        node = super().visit_AstClassDecl(node)
+        self.inClass = inClass
+        return node
+
+    def visit_AstStatList(self, node: ast.AstStatList):
+        top = node is self.programBody
+        result = []
+        for stat in node.body:
+            stat = self.visit(stat)
+            result.extend(self.inlineStatement(stat))
+            if top and type(stat) == ast.AstFuncDecl:
+                self.defined.add(stat.name)
+        node.body = result
+        return node
+
+    def visit_AstFuncCall(self, node: ast.AstFuncCall):
+        node = super().visit_AstFuncCall(node)
+        func = self.callee(node)
+        if func is None:
+            return node
+        expr = self.expression(func)
+        if expr is None or not self.substitutable(node.params, expr):
+            return node
+        self.site(func, "expression")
+        expr = copy.deepcopy(expr)
+        args = {param.name: arg for param, arg in zip(func.params or (), node.params)}
+        return self.substitute(expr, args)
+
+    def substitutable(self, args, expr):
+        # the arguments are read where the parameters are used, after the
+        # calls of expr: a constant always reads the same, a variable only
+        # when expr calls nothing that could write it; other arguments are
+        # bound to the parameters by the statement form
+        for arg in args:
+            if type(arg) == ast.AstField:
+                if called(expr):
+                    return False
+            elif type(arg) != ast.AstConst:
+                return False
+        return True
+
+    def substitute(self, node, args):
+        if type(node) == ast.AstField:
+            arg = args.get(node.name)
+            return copy.deepcopy(arg) if arg is not None else node
+        if type(node) == ast.AstMbrSel:
+            node.object = self.substitute(node.object, args)
+            if type(node.member) == ast.AstFuncCall:
+                self.substitute(node.member, args)
+            return node
+        for name in ("expr", "left", "right", "point", "index"):
+            if getattr(node, name, None) is not None:
+                setattr(node, name, self.substitute(getattr(node, name), args))
+        if type(node) == ast.AstFuncCall:
+            node.params = [self.substitute(param, args) for param in node.params]
+        return node
+
+    def inlineStatement(self, stat):
+        kind = type(stat)
+        if kind == ast.AstFuncCall:
+            call = stat
+        elif kind in (ast.AstVarDecl, ast.AstAssign, ast.AstRet):
+            call = stat.expr
+        else:
+            return [stat]
+        if type(call) != ast.AstFuncCall:
+            return [stat]
+        func = self.callee(call)
+        if func is None:
+            return [stat]
+        body = copy.deepcopy(func.body)
+        stats = body.body if type(body) == ast.AstStatList else [body]
+        ret = stats.pop() if stats and type(stats[-1]) == ast.AstRet else None
+        if kind != ast.AstFuncCall and (ret is None or ret.expr is None):
+            # the call value would be None
+            return [stat]
+        n = self.site(func, "statement")
+        names = {}
+        for node in scope_nodes(body):
+            if type(node) == ast.AstVarDecl:
+                names[node.varname] = f"{node.varname}@{func.name}{n}"
+        params = func.params or ()
+        for param in params:
+            names[param.name] = f"{param.name}@{func.name}{n}"
+        rename(body, names)
+        if ret is not None and ret.expr is not None:
+            rename(ret.expr, names)
+        result = [
+            ast.AstVarDecl(names[param.name], arg)
+            for param, arg in zip(params, call.params)
+        ]
+        result.extend(inlined for inlined in stats if type(inlined) != ast.AstNode)
+        if kind == ast.AstFuncCall:
+            if ret is not None and ret.expr is not None and not pure(ret.expr):
+                result.append(ret.expr)
+        else:
+            stat.expr = ret.expr
+            result.append(stat)
+        return result
+
+
+def written(node):
+    # names declared or assigned below node, nested functions and classes excluded
+    names = {}
+    for child in scope_nodes(node):
+        if type(child) == ast.AstVarDecl:
+            names[child.varname] = names.get(child.varname, 0) + 1
+        elif type(child) == ast.AstAssign and type(child.lvalue) == ast.AstField:
+            names[child.lvalue.name] = names.get(child.lvalue.name, 0) + 1
+    return names
+
+
+def invariant(node, variant):
+    # an operator tree over constants and variables that the loop does not write
+    kind = type(node)
+    if kind == ast.AstConst:
+        return True
+    elif kind == ast.AstField:
+        return node.name not in variant
+    elif kind == ast.AstUnaryOper:
+        return invariant(node.expr, variant)
+    elif kind == ast.AstBinaryOper:
+        return invariant(node.left, variant) and invariant(node.right, variant)
+    return False
+
+
+def leaves_loop(node):
+    # True when node has a 'ret' or a loop, the statements after it may
+    # not run in an iteration
+    return any(type(child) in (ast.AstRet, ast.AstWhile) for child in scope_nodes(node))
+
+
+def calls(node):
+    # True when node calls a function or a method, its effects are visible
+    return any(type(child) == ast.AstFuncCall for child in scope_nodes(node))
+
+
+def key(node):
+    return json.dumps(node.to_json(), sort_keys=True)
+
+
+class Hoister(Pass):
+    # replaces the invariant operator trees of the parts of a loop that run
+    # in every iteration by temporaries, 'temps' maps the tree to its name
+    def __init__(self, variant, temps, newName):
+        super().__init__()
+        self.variant = variant
+        self.temps = temps
+        self.newName = newName
+
+    def hoist(self, node):
+        name = key(node)
+        if name not in self.temps:
+            self.temps[name] = (self.newName(), node)
+        return ast.AstField(self.temps[name][0])
+
+    def visit_AstUnaryOper(self, node: ast.AstUnaryOper):
+        if invariant(node, self.variant):
+            return self.hoist(node)
+        return super().visit_AstUnaryOper(node)
+
+    def visit_AstBinaryOper(self, node: ast.AstBinaryOper):
+        if invariant(node, self.variant):
+            return self.hoist(node)
+        return super().visit_AstBinaryOper(node)
+
+    def visit_AstIf(self, node: ast.AstIf):
+        # only the condition runs every time
+        node.condition = self.visit(node.condition)
+        return node
+
+    def visit_AstWhile(self, node: ast.AstWhile):
+        node.condition = self.visit(node.condition)
+        return node
+
+    def visit_AstFuncDecl(self, node: ast.AstFuncDecl):
+        return node
+
+    def visit_AstClassDecl(self, node: ast.AstClassDecl):
+        return node
+
+
+class LoopPass(Pass):
+    # base of the passes that rewrite a 'while' together with the
+    # statements before it, loops in class bodies are left alone since
+    # calls can write the members
+    def __init__(self, **options):
+        super().__init__(**options)
+        self.inClass = False
+        self.temps = 0
+
+    def newName(self, prefix):
+        self.temps += 1
+        return f"{prefix}@{self.temps}"
+
+    def statements(self, stats):
+        result = []
+        for stat in stats:
+            stat = self.visit(stat)
+            if type(stat) == ast.AstWhile and not self.inClass:
+                result.extend(self.loop(stat, result))
+            else:
+                result.append(stat)
+        return result
+
+    def loop(self, node: ast.AstWhile, previous):
+        return [node]
+
+    def visit_AstFuncDecl(self, node: ast.AstFuncDecl):
+        inClass, self.inClass = self.inClass, False
+        node = super().visit_AstFuncDecl(node)
+        self.inClass = inClass
+        return node
+
+    def visit_AstClassDecl(self, node: ast.AstClassDecl):
+        inClass, self.inClass = self.inClass, True
+        node = super().visit_AstClassDecl(node)
+        self.inClass = inClass
+        return node
+
+
+class LoopInvariant(LoopPass):
+    # loop invariant code motion: operator trees over constants and
+    # variables the loop does not write are computed once before the loop
+    # only the condition and the body statements that run in every
+    # iteration are searched, up to the first one that can leave the
+    # iteration and before the first call (a hoisted division by zero must
+    # not raise before the output of an earlier statement); the loop
+    # condition has to be pure and guards the computation, so nothing new
+    # is evaluated when the loop does not run
+    #   if (cond) { inv@1 := expr  while (cond) ... }
+    name = "licm"
+
+    def loop(self, node: ast.AstWhile, previous):
+        if not pure(node.condition):
+            return [node]
+        guard = copy.deepcopy(node.condition)
+        temps = {}
+        hoister = Hoister(written(node), temps, lambda: self.newName("inv"))
+        node.condition = hoister.visit(node.condition)
+        stats = node.body.body if type(node.body) == ast.AstStatList else [node.body]
+        for i, stat in enumerate(stats):
+            if calls(stat):
+                break
+            if type(stat) in (ast.AstIf, ast.AstWhile):
+                stats[i] = hoister.visit(stat)
+            elif not leaves_loop(stat):
+                stats[i] = hoister.visit(stat)
+            if leaves_loop(stat):
+                break
+        if type(node.body) != ast.AstStatList:
+            node.body = stats[0]
+        if not temps:
+            return [node]
+        self.count("hoisted", len(temps))
+        self.count("loops")
+        body = [ast.AstVarDecl(name, expr) for name, expr in temps.values()]
+        body.append(node)
+        return [ast.AstIf(guard, self.replace(body))]
+
+
+class StrengthReduce(LoopPass):
+    # an induction variable 'i' of a loop is an int variable the loop only
+    # writes with 'i = i + c' or 'i = i - c' in a statement of its body;
+    # 'i * k' (c and k int constants) used more than once in the loop is
+    # replaced by a variable that starts at i * k and is increased by c * k
+    # right after i; i has to be set to an int constant before the loop
+    name = "strength"
+
+    def loop(self, node: ast.AstWhile, previous):
+        writes = written(node)
+        stats = node.body.body if type(node.body) == ast.AstStatList else [node.body]
+        steps = {}
+        for stat in stats:
+            step = self.step(stat)
+            if step and writes[step[0]] == 1 and self.intBefore(step[0], previous):
+                steps[step[0]] = (stat, step[1])
+        if not steps:
+            return [node]
+        uses = {}
+        for child in scope_nodes(node):
+            product = self.product(child, steps)
+            if product:
+                uses[product] = uses.get(product, 0) + 1
+        reduced = {}
+        before = []
+        for (name, factor), count in uses.items():
+            if count < 2:
+                continue
+            temp = reduced[name, factor] = self.newName(f"{name}*{factor}")
+            before.append(
+                ast.AstVarDecl(
+                    temp,
+                    ast.AstBinaryOper(
+                        "*", ast.AstField(name), ast.AstConst(tc.TypeInt(factor))
+                    ),
+                )
+            )
+            stat, step = steps[name]
+            update = ast.AstAssign(
+                ast.AstField(temp),
+                ast.AstBinaryOper(
+                    "+", ast.AstField(temp), ast.AstConst(tc.TypeInt(step * factor))
+                ),
+            )
+            stats.insert(stats.index(stat) + 1, update)
+        if not reduced:
+            return [node]
+        if type(node.body) != ast.AstStatList:
+            node.body = self.replace(stats)
+        self.count("reduced", len(reduced))
+        Replacer(self, steps, reduced).visit(node)
+        return before + [node]
+
+    def step(self, stat):
+        # (name, c) of 'name = name + c'
+        if type(stat) != ast.AstAssign or type(stat.lvalue) != ast.AstField:
+            return None
+        expr = stat.expr
+        if (
+            type(expr) != ast.AstBinaryOper
+            or expr.operator not in ("+", "-")
+            or type(expr.left) != ast.AstField
+            or expr.left.name != stat.lvalue.name
+            or type(expr.right) != ast.AstConst
+            or type(expr.right.value) != tc.TypeInt
+        ):
+            return None
+        step = int(expr.right.value)
+        return (stat.lvalue.name, step if expr.operator == "+" else -step)
+
+    def intBefore(self, name, previous):
+        # the last statement before the loop that writes name sets an int constant
+        for stat in reversed(previous):
+            if type(stat) == ast.AstVarDecl and stat.varname == name:
+                expr = stat.expr
+                explicit = not stat.autoType and stat.varType != "int"
+            elif (
+                type(stat) == ast.AstAssign
+                and type(stat.lvalue) == ast.AstField
+                and stat.lvalue.name == name
+            ):
+                expr, explicit = stat.expr, False
+            elif name in written(stat):
+                return False
+            else:
+                continue
+            return (
+                not explicit
+                and type(expr) == ast.AstConst
+                and type(expr.value) == tc.TypeInt
+            )
+        return False
+
+    def product(self, node, steps):
+        # (name, k) of 'name * k' or 'k * name'
+        if type(node) != ast.AstBinaryOper or node.operator != "*":
+            return None
+        for var, factor in ((node.left, node.right), (node.right, node.left)):
+            if (
+                type(var) == ast.AstField
+                and var.name in steps
+                and type(factor) == ast.AstConst
+                and type(factor.value) == tc.TypeInt
+            ):
+                return (var.name, int(factor.value))
+        return None
+
+
+class Replacer(Pass):
+    # replaces the reduced products of StrengthReduce by their variable
+    def __init__(self, owner, steps, reduced):
+        super().__init__()
+        self.owner = owner
+        self.steps = steps
+        self.reduced = reduced
+
+    def visit_AstBinaryOper(self, node: ast.AstBinaryOper):
+        product = self.owner.product(node, self.steps)
+        if product in self.reduced:
+            return ast.AstField(self.reduced[product])
+        return super().visit_AstBinaryOper(node)
+
+    def visit_AstFuncDecl(self, node: ast.AstFuncDecl):
+        return node
+
+    def visit_AstClassDecl(self, node: ast.AstClassDecl):
+        return node
+
+
+# in the order they run
+passes = {
+    ConstFold.name: ConstFold,
+    Inline.name: Inline,
+    ConstProp.name: ConstProp,
+    StrengthReduce.name: StrengthReduce,
+    LoopInvariant.name: LoopInvariant,
+    BranchElim.name: BranchElim,
+    DeadCode.name: DeadCode,
+}
+
+
+class Pipeline:
+    def __init__(self, disabled=(), report=True, **options):
+        self.passes = [
+            cls(**options) for name, cls in passes.items() if name not in disabled
+        ]
+        # (pass name, nodes before, nodes after, stats), counting the nodes
+        # costs more than the passes on small trees
+        self.report = [] if report else None
+
+    def run(self, node: ast.AstProgram):
+        for opt in self.passes:
+            if self.report is None:
+                node = opt.visit(node)
+                continue
+            before = count_nodes(node)
+            node = opt.visit(node)
+            self.report.append((opt.name, before, count_nodes(node), opt.stats))
+        return node
+
+    def formatReport(self):
+        lines = [f"{'pass':<12}{'nodes':>8}{'after':>8}  effect"]
+        for name, before, after, stats in self.report:
+            effect = ", ".join(f"{what} {n}" for what, n in stats.items()) or "-"
+            lines.append(f"{name:<12}{before:>8}{after:>8}  {effect}")
+        for opt in self.passes:
+            lines.extend(f"  {opt.name}: {detail}" for detail in opt.details)
+        return "\n".join(lines)
+
+
+def optimize(node: ast.AstProgram, disabled=(), **options):
+    return Pipeline(disabled, **options).run(node)
@@ -0,0 +1,84 @@
+
+# parsetab.py
+# This file is automatically generated. Do not edit.
+# pylint: disable=W,C,R
+_tabversion = '3.10'
+
+_lr_method = 'LALR'
+
+_lr_signature = 'programnonassocLOWER_THAN_ELSEnonassocELSEleftASSIGNleftOPERLV3leftOPERLV2leftOPERLV1leftOPERLV0leftLPARENRPARENleftLCURLYRCURLYleftCOMMArightUNARYASSIGN CLASS COLON COMMA CONST DEF DOT ELSE END FIELD IF LCURLY LPAREN LSQUARE OPERLV0 OPERLV1 OPERLV2 OPERLV3 RCURLY RET RPAREN RSQUARE UNARY WHILEprogram : stat_liststat_list : END\n    | stat\n    | stat_list stat\n    | stat_list ENDstat : stat_expr\n    | stat_ret\n    | stat_if\n    | stat_loops\n    | stat_compound\n    | func_decl\n    | class_declstat_compound : LCURLY RCURLY\n    | LCURLY stat_list RCURLYclass_decl : CLASS FIELD stat_compoundmbr_sel : FIELD DOT FIELD\n    | FIELD DOT func_callparams_list : FIELD\n    | params_list COMMA FIELDfunc_decl : DEF FIELD LPAREN params_list RPAREN stat_compound\n    | DEF FIELD LPAREN RPAREN stat_compoundstat_ret : RET stat_expr\n    | RET ENDvar_decl : FIELD COLON ASSIGN expr\n    | FIELD COLON FIELD ASSIGN exprstat_if : IF LPAREN expr RPAREN stat %prec LOWER_THAN_ELSE\n    | IF LPAREN expr RPAREN stat ELSE statstat_loops : WHILE LPAREN expr RPAREN statcall_params_list : expr\n    | call_params_list COMMA exprfunc_call : FIELD LPAREN call_params_list RPAREN\n    | FIELD LPAREN RPAREN\n    | FIELD single_valuestat_expr : expr END\n    | var_decl ENDexpr : expr ASSIGN expr\n    | expr_binary\n    | expr_unary\n    | expr_bracket\n    | expr_index\n    | single_valueexpr_binary : expr OPERLV3 expr\n    | expr OPERLV2 expr\n    | expr OPERLV1 expr\n    | expr OPERLV0 exprexpr_unary : UNARY expr %prec UNARY\n    | OPERLV1 expr %prec UNARYexpr_bracket : LPAREN expr RPARENexpr_index : FIELD LSQUARE expr RSQUAREsingle_value : CONST\n    | FIELD\n    | func_call\n    | mbr_sel\n    | expr_index'
+    
+_lr_action_items = {'END':([0,2,3,4,5,6,7,8,9,10,11,12,13,14,18,20,22,23,24,25,26,29,30,31,32,33,34,40,41,42,45,47,48,50,54,56,58,59,60,61,62,63,64,66,68,74,76,77,78,85,86,87,89,90,93,94,97,99,],[3,33,-2,-3,-6,-7,-8,-9,-10,-11,-12,34,40,42,3,-51,-37,-38,-39,-40,-41,-50,-52,-53,-4,-5,-34,-35,-22,-23,-51,-13,33,-51,-33,-54,-47,-46,-36,-42,-43,-44,-45,-48,-14,-32,-16,-17,-15,-24,-49,-31,-26,-28,-21,-25,-20,-27,]),'RET':([0,2,3,4,5,6,7,8,9,10,11,18,32,33,34,40,41,42,47,48,68,78,79,80,89,90,93,96,97,99,],[14,14,-2,-3,-6,-7,-8,-9,-10,-11,-12,14,-4,-5,-34,-35,-22,-23,-13,14,-14,-15,14,14,-26,-28,-21,14,-20,-27,]),'IF':([0,2,3,4,5,6,7,8,9,10,11,18,32,33,34,40,41,42,47,48,68,78,79,80,89,90,93,96,97,99,],[15,15,-2,-3,-6,-7,-8,-9,-10,-11,-12,15,-4,-5,-34,-35,-22,-23,-13,15,-14,-15,15,15,-26,-28,-21,15,-20,-27,]),'WHILE':([0,2,3,4,5,6,7,8,9,10,11,18,32,33,34,40,41,42,47,48,68,78,79,80,89,90,93,96,97,99,],[17,17,-2,-3,-6,-7,-8,-9,-10,-11,-12,17,-4,-5,-34,-35,-22,-23,-13,17,-14,-15,17,17,-26,-28,-21,17,-20,-27,]),'LCURLY':([0,2,3,4,5,6,7,8,9,10,11,18,32,33,34,40,41,42,47,48,57,68,78,79,80,83,89,90,91,93,96,97,99,],[18,18,-2,-3,-6,-7,-8,-9,-10,-11,-12,18,-4,-5,-34,-35,-22,-23,-13,18,18,-14,-15,18,18,18,-26,-28,18,-21,18,-20,-27,]),'DEF':([0,2,3,4,5,6,7,8,9,10,11,18,32,33,34,40,41,42,47,48,68,78,79,80,89,90,93,96,97,99,],[19,19,-2,-3,-6,-7,-8,-9,-10,-11,-12,19,-4,-5,-34,-35,-22,-23,-13,19,-14,-15,19,19,-26,-28,-21,19,-20,-27,]),'CLASS':([0,2,3,4,5,6,7,8,9,10,11,18,32,33,34,40,41,42,47,48,68,78,79,80,89,90,93,96,97,99,],[21,21,-2,-3,-6,-7,-8,-9,-10,-11,-12,21,-4,-5,-34,-35,-22,-23,-13,21,-14,-15,21,21,-26,-28,-21,21,-20,-27,]),'FIELD':([0,2,3,4,5,6,7,8,9,10,11,14,16,18,19,20,21,27,28,32,33,34,35,36,37,38,39,40,41,42,43,45,46,47,48,50,51,52,53,55,68,69,71,76,78,79,80,84,88,89,90,92,93,96,97,99,],[20,20,-2,-3,-6,-7,-8,-9,-10,-11,-12,20,45,20,49,50,57,45,45,-4,-5,-34,45,45,45,45,45,-35,-22,-23,45,50,45,-13,20,50,70,45,45,76,-14,81,45,50,-15,20,20,45,45,-26,-28,98,-21,20,-20,-27,]),'UNARY':([0,2,3,4,5,6,7,8,9,10,11,14,16,18,27,28,32,33,34,35,36,37,38,39,40,41,42,43,46,47,48,52,53,68,71,78,79,80,84,88,89,90,93,96,97,99,],[28,28,-2,-3,-6,-7,-8,-9,-10,-11,-12,28,28,28,28,28,-4,-5,-34,28,28,28,28,28,-35,-22,-23,28,28,-13,28,28,28,-14,28,-15,28,28,28,28,-26,-28,-21,28,-20,-27,]),'OPERLV1':([0,2,3,4,5,6,7,8,9,10,11,12,14,16,18,20,22,23,24,25,26,27,28,29,30,31,32,33,34,35,36,37,38,39,40,41,42,43,44,45,46,47,48,50,52,53,54,56,58,59,60,61,62,63,64,65,66,67,68,71,72,74,75,76,77,78,79,80,84,85,86,87,88,89,90,93,94,95,96,97,99,],[27,27,-2,-3,-6,-7,-8,-9,-10,-11,-12,38,27,27,27,-51,-37,-38,-39,-40,-41,27,27,-50,-52,-53,-4,-5,-34,27,27,27,27,27,-35,-22,-23,27,38,-51,27,-13,27,-51,27,27,-33,-54,-47,-46,38,38,38,-44,-45,38,-48,38,-14,27,38,-32,38,-16,-17,-15,27,27,27,38,-49,-31,27,-26,-28,-21,38,38,27,-20,-27,]),'LPAREN':([0,2,3,4,5,6,7,8,9,10,11,14,15,16,17,18,20,27,28,32,33,34,35,36,37,38,39,40,41,42,43,45,46,47,48,49,50,52,53,68,71,76,78,79,80,84,88,89,90,93,96,97,99,],[16,16,-2,-3,-6,-7,-8,-9,-10,-11,-12,16,43,16,46,16,53,16,16,-4,-5,-34,16,16,16,16,16,-35,-22,-23,16,53,16,-13,16,69,53,16,16,-14,16,53,-15,16,16,16,16,-26,-28,-21,16,-20,-27,]),'CONST':([0,2,3,4,5,6,7,8,9,10,11,14,16,18,20,27,28,32,33,34,35,36,37,38,39,40,41,42,43,45,46,47,48,50,52,53,68,71,76,78,79,80,84,88,89,90,93,96,97,99,],[29,29,-2,-3,-6,-7,-8,-9,-10,-11,-12,29,29,29,29,29,29,-4,-5,-34,29,29,29,29,29,-35,-22,-23,29,29,29,-13,29,29,29,29,-14,29,29,-15,29,29,29,29,-26,-28,-21,29,-20,-27,]),'$end':([1,2,3,4,5,6,7,8,9,10,11,32,33,34,40,41,42,47,68,78,89,90,93,97,99,],[0,-1,-2,-3,-6,-7,-8,-9,-10,-11,-12,-4,-5,-34,-35,-22,-23,-13,-14,-15,-26,-28,-21,-20,-27,]),'RCURLY':([3,4,5,6,7,8,9,10,11,18,32,33,34,40,41,42,47,48,68,78,89,90,93,97,99,],[-2,-3,-6,-7,-8,-9,-10,-11,-12,47,-4,-5,-34,-35,-22,-23,-13,68,-14,-15,-26,-28,-21,-20,-27,]),'ELSE':([5,6,7,8,9,10,11,34,40,41,42,47,68,78,89,90,93,97,99,],[-6,-7,-8,-9,-10,-11,-12,-34,-35,-22,-23,-13,-14,-15,96,-28,-21,-20,-27,]),'ASSIGN':([12,20,22,23,24,25,26,29,30,31,44,45,50,51,54,56,58,59,60,61,62,63,64,65,66,67,70,72,74,75,76,77,85,86,87,94,95,],[35,-51,-37,-38,-39,-40,-41,-50,-52,-53,35,-51,-51,71,-33,-54,-47,-46,-36,-42,-43,-44,-45,35,-48,35,84,35,-32,35,-16,-17,35,-49,-31,35,35,]),'OPERLV3':([12,20,22,23,24,25,26,29,30,31,44,45,50,54,56,58,59,60,61,62,63,64,65,66,67,72,74,75,76,77,85,86,87,94,95,],[36,-51,-37,-38,-39,-40,-41,-50,-52,-53,36,-51,-51,-33,-54,-47,-46,36,-42,-43,-44,-45,36,-48,36,36,-32,36,-16,-17,36,-49,-31,36,36,]),'OPERLV2':([12,20,22,23,24,25,26,29,30,31,44,45,50,54,56,58,59,60,61,62,63,64,65,66,67,72,74,75,76,77,85,86,87,94,95,],[37,-51,-37,-38,-39,-40,-41,-50,-52,-53,37,-51,-51,-33,-54,-47,-46,37,37,-43,-44,-45,37,-48,37,37,-32,37,-16,-17,37,-49,-31,37,37,]),'OPERLV0':([12,20,22,23,24,25,26,29,30,31,44,45,50,54,56,58,59,60,61,62,63,64,65,66,67,72,74,75,76,77,85,86,87,94,95,],[39,-51,-37,-38,-39,-40,-41,-50,-52,-53,39,-51,-51,-33,-54,-47,-46,39,39,39,39,-45,39,-48,39,39,-32,39,-16,-17,39,-49,-31,39,39,]),'COLON':([20,],[51,]),'LSQUARE':([20,45,50,],[52,52,52,]),'DOT':([20,45,50,],[55,55,55,]),'RPAREN':([22,23,24,25,26,29,30,31,44,45,50,53,54,56,58,59,60,61,62,63,64,65,66,67,69,73,74,75,76,77,81,82,86,87,95,98,],[-37,-38,-39,-40,-41,-50,-52,-53,66,-51,-51,74,-33,-54,-47,-46,-36,-42,-43,-44,-45,79,-48,80,83,87,-32,-29,-16,-17,-18,91,-49,-31,-30,-19,]),'RSQUARE':([22,23,24,25,26,29,30,31,45,50,54,56,58,59,60,61,62,63,64,66,72,74,76,77,86,87,],[-37,-38,-39,-40,-41,-50,-52,-53,-51,-51,-33,-54,-47,-46,-36,-42,-43,-44,-45,-48,86,-32,-16,-17,-49,-31,]),'COMMA':([22,23,24,25,26,29,30,31,45,50,54,56,58,59,60,61,62,63,64,66,73,74,75,76,77,81,82,86,87,95,98,],[-37,-38,-39,-40,-41,-50,-52,-53,-51,-51,-33,-54,-47,-46,-36,-42,-43,-44,-45,-48,88,-32,-29,-16,-17,-18,92,-49,-31,-30,-19,]),}
+
+_lr_action = {}
+for _k, _v in _lr_action_items.items():
+   for _x,_y in zip(_v[0],_v[1]):
+      if not _x in _lr_action:  _lr_action[_x] = {}
+      _lr_action[_x][_k] = _y
+del _lr_action_items
+
+_lr_goto_items = {'program':([0,],[1,]),'stat_list':([0,18,],[2,48,]),'stat':([0,2,18,48,79,80,96,],[4,32,4,32,89,90,99,]),'stat_expr':([0,2,14,18,48,79,80,96,],[5,5,41,5,5,5,5,5,]),'stat_ret':([0,2,18,48,79,80,96,],[6,6,6,6,6,6,6,]),'stat_if':([0,2,18,48,79,80,96,],[7,7,7,7,7,7,7,]),'stat_loops':([0,2,18,48,79,80,96,],[8,8,8,8,8,8,8,]),'stat_compound':([0,2,18,48,57,79,80,83,91,96,],[9,9,9,9,78,9,9,93,97,9,]),'func_decl':([0,2,18,48,79,80,96,],[10,10,10,10,10,10,10,]),'class_decl':([0,2,18,48,79,80,96,],[11,11,11,11,11,11,11,]),'expr':([0,2,14,16,18,27,28,35,36,37,38,39,43,46,48,52,53,71,79,80,84,88,96,],[12,12,12,44,12,58,59,60,61,62,63,64,65,67,12,72,75,85,12,12,94,95,12,]),'var_decl':([0,2,14,18,48,79,80,96,],[13,13,13,13,13,13,13,13,]),'expr_binary':([0,2,14,16,18,27,28,35,36,37,38,39,43,46,48,52,53,71,79,80,84,88,96,],[22,22,22,22,22,22,22,22,22,22,22,22,22,22,22,22,22,22,22,22,22,22,22,]),'expr_unary':([0,2,14,16,18,27,28,35,36,37,38,39,43,46,48,52,53,71,79,80,84,88,96,],[23,23,23,23,23,23,23,23,23,23,23,23,23,23,23,23,23,23,23,23,23,23,23,]),'expr_bracket':([0,2,14,16,18,27,28,35,36,37,38,39,43,46,48,52,53,71,79,80,84,88,96,],[24,24,24,24,24,24,24,24,24,24,24,24,24,24,24,24,24,24,24,24,24,24,24,]),'expr_index':([0,2,14,16,18,20,27,28,35,36,37,38,39,43,45,46,48,50,52,53,71,76,79,80,84,88,96,],[25,25,25,25,25,56,25,25,25,25,25,25,25,25,56,25,25,56,25,25,25,56,25,25,25,25,25,]),'single_value':([0,2,14,16,18,20,27,28,35,36,37,38,39,43,45,46,48,50,52,53,71,76,79,80,84,88,96,],[26,26,26,26,26,54,26,26,26,26,26,26,26,26,54,26,26,54,26,26,26,54,26,26,26,26,26,]),'func_call':([0,2,14,16,18,20,27,28,35,36,37,38,39,43,45,46,48,50,52,53,55,71,76,79,80,84,88,96,],[30,30,30,30,30,30,30,30,30,30,30,30,30,30,30,30,30,30,30,30,77,30,30,30,30,30,30,30,]),'mbr_sel':([0,2,14,16,18,20,27,28,35,36,37,38,39,43,45,46,48,50,52,53,71,76,79,80,84,88,96,],[31,31,31,31,31,31,31,31,31,31,31,31,31,31,31,31,31,31,31,31,31,31,31,31,31,31,31,]),'call_params_list':([53,],[73,]),'params_list':([69,],[82,]),}
+
+_lr_goto = {}
+for _k, _v in _lr_goto_items.items():
+   for _x, _y in zip(_v[0], _v[1]):
+       if not _x in _lr_goto: _lr_goto[_x] = {}
+       _lr_goto[_x][_k] = _y
+del _lr_goto_items
+_lr_productions = [
+  ("S' -> program","S'",1,None,None,None),
+  ('program -> stat_list','program',1,'p_program','syntax.py',11),
+  ('stat_list -> END','stat_list',1,'p_stat_list','syntax.py',16),
+  ('stat_list -> stat','stat_list',1,'p_stat_list','syntax.py',17),
+  ('stat_list -> stat_list stat','stat_list',2,'p_stat_list','syntax.py',18),
+  ('stat_list -> stat_list END','stat_list',2,'p_stat_list','syntax.py',19),
+  ('stat -> stat_expr','stat',1,'p_stat','syntax.py',32),
+  ('stat -> stat_ret','stat',1,'p_stat','syntax.py',33),
+  ('stat -> stat_if','stat',1,'p_stat','syntax.py',34),
+  ('stat -> stat_loops','stat',1,'p_stat','syntax.py',35),
+  ('stat -> stat_compound','stat',1,'p_stat','syntax.py',36),
+  ('stat -> func_decl','stat',1,'p_stat','syntax.py',37),
+  ('stat -> class_decl','stat',1,'p_stat','syntax.py',38),
+  ('stat_compound -> LCURLY RCURLY','stat_compound',2,'p_stat_compound','syntax.py',47),
+  ('stat_compound -> LCURLY stat_list RCURLY','stat_compound',3,'p_stat_compound','syntax.py',48),
+  ('class_decl -> CLASS FIELD stat_compound','class_decl',3,'p_class_decl','syntax.py',56),
+  ('mbr_sel -> FIELD DOT FIELD','mbr_sel',3,'p_mbr_sel','syntax.py',61),
+  ('mbr_sel -> FIELD DOT func_call','mbr_sel',3,'p_mbr_sel','syntax.py',62),
+  ('params_list -> FIELD','params_list',1,'p_params_list','syntax.py',67),
+  ('params_list -> params_list COMMA FIELD','params_list',3,'p_params_list','syntax.py',68),
+  ('func_decl -> DEF FIELD LPAREN params_list RPAREN stat_compound','func_decl',6,'p_func_decl','syntax.py',76),
+  ('func_decl -> DEF FIELD LPAREN RPAREN stat_compound','func_decl',5,'p_func_decl','syntax.py',77),
+  ('stat_ret -> RET stat_expr','stat_ret',2,'p_stat_ret','syntax.py',85),
+  ('stat_ret -> RET END','stat_ret',2,'p_stat_ret','syntax.py',86),
+  ('var_decl -> FIELD COLON ASSIGN expr','var_decl',4,'p_var_decl','syntax.py',94),
+  ('var_decl -> FIELD COLON FIELD ASSIGN expr','var_decl',5,'p_var_decl','syntax.py',95),
+  ('stat_if -> IF LPAREN expr RPAREN stat','stat_if',5,'p_stat_if','syntax.py',103),
+  ('stat_if -> IF LPAREN expr RPAREN stat ELSE stat','stat_if',7,'p_stat_if','syntax.py',104),
+  ('stat_loops -> WHILE LPAREN expr RPAREN stat','stat_loops',5,'p_stat_loops','syntax.py',112),
+  ('call_params_list -> expr','call_params_list',1,'p_call_params_list','syntax.py',118),
+  ('call_params_list -> call_params_list COMMA expr','call_params_list',3,'p_call_params_list','syntax.py',119),
+  ('func_call -> FIELD LPAREN call_params_list RPAREN','func_call',4,'p_func_call','syntax.py',127),
+  ('func_call -> FIELD LPAREN RPAREN','func_call',3,'p_func_call','syntax.py',128),
+  ('func_call -> FIELD single_value','func_call',2,'p_func_call','syntax.py',129),
+  ('stat_expr -> expr END','stat_expr',2,'p_stat_expr','syntax.py',139),
+  ('stat_expr -> var_decl END','stat_expr',2,'p_stat_expr','syntax.py',140),
+  ('expr -> expr ASSIGN expr','expr',3,'p_expr','syntax.py',145),
+  ('expr -> expr_binary','expr',1,'p_expr','syntax.py',146),
+  ('expr -> expr_unary','expr',1,'p_expr','syntax.py',147),
+  ('expr -> expr_bracket','expr',1,'p_expr','syntax.py',148),
+  ('expr -> expr_index','expr',1,'p_expr','syntax.py',149),
+  ('expr -> single_value','expr',1,'p_expr','syntax.py',150),
+  ('expr_binary -> expr OPERLV3 expr','expr_binary',3,'p_expr_binaryOper','syntax.py',158),
+  ('expr_binary -> expr OPERLV2 expr','expr_binary',3,'p_expr_binaryOper','syntax.py',159),
+  ('expr_binary -> expr OPERLV1 expr','expr_binary',3,'p_expr_binaryOper','syntax.py',160),
+  ('expr_binary -> expr OPERLV0 expr','expr_binary',3,'p_expr_binaryOper','syntax.py',161),
+  ('expr_unary -> UNARY expr','expr_unary',2,'p_expr_unaryOper','syntax.py',166),
+  ('expr_unary -> OPERLV1 expr','expr_unary',2,'p_expr_unaryOper','syntax.py',167),
+  ('expr_bracket -> LPAREN expr RPAREN','expr_bracket',3,'p_expr_bracket','syntax.py',172),
+  ('expr_index -> FIELD LSQUARE expr RSQUARE','expr_index',4,'p_expr_index','syntax.py',177),
+  ('single_value -> CONST','single_value',1,'p_single_value','syntax.py',182),
+  ('single_value -> FIELD','single_value',1,'p_single_value','syntax.py',183),
+  ('single_value -> func_call','single_value',1,'p_single_value','syntax.py',184),
+  ('single_value -> mbr_sel','single_value',1,'p_single_value','syntax.py',185),
+  ('single_value -> expr_index','single_value',1,'p_single_value','syntax.py',186),
+]
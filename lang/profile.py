@@ -0,0 +1,289 @@
+import threading
+import time
+import lang.astnode as ast
+import lang.exec as exec
+
+# --profile of blang.py: the interpreter below counts the calls and the time
+# of every function, the executions of every statement line and the
+# iterations of every loop; the plain exec.Interpreter is not touched, a run
+# without --profile pays nothing for it
+# --sample: the Sampler at the end reads the frames of the plain interpreter
+# from a thread every few milliseconds, nothing is counted per node
+
+clock = time.perf_counter_ns
+PROGRAM = "<program>"
+
+
+class FunctionStats:
+    __slots__ = ("label", "calls", "inclusive", "exclusive", "active")
+
+    def __init__(self, label):
+        self.label = label
+        self.calls = 0
+        # ns, a recursive function adds the outermost call to inclusive
+        self.inclusive = 0
+        self.exclusive = 0
+        self.active = 0
+
+
+class Profile:
+    def __init__(self):
+        # FuncDecl node or built-in name -> FunctionStats
+        self.functions = {}
+        # tuple of labels from the program down -> exclusive ns
+        self.stacks = {}
+        # line -> statements executed
+        self.lines = {}
+        # While node -> [entries, iterations]
+        self.loops = {}
+        self.total = 0
+
+    def function(self, key, label):
+        stats = self.functions.get(key)
+        if stats is None:
+            stats = self.functions[key] = FunctionStats(label)
+        return stats
+
+    def formatReport(self, source=None, top=20):
+        total = self.total or 1
+        lines = [
+            f"{'function':<24}{'calls':>10}{'incl ms':>11}{'excl ms':>11}{'incl %':>8}{'excl %':>8}{'us/call':>10}"
+        ]
+        for stats in sorted(
+            self.functions.values(), key=lambda stats: -stats.exclusive
+        ):
+            lines.append(
+                f"{stats.label:<24}{stats.calls:>10}{stats.inclusive / 1e6:>11.2f}{stats.exclusive / 1e6:>11.2f}"
+                f"{stats.inclusive / total * 100:>8.1f}{stats.exclusive / total * 100:>8.1f}"
+                f"{stats.inclusive / stats.calls / 1e3:>10.2f}"
+            )
+        text = source.splitlines() if source else []
+        lines.append("")
+        lines.append(f"{'line':>6}{'hits':>12}  source")
+        hot = sorted(self.lines.items(), key=lambda item: (-item[1], item[0]))[:top]
+        for line, hits in hot:
+            code = text[line - 1].strip() if 0 < line <= len(text) else ""
+            lines.append(f"{line:>6}{hits:>12}  {code}")
+        if self.loops:
+            lines.append("")
+            lines.append(
+                f"{'loop':>6}{'entries':>12}{'iterations':>14}{'per entry':>12}"
+            )
+            hot = sorted(self.loops.items(), key=lambda item: -item[1][1])[:top]
+            for node, (entries, iterations) in hot:
+                lines.append(
+                    f"{node.lineno or '?':>6}{entries:>12}{iterations:>14}{iterations / entries:>12.1f}"
+                )
+        return "\n".join(lines)
+
+    def writeStacks(self, path):
+        # the collapsed stacks of flamegraph.pl and speedscope: the frames
+        # from the program down separated by ';' and the exclusive
+        # microseconds
+        with open(path, "w") as f:
+            for stack, ns in sorted(self.stacks.items()):
+                if ns >= 1000:
+                    f.write(f"{';'.join(stack)} {ns // 1000}\n")
+
+
+def label(funcDecl: ast.AstFuncDecl):
+    if funcDecl.lineno is None:
+        return funcDecl.name
+    return f"{funcDecl.name}:{funcDecl.lineno}"
+
+
+class ProfilingInterpreter(exec.Interpreter):
+    def __init__(self, memo=None):
+        super().__init__(memo)
+        self.profile = Profile()
+        # the labels of the running calls and the ns their callees took
+        self.path = (PROGRAM,)
+        self.callees = [0]
+
+    def run(self, program: ast.AstProgram):
+        start = clock()
+        try:
+            self.visit(program)
+        finally:
+            profile = self.profile
+            profile.total = clock() - start
+            # the time of the top-level statements themselves
+            profile.stacks[(PROGRAM,)] = profile.total - self.callees[0]
+
+    def timed(self, key, label, run):
+        # runs run() as a call of the function key
+        stats = self.profile.function(key, label)
+        stats.calls += 1
+        stats.active += 1
+        caller = self.path
+        path = self.path = caller + (stats.label,)
+        self.callees.append(0)
+        start = clock()
+        try:
+            return run()
+        finally:
+            elapsed = clock() - start
+            exclusive = elapsed - self.callees.pop()
+            self.callees[-1] += elapsed
+            self.path = caller
+            stats.active -= 1
+            if not stats.active:
+                stats.inclusive += elapsed
+            stats.exclusive += exclusive
+            stacks = self.profile.stacks
+            stacks[path] = stacks.get(path, 0) + exclusive
+
+    def visit(self, node):
+        line = node.lineno
+        if line is not None:
+            lines = self.profile.lines
+            lines[line] = lines.get(line, 0) + 1
+        return super().visit(node)
+
+    def call(self, funcDecl: ast.AstFuncDecl, varlist: list, obj=None):
+        run = super().call
+        return self.timed(
+            funcDecl, label(funcDecl), lambda: run(funcDecl, varlist, obj)
+        )
+
+    def callFunc(self, funcCall: ast.AstFuncCall, funcDecl, this=None):
+        if type(funcDecl) == ast.AstFuncDecl:
+            return super().callFunc(funcCall, funcDecl, this)
+        # a built-in function, timed without its arguments
+        args = [self.visit(arg) for arg in funcCall.params]
+        return self.timed(funcCall.name, funcCall.name, lambda: funcDecl(*args))
+
+    def visit_AstWhile(self, node: ast.AstWhile):
+        frame = self.frame
+        iterations = 0
+        try:
+            while self.visit(node.condition):
+                iterations += 1
+                self.visit(node.body)
+                if frame.retFlag:
+                    return
+        finally:
+            counts = self.profile.loops.get(node)
+            if counts is None:
+                counts = self.profile.loops[node] = [0, 0]
+            counts[0] += 1
+            counts[1] += iterations
+
+
+class SampledInterpreter(exec.Interpreter):
+    # an exec.Interpreter that keeps the line of the running statement in its
+    # frames for the Sampler, the plain one does not pay for the stores
+    def statement(self, node, nslots):
+        if self.frame is None:
+            self.frame = exec.Frame([])
+        self.frame.line = node.lineno
+        super().statement(node, nslots)
+
+    def visit_AstStatList(self, node: ast.AstStatList):
+        frame = self.frame
+        for stat in node.body:
+            if stat.lineno is not None:
+                frame.line = stat.lineno
+            self.visit(stat)
+            if frame.retFlag:
+                return
+
+
+class Sampler:
+    # the blang stacks of a SampledInterpreter, sampled by a daemon thread
+    # every interval seconds from the chain of its frames; a stack is a tuple
+    # of (function label, line of the running statement) from the program down
+    def __init__(self, interpreter: SampledInterpreter, interval=0.01):
+        self.interpreter = interpreter
+        self.interval = interval
+        # stack -> samples
+        self.samples = {}
+        self.count = 0
+        self.thread = None
+        self.running = False
+
+    def start(self):
+        self.running = True
+        self.thread = threading.Thread(target=self.loop, daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.running = False
+        if self.thread is not None:
+            self.thread.join()
+            self.thread = None
+
+    def loop(self):
+        sleep = time.sleep
+        while self.running:
+            sleep(self.interval)
+            self.sample()
+
+    def sample(self):
+        frame = self.interpreter.frame
+        stack = []
+        while frame is not None:
+            func = frame.func
+            line = frame.line
+            if func is not None:
+                if line is None:
+                    # a body of a single statement
+                    line = func.body.lineno
+                stack.append((label(func), line))
+            elif frame.obj is not None:
+                # the body of a class run for a new instance
+                stack.append((frame.obj.layout.name, line))
+            else:
+                stack.append((PROGRAM, line))
+            frame = frame.caller
+        if stack:
+            stack = tuple(reversed(stack))
+            self.samples[stack] = self.samples.get(stack, 0) + 1
+            self.count += 1
+
+    def formatReport(self, source=None, top=20):
+        count = self.count or 1
+        selfSamples = {}
+        totalSamples = {}
+        lineSamples = {}
+        for stack, n in self.samples.items():
+            name, line = stack[-1]
+            selfSamples[name] = selfSamples.get(name, 0) + n
+            # the innermost line with a statement
+            for _, line in reversed(stack):
+                if line is not None:
+                    lineSamples[line] = lineSamples.get(line, 0) + n
+                    break
+            for name in {name for name, _ in stack}:
+                totalSamples[name] = totalSamples.get(name, 0) + n
+        lines = [
+            f"{self.count} samples every {self.interval * 1000:g}ms",
+            f"{'function':<24}{'self':>10}{'self %':>8}{'total':>10}{'total %':>9}",
+        ]
+        for name, total in sorted(
+            totalSamples.items(),
+            key=lambda item: (-selfSamples.get(item[0], 0), -item[1]),
+        ):
+            own = selfSamples.get(name, 0)
+            lines.append(
+                f"{name:<24}{own:>10}{own / count * 100:>8.1f}{total:>10}{total / count * 100:>9.1f}"
+            )
+        text = source.splitlines() if source else []
+        lines.append("")
+        lines.append(f"{'line':>6}{'samples':>10}{'%':>8}  source")
+        for line, n in sorted(
+            lineSamples.items(), key=lambda item: (-item[1], item[0])
+        )[:top]:
+            code = text[line - 1].strip() if 0 < line <= len(text) else ""
+            lines.append(f"{line:>6}{n:>10}{n / count * 100:>8.1f}  {code}")
+        return "\n".join(lines)
+
+    def writeStacks(self, path):
+        # collapsed stacks with the samples as the count, a frame is the
+        # function and the line of its running statement
+        with open(path, "w") as f:
+            for stack, n in sorted(self.samples.items(), key=lambda item: str(item[0])):
+                frames = (
+                    name if line is None else f"{name}@{line}" for name, line in stack
+                )
+                f.write(f"{';'.join(frames)} {n}\n")
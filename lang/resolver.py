@@ -0,0 +1,222 @@
+import lang.visitor as vis
+import lang.astnode as ast
+import lang.typeclass as tc
+
+
+class Scope:
+    # slot 0 of program and function scopes holds 'this',
+    # class body scopes only hold the members
+    def __init__(self, kind, name, parent=None):
+        self.kind = kind
+        self.name = name
+        self.parent = parent
+        self.depth = parent.depth + 1 if parent else 0
+        self.slots = {} if kind == "class" else {"this": 0}
+        self.declared = set() if kind != "func" else {"this"}
+        # functions declared in the body of a function scope
+        self.functions = {}
+
+    def declare(self, name):
+        self.declared.add(name)
+        return self.slot(name)
+
+    def slot(self, name):
+        slot = self.slots.get(name)
+        if slot is None:
+            slot = self.slots[name] = len(self.slots)
+        return slot
+
+    @property
+    def varnames(self):
+        return list(self.slots)
+
+    def function(self, name):
+        scope = self
+        while scope:
+            func = scope.functions.get(name)
+            if func:
+                return func
+            scope = scope.parent
+        return None
+
+
+def class_stats(node: ast.AstClassDecl):
+    # the statements of a class body, a body of one statement is not a StatList
+    if type(node.body) == ast.AstStatList:
+        return node.body.body
+    return [node.body]
+
+
+class Resolver(vis.NodeVisitor):
+    # runs after the optimizer passes and gives every variable a slot in its scope:
+    # AstField, AstVarDecl and assignment targets get 'depth' (nesting level
+    # of the declaring scope) and 'slot', AstProgram, AstFuncDecl and
+    # AstClassDecl get 'nslots' and 'varnames'
+    # class declarations also get their layout: 'slots', 'memberlist',
+    # 'methods', the constant member values in 'defaults' and the
+    # statements left to run for each instance in 'init'
+    # blang functions do not see the variables of enclosing scopes, so every
+    # name must be declared in its own function, class body or the program
+    # a def inside a function body is nested: it is bound once, visible in
+    # the whole enclosing function (also before the def) and in the functions
+    # nested in it, and shadows a global function of the same name there,
+    # calls to it get 'func', the called AstFuncDecl
+    def __init__(self):
+        self.scope = None
+        self.pending = []
+
+    def resolve(self, node: ast.AstProgram):
+        self.visit(node)
+        return node
+
+    def start(self):
+        # the program scope of a program whose top-level statements are
+        # resolved one at a time by statement() (lang.stream)
+        self.enter("program", "<program>")
+
+    def statement(self, node):
+        # the names of a top-level statement are checked against the
+        # variables declared so far, returns the slots of the program
+        self.visit(node)
+        self.check()
+        return len(self.scope.slots)
+
+    def enter(self, kind, name, params=()):
+        self.scope = Scope(kind, name, self.scope)
+        for param in params:
+            self.scope.declare(param.name)
+
+    def hoist(self, node):
+        # collect the defs of a function body, not those of nested bodies
+        for child in node.getChild():
+            if type(child) == ast.AstFuncDecl:
+                if child.name in self.scope.functions:
+                    raise SyntaxError(
+                        f"Function '{child.name}' already declared in '{self.scope.name}'"
+                    )
+                child.nested = True
+                self.scope.functions[child.name] = child
+            elif type(child) != ast.AstClassDecl:
+                self.hoist(child)
+
+    def check(self):
+        for use in self.pending:
+            if use.name not in self.scope.declared:
+                raise SyntaxError(
+                    f"Variable '{use.name}' not found in '{self.scope.name}'"
+                )
+        self.pending = []
+
+    def leave(self, node):
+        scope = self.scope
+        # names are checked once the whole scope has been declared
+        self.check()
+        node.nslots = len(scope.slots)
+        node.varnames = scope.varnames
+        self.scope = scope.parent
+
+    def use(self, node):
+        node.depth = self.scope.depth
+        node.slot = self.scope.slot(node.name)
+        self.pending.append(node)
+
+    def visit_AstProgram(self, node: ast.AstProgram):
+        self.enter("program", "<program>")
+        self.visit(node.body)
+        self.leave(node)
+        return node
+
+    def visit_AstFuncDecl(self, node: ast.AstFuncDecl):
+        pending, self.pending = self.pending, []
+        self.enter("func", node.name, node.params or ())
+        self.hoist(node.body)
+        self.visit(node.body)
+        self.leave(node)
+        self.pending = pending
+        return node
+
+    def visit_AstClassDecl(self, node: ast.AstClassDecl):
+        pending, self.pending = self.pending, []
+        self.enter("class", node.name)
+        node.memberlist = {}
+        for stat in class_stats(node):
+            if type(stat) == ast.AstVarDecl:
+                node.memberlist[stat.varname] = "var"
+            elif type(stat) == ast.AstFuncDecl:
+                node.memberlist[stat.name] = "func"
+        self.visit(node.body)
+        node.slots = dict(self.scope.slots)
+        self.layout(node)
+        self.leave(node)
+        self.pending = pending
+        return node
+
+    def layout(self, node: ast.AstClassDecl):
+        stats = class_stats(node)
+        declared = [stat.varname for stat in stats if type(stat) == ast.AstVarDecl]
+        node.defaults = [tc.UNBOUND] * len(node.slots)
+        node.methods = []
+        node.init = []
+        for stat in stats:
+            if type(stat) == ast.AstFuncDecl:
+                node.methods.append(stat)
+                continue
+            value = self.constMember(stat, declared)
+            if value is tc.UNBOUND:
+                node.init.append(stat)
+            else:
+                node.defaults[stat.slot] = value
+
+    def constMember(self, stat, declared):
+        # value of a member declared once with a constant, UNBOUND otherwise
+        if type(stat) != ast.AstVarDecl or type(stat.expr) != ast.AstConst:
+            return tc.UNBOUND
+        if declared.count(stat.varname) != 1:
+            return tc.UNBOUND
+        value = stat.expr.value
+        if stat.autoType:
+            stat.varType = type(value).__name__.lower().replace("type", "")
+            return value
+        typeclass = getattr(tc, "Type" + stat.varType.capitalize(), None)
+        if not typeclass:
+            # reported when an instance is created
+            return tc.UNBOUND
+        return typeclass(value)
+
+    def visit_AstVarDecl(self, node: ast.AstVarDecl):
+        self.visit(node.expr)
+        node.depth = self.scope.depth
+        node.slot = self.scope.declare(node.varname)
+        return node
+
+    def visit_AstFuncCall(self, node: ast.AstFuncCall):
+        node.func = self.scope.function(node.name)
+        for param in node.params:
+            self.visit(param)
+        return node
+
+    def visit_AstField(self, node: ast.AstField):
+        self.use(node)
+        return node
+
+    def visit_AstAssign(self, node: ast.AstAssign):
+        self.visit(node.expr)
+        self.visit(node.lvalue)
+        return node
+
+    def visit_AstIndex(self, node: ast.AstIndex):
+        self.visit(node.point)
+        self.visit(node.index)
+        return node
+
+    def visit_AstMbrSel(self, node: ast.AstMbrSel):
+        self.visit(node.object)
+        if type(node.member) == ast.AstFuncCall:
+            # methods are found through the object, not the lexical scope
+            for param in node.member.params:
+                self.visit(param)
+        return node
+
+
+def resolve(node: ast.AstProgram):
+    return Resolver().resolve(node)
@@ -0,0 +1,300 @@
+import mmap
+import re
+import sys
+import lang.typeclass as tc
+import lang.astnode as ast
+
+# hand written lexer with the token contract of lang/lexer.py: the same
+# tokens, the same newline to END rules and the fake END before '}', and
+# the same quirks of the ply master regex, which takes the first rule that
+# matches ('trueish' is true + ish, '!=' is ! + =)
+# it reads a str, bytes or an mmap of a utf-8 file and yields the tokens as
+# they are found, identifiers are interned
+
+# the words of lang.lexer.keywords_map, without building the ply lexer
+keywords = {
+    "if": "IF",
+    "while": "WHILE",
+    "else": "ELSE",
+    "def": "DEF",
+    "ret": "RET",
+    "class": "CLASS",
+}
+
+# a newline after these words does not end the statement
+continued = ("if", "while", "else")
+
+SPACE = 0
+NAME = 1
+NEWLINE = 2
+SINGLE = 3
+NUMBER = 4
+STRING = 5
+LPAREN = 6
+RPAREN = 7
+RCURLY = 8
+COMPARE = 9
+ASSIGN = 10
+LOGIC = 11
+SEMI = 12
+COMMENT = 13
+ILLEGAL = 14
+
+# character -> (kind, token type, text, recorded as the last token)
+characters = {
+    " ": (SPACE, None, None, None),
+    "\t": (SPACE, None, None, None),
+    "\n": (NEWLINE, None, None, None),
+    ".": (SINGLE, "DOT", ".", None),
+    "!": (SINGLE, "UNARY", "!", "oper"),
+    "~": (SINGLE, "UNARY", "~", "oper"),
+    "*": (SINGLE, "OPERLV0", "*", "oper"),
+    "/": (SINGLE, "OPERLV0", "/", "oper"),
+    "%": (SINGLE, "OPERLV0", "%", "oper"),
+    "+": (SINGLE, "OPERLV1", "+", "oper"),
+    "-": (SINGLE, "OPERLV1", "-", "oper"),
+    "[": (SINGLE, "LSQUARE", "[", None),
+    "]": (SINGLE, "RSQUARE", "]", None),
+    "{": (SINGLE, "LCURLY", "{", "lcurly"),
+    ",": (SINGLE, "COMMA", ",", None),
+    ":": (SINGLE, "COLON", ":", None),
+    "(": (LPAREN, "LPAREN", "(", None),
+    ")": (RPAREN, "RPAREN", ")", None),
+    "}": (RCURLY, "RCURLY", "}", "rcurly"),
+    ">": (COMPARE, "OPERLV2", ">", "oper"),
+    "<": (COMPARE, "OPERLV2", "<", "oper"),
+    "=": (ASSIGN, "ASSIGN", "=", None),
+    "&": (LOGIC, "OPERLV3", "&&", "oper"),
+    "|": (LOGIC, "OPERLV3", "||", "oper"),
+    '"': (STRING, "CONST", None, "const"),
+    ";": (SEMI, "END", None, None),
+    "#": (COMMENT, None, None, None),
+}
+for _char in "abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ_":
+    characters[_char] = (NAME, None, None, None)
+for _char in "0123456789":
+    characters[_char] = (NUMBER, "CONST", None, "const")
+
+illegal = (ILLEGAL, None, None, None)
+
+
+class Syntax:
+    # the tables of one input kind, indexing a str gives a str and indexing
+    # bytes or an mmap gives an int
+    def __init__(self, text: bool):
+        encode = (lambda s: s) if text else (lambda s: s.encode())
+        if text:
+            self.characters = dict(characters)
+        else:
+            self.characters = {ord(char): entry for char, entry in characters.items()}
+        self.name = re.compile(encode(r"[a-zA-Z_][a-zA-Z0-9_]*"))
+        self.number = re.compile(encode(r"\d+(\.\d+)?"))
+        self.blank = re.compile(encode(r"[ \n]+"))
+        self.newline = encode("\n")
+        self.quote = encode('"')
+        self.equal = encode("=")
+        self.true = encode("true")
+        self.false = encode("false")
+
+
+text_syntax = Syntax(True)
+binary_syntax = Syntax(False)
+
+
+def illegal_character(data, pos):
+    if isinstance(data, str):
+        return data[pos]
+    return bytes(data[pos : pos + 4]).decode(errors="replace")[0]
+
+
+def scan(data, newline=False):
+    # yields (type, value, lineno, lexpos): CONST has the typed value, FIELD
+    # the interned name, END None and the others their text
+    # newline: end as if the data had one more '\n', like blang.py adds
+    syntax = text_syntax if isinstance(data, str) else binary_syntax
+    text = syntax is text_syntax
+    table = syntax.characters
+    matchName = syntax.name.match
+    matchNumber = syntax.number.match
+    matchBlank = syntax.blank.match
+    lf, quote, equal, true, false = (
+        syntax.newline,
+        syntax.quote,
+        syntax.equal,
+        syntax.true,
+        syntax.false,
+    )
+    # raw identifier -> (token type, interned name)
+    names = {}
+    end = len(data)
+    pos = 0
+    lineno = 1
+    paren = 0
+    last = None
+    while pos < end:
+        char = data[pos]
+        kind, tokType, value, record = table.get(char, illegal)
+        if kind == SPACE:
+            pos += 1
+            continue
+        elif kind == NAME:
+            word = matchName(data, pos).group()
+            if word[:4] == true or word[:5] == false:
+                # the Boolean rule comes before the FIELD rule
+                size = 4 if word[:4] == true else 5
+                yield ("CONST", tc.TypeBool(size == 4), lineno, pos)
+                if paren == 0:
+                    last = "const"
+                pos += size
+                continue
+            entry = names.get(word)
+            if entry is None:
+                name = sys.intern(word if text else word.decode())
+                entry = names[word] = (keywords.get(name, "FIELD"), name)
+            yield (entry[0], entry[1], lineno, pos)
+            if paren == 0:
+                last = entry[1]
+            pos += len(word)
+            continue
+        elif kind == NEWLINE:
+            match = matchBlank(data, pos)
+            if paren == 0 and last not in continued:
+                yield ("END", None, lineno, pos)
+            lineno += match.group().count(lf)
+            pos = match.end()
+            if pos == end:
+                # an added '\n' would be part of this run
+                newline = False
+            continue
+        elif kind == SINGLE:
+            yield (tokType, value, lineno, pos)
+            pos += 1
+        elif kind == NUMBER:
+            match = matchNumber(data, pos)
+            number = match.group()
+            if match.group(1):
+                yield (tokType, tc.TypeFloat(number), lineno, pos)
+            else:
+                yield (tokType, tc.TypeInt(number), lineno, pos)
+            pos = match.end()
+        elif kind == LPAREN:
+            yield (tokType, value, lineno, pos)
+            paren += 1
+            pos += 1
+            continue
+        elif kind == RPAREN:
+            yield (tokType, value, lineno, pos)
+            paren -= 1
+            pos += 1
+            continue
+        elif kind == RCURLY:
+            # a fake END closes the last statement of the block
+            yield ("END", None, lineno, pos)
+            yield (tokType, value, lineno, pos)
+            pos += 1
+        elif kind == COMPARE or kind == ASSIGN:
+            if data[pos + 1 : pos + 2] == equal:
+                yield ("OPERLV2", value + "=", lineno, pos)
+                record = "oper"
+                pos += 2
+            else:
+                yield (tokType, value, lineno, pos)
+                pos += 1
+        elif kind == STRING:
+            close = data.find(quote, pos + 1)
+            if close < 0:
+                print("Illegal character %s" % illegal_character(data, pos))
+                raise SyntaxError
+            string = data[pos + 1 : close]
+            yield (
+                tokType,
+                tc.TypeString(string if text else string.decode()),
+                lineno,
+                pos,
+            )
+            pos = close + 1
+        elif kind == LOGIC:
+            if data[pos + 1 : pos + 2] != data[pos : pos + 1]:
+                print("Illegal character %s" % illegal_character(data, pos))
+                raise SyntaxError
+            yield (tokType, value, lineno, pos)
+            pos += 2
+        elif kind == SEMI:
+            yield (tokType, None, lineno, pos)
+            pos += 1
+            continue
+        elif kind == COMMENT:
+            stop = data.find(lf, pos)
+            pos = end if stop < 0 else stop
+            continue
+        elif text and char.isdecimal():
+            # \d of the ply rule takes any unicode digit
+            match = matchNumber(data, pos)
+            number = match.group()
+            if match.group(1):
+                yield ("CONST", tc.TypeFloat(number), lineno, pos)
+            else:
+                yield ("CONST", tc.TypeInt(number), lineno, pos)
+            record = "const"
+            pos = match.end()
+        else:
+            print("Illegal character %s" % illegal_character(data, pos))
+            raise SyntaxError
+        if record is not None and paren == 0:
+            last = record
+    if newline and paren == 0 and last not in continued:
+        yield ("END", None, lineno, end)
+
+
+def scan_file(path):
+    # the tokens of a file read through an mmap, with the '\n' blang.py adds
+    with open(path, "rb") as f:
+        if f.seek(0, 2) == 0:
+            yield from scan(b"", newline=True)
+            return
+        data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    try:
+        yield from scan(data, newline=True)
+    finally:
+        data.close()
+
+
+class Token:
+    # what ply.yacc reads from a token, yacc sets 'lexer' on syntax errors
+    __slots__ = ("type", "value", "lineno", "lexpos", "lexer")
+
+    def __init__(self, type, value, lineno, lexpos):
+        self.type = type
+        self.value = value
+        self.lineno = lineno
+        self.lexpos = lexpos
+
+    def __repr__(self):
+        return f"LexToken({self.type},{self.value!r},{self.lineno},{self.lexpos})"
+
+
+class Lexer:
+    # scan() behind the input()/token() interface of a ply lexer, with the
+    # token values of lang/lexer.py (AstConst, AstField, AstEnd):
+    #   lang.syntax.parser.parse(code, lexer=scanner.Lexer())
+    def __init__(self):
+        self.tokens = iter(())
+        self.lineno = 1
+        self.constants = ast.Constants()
+
+    def input(self, data):
+        self.tokens = scan(data)
+        self.lineno = 1
+        self.constants = ast.Constants()
+
+    def token(self):
+        for tokType, value, lineno, lexpos in self.tokens:
+            if tokType == "CONST":
+                value = self.constants.get(value)
+            elif tokType == "FIELD":
+                value = ast.AstField(value)
+            elif tokType == "END":
+                value = ast.END
+            self.lineno = lineno
+            return Token(tokType, value, lineno, lexpos)
+        return None
@@ -0,0 +1,38 @@
+import lang.astnode as ast
+import lang.descent as descent
+import lang.optimizer as optimizer
+import lang.resolver as resolver
+import lang.scanner as scanner
+
+# passes that need the whole program: inline counts the defs of a name
+# in all of it
+whole_program = {"inline"}
+
+
+def run(tokens, engine, disabled=(), **options):
+    # parses, optimizes, resolves and runs the top-level statements one at a
+    # time, a statement is dropped once it has run; the defs and classes
+    # stay alive as long as the engine has them bound to their name
+    # engine is an exec.Interpreter or a closure.ClosureEngine
+    # differences to running the whole program:
+    #   - a top-level variable has to be declared in or before the
+    #     statement that first uses it
+    #   - the types are not inferred and nothing is inlined or memoized
+    #   - the statements before a syntax error have already run
+    disabled = set(disabled) | whole_program
+    names = resolver.Resolver()
+    names.start()
+    for stat in descent.Parser(tokens).statements():
+        # a new pipeline per statement, the temporaries of the loop passes
+        # get the same names again and do not add program slots
+        stat = (
+            optimizer.Pipeline(disabled, report=False, **options)
+            .run(ast.AstProgram(stat))
+            .body
+        )
+        engine.statement(stat, names.statement(stat))
+
+
+def run_file(path, engine, disabled=(), **options):
+    # the file is read through an mmap
+    run(scanner.scan_file(path), engine, disabled, **options)
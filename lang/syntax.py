@@ -2,6 +2,7 @@ import ply.yacc as yacc
 import lang.astnode as ast
 from lang.lexer import tokens
 import copy
+import os
 
 start = "program"
 
@@ -36,6 +37,10 @@ def p_stat(p):
     | func_decl
     | class_decl"""
     p[0] = p[1]
+    # the line of the first token, parse() tracks the positions; a compound
+    # statement has none and the nodes of the constants are shared
+    if type(p[1]) not in (ast.AstStatList, ast.AstNode, ast.AstConst):
+        p[0].lineno = p.lineno(1)
 
 
 def p_stat_compound(p):
@@ -204,4 +209,26 @@ precedence = (
 )
 
 
-parser = yacc.yacc(optimize=True, outputdir="generated", debug=False)
+# the LALR tables are prebuilt in lang/parsetab.py (python3 -m lang.tables),
+# they are rebuilt in memory when the grammar signature does not match
+parser = yacc.yacc(
+    tabmodule="lang.parsetab",
+    outputdir=os.path.dirname(os.path.abspath(__file__)),
+    write_tables=False,
+    debug=False,
+)
+
+
+def new_parser():
+    # a parser of its own for one parse at a time, the tables are shared
+    return copy.copy(parser)
+
+
+def parse(code, lexer=None):
+    # parses with a new parser and a new ply lexer (or the given one), any
+    # number of sources can be parsed at the same time
+    import lang.lexer
+
+    return new_parser().parse(
+        code, lexer=lexer or lang.lexer.new_lexer(), tracking=True
+    )
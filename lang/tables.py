@@ -0,0 +1,27 @@
+# rebuilds the ply tables lang/lextab.py and lang/parsetab.py that lang.lexer
+# and lang.syntax load, run after changing the tokens or the grammar:
+#   python3 -m lang.tables
+import os
+import ply.lex as lex
+import ply.yacc as yacc
+
+directory = os.path.dirname(os.path.abspath(__file__))
+
+
+def build():
+    for name in ("lextab.py", "parsetab.py"):
+        path = os.path.join(directory, name)
+        if os.path.exists(path):
+            os.remove(path)
+    # without the tables both modules build their own in memory
+    import lang.lexer as lexer
+    import lang.syntax as syntax
+
+    lex.lex(module=lexer, optimize=True, lextab="lang.lextab", outputdir=directory)
+    yacc.yacc(
+        module=syntax, tabmodule="lang.parsetab", outputdir=directory, debug=False
+    )
+
+
+if __name__ == "__main__":
+    build()
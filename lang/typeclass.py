@@ -1,4 +1,5 @@
 # import lang.astnode as ast
+import operator
 
 
 # build-in types
@@ -103,13 +104,249 @@ class TypeString(str):
 
 class TypeBool:
     def __init__(self, value):
-        if type(value) == str:
+        if isinstance(value, str):
             self.value = value == 'true'
         elif type(value) == bool:
             self.value = value
+        elif type(value) == TypeBool:
+            self.value = value.value
+        else:
+            raise SyntaxError(f"Can not convert '{value}' to bool")
+
+    # printed as blang writes the constants, the same in every engine
+    # (the unboxed closure engine has python bools, see exec.print_)
 
     def to_json(self):
         return {'varType': 'bool', 'value': self.value}
 
     def __bool__(self):
         return self.value
+
+    def __str__(self):
+        return 'true' if self.value else 'false'
+
+
+class Unbound:
+    # pickled as a reference to UNBOUND, cached trees keep its identity
+    def __reduce__(self):
+        return "UNBOUND"
+
+    def __repr__(self):
+        return "UNBOUND"
+
+
+# value of a variable slot that was not assigned yet
+UNBOUND = Unbound()
+
+
+class ClassLayout:
+    # built once per class declaration and shared by all its instances:
+    # the member slots, their initial values, the method table and the
+    # engine specific code that still has to run for every new instance
+    __slots__ = ("name", "slots", "memberlist", "defaults", "methods", "init")
+
+    def __init__(self, name, slots, memberlist, defaults, methods, init=None):
+        self.name = name
+        self.slots = slots
+        self.memberlist = memberlist
+        self.defaults = defaults
+        self.methods = methods
+        self.init = init
+
+
+class TypeObject:
+    # instance of a blang class, only the member values are kept per object
+    __slots__ = ("layout", "varlist")
+
+    def __init__(self, layout: ClassLayout):
+        self.layout = layout
+        self.varlist = layout.defaults.copy()
+
+    @property
+    def name(self):
+        return self.layout.name
+
+    @property
+    def memberlist(self):
+        return self.layout.memberlist
+
+    def member(self, name):
+        slot = self.layout.slots.get(name)
+        if slot is None:
+            raise SyntaxError(
+                f"Member '{name}' not found in class '{self.layout.name}'"
+            )
+        return slot
+
+    def __str__(self) -> str:
+        return f"class({self.name}, {self.memberlist})"
+
+
+# operator semantics shared by the engines
+
+
+def and_(left, right):
+    return left and right
+
+
+def or_(left, right):
+    return left or right
+
+
+binary_oper = {
+    "+": operator.add,
+    "-": operator.sub,
+    "*": operator.mul,
+    "/": operator.truediv,
+    "%": operator.mod,
+    "<": operator.lt,
+    ">": operator.gt,
+    "<=": operator.le,
+    ">=": operator.ge,
+    "==": operator.eq,
+    "!=": operator.ne,
+    "&&": and_,
+    "||": or_,
+}
+
+unary_oper = {
+    "+": operator.pos,
+    "-": operator.neg,
+    "!": operator.not_,
+    "~": operator.invert,
+}
+
+
+def _wrap(result, base):
+    def fast(left, right):
+        return result(base(left, right))
+
+    return fast
+
+
+# type specialized versions of binary_oper/unary_oper, keyed by the operand
+# types; they compute the same value as the dunders above without the
+# super() call and the int() conversion of the right operand
+fast_binary = {}
+for _oper, _name in (
+    ("+", "add"),
+    ("-", "sub"),
+    ("*", "mul"),
+    ("/", "truediv"),
+    ("%", "mod"),
+):
+    fast_binary[_oper, TypeInt, TypeInt] = _wrap(TypeInt, getattr(int, f"__{_name}__"))
+    fast_binary[_oper, TypeFloat, TypeFloat] = _wrap(
+        TypeFloat, getattr(float, f"__{_name}__")
+    )
+for _oper, _name in (
+    ("<", "lt"),
+    (">", "gt"),
+    ("<=", "le"),
+    (">=", "ge"),
+    ("==", "eq"),
+    ("!=", "ne"),
+):
+    fast_binary[_oper, TypeInt, TypeInt] = _wrap(TypeBool, getattr(int, f"__{_name}__"))
+    # TypeFloat keeps the plain float comparisons
+    fast_binary[_oper, TypeFloat, TypeFloat] = getattr(float, f"__{_name}__")
+
+fast_unary = {
+    ("-", TypeInt): lambda value: TypeInt(int.__neg__(value)),
+    ("~", TypeInt): lambda value: TypeInt(int.__invert__(value)),
+    ("-", TypeFloat): float.__neg__,
+}
+
+
+def specialize_binary(oper, left, right):
+    # handler for the operand types, the generic operator if there is no fast path
+    return fast_binary.get((oper, left, right)) or binary_oper[oper]
+
+
+def specialize_unary(oper, value):
+    return fast_unary.get((oper, value)) or unary_oper[oper]
+
+
+# unboxed mode: numbers and booleans are plain python int/float/bool and the
+# operators below give them the TypeInt/TypeFloat semantics
+
+
+def unbox(value):
+    kind = type(value)
+    if kind == TypeInt:
+        return int(value)
+    elif kind == TypeFloat:
+        return float(value)
+    elif kind == TypeBool:
+        return value.value
+    return value
+
+
+def _unboxed_arith(native):
+    def oper(left, right):
+        if type(left) is int and type(right) is float:
+            # an int on the left truncates the right operand, like TypeInt
+            right = int(right)
+        return native(left, right)
+
+    return oper
+
+
+def unboxed_div(left, right):
+    if type(left) is int:
+        return int(left / int(right))
+    return left / right
+
+
+def int_div(left, right):
+    return int(left / right)
+
+
+unboxed_binary = dict(binary_oper)
+for _oper in ("+", "-", "*", "%"):
+    unboxed_binary[_oper] = _unboxed_arith(binary_oper[_oper])
+unboxed_binary["/"] = unboxed_div
+
+
+def unboxed_result_type(oper, left, right):
+    # static type of an unboxed binary operation, None when unknown
+    if oper in ("<", ">", "<=", ">=", "==", "!="):
+        return bool
+    if oper in ("&&", "||"):
+        return left if left == right else None
+    if left in (int, float) and right in (int, float):
+        # the left operand decides the type
+        return left
+    return None
+
+
+# unboxed type of the values of a (boxed) type
+unboxed_static = {
+    TypeInt: int,
+    TypeFloat: float,
+    float: float,
+    TypeBool: bool,
+    bool: bool,
+}
+
+
+def specialize_unboxed(oper, left, right):
+    # handler for statically known operand types, skips the type checks
+    if left == float and right in (int, float):
+        return binary_oper[oper]
+    if left == int and right == int:
+        return int_div if oper == "/" else binary_oper[oper]
+    return unboxed_binary[oper]
+
+
+def _bool(value):
+    return TypeBool(value).value
+
+
+# explicit declarations in unboxed mode, varType -> (type, conversion)
+unboxed_types = {
+    'int': (int, int),
+    'float': (float, float),
+    'bool': (bool, _bool),
+    'string': (TypeString, TypeString),
+}
@@ -0,0 +1,266 @@
+from lang.bytecode import (
+    LOAD,
+    STORE,
+    ASSIGN,
+    CONST,
+    BINARY,
+    UNARY,
+    JUMP,
+    JUMP_IF_FALSE,
+    CALL,
+    CALL_METHOD,
+    RET,
+    POP,
+    DUP,
+    LOAD_INDEX,
+    STORE_INDEX,
+    GET_MEMBER,
+    SET_MEMBER,
+    GET_SLOT,
+    SET_SLOT,
+    DECL_TYPED,
+    CONVERT,
+    DEF_FUNC,
+    DEF_CLASS,
+    RET_OUTSIDE,
+    CALL_FUNC,
+    CALL_FUNC_BOUND,
+    CALL_BOUND,
+    BINARY_TYPED,
+    UNARY_TYPED,
+    Code,
+    binary_opers,
+    unary_opers,
+    typed_binary,
+    typed_unary,
+)
+import lang.typeclass as tc
+import lang.exec as exec
+
+UNBOUND = tc.UNBOUND
+
+binary_table = tuple(tc.binary_oper[oper] for oper in binary_opers)
+unary_table = tuple(tc.unary_oper[oper] for oper in unary_opers)
+typed_binary_table = tuple(tc.fast_binary[key] for key in typed_binary)
+typed_unary_table = tuple(tc.fast_unary[key] for key in typed_unary)
+
+
+def typeclass(varType):
+    typeclass = getattr(tc, "Type" + varType.capitalize(), None)
+    if not typeclass:
+        raise SyntaxError(f"Unknown type '{varType}'")
+    return typeclass
+
+
+class VM:
+    # runs bytecode.Code objects, blang calls push a frame record on an
+    # explicit stack so the recursion depth is not limited by python
+    def __init__(self):
+        self.funclist = dict(exec.build_in_func)
+        self.classlist = {}
+
+    def run(self, code: Code):
+        funclist = self.funclist
+        classlist = self.classlist
+        stack = []
+        push = stack.append
+        pop = stack.pop
+        frames = []
+        functions = code.functions
+        # the current frame lives in these locals
+        instructions = code.code
+        consts = code.consts
+        names = code.names
+        varlist = [UNBOUND] * code.nlocals
+        ip = 0
+        while True:
+            op = instructions[ip]
+            if op == LOAD:
+                slot = instructions[ip + 1]
+                value = varlist[slot]
+                if value is UNBOUND:
+                    raise SyntaxError(f"Variable '{code.varnames[slot]}' not found")
+                push(value)
+                ip += 2
+            elif op == CONST:
+                push(consts[instructions[ip + 1]])
+                ip += 2
+            elif op == BINARY:
+                right = pop()
+                stack[-1] = binary_table[instructions[ip + 1]](stack[-1], right)
+                ip += 2
+            elif op == BINARY_TYPED:
+                right = pop()
+                stack[-1] = typed_binary_table[instructions[ip + 1]](stack[-1], right)
+                ip += 2
+            elif op == JUMP_IF_FALSE:
+                if pop():
+                    ip += 2
+                else:
+                    ip = instructions[ip + 1]
+            elif op == STORE:
+                varlist[instructions[ip + 1]] = pop()
+                ip += 2
+            elif op == ASSIGN:
+                slot = instructions[ip + 1]
+                old = varlist[slot]
+                if old is None or old is UNBOUND:
+                    raise SyntaxError(f"Variable '{code.varnames[slot]}' not found")
+                varlist[slot] = pop()
+                ip += 2
+            elif op == JUMP:
+                ip = instructions[ip + 1]
+            elif (
+                op == CALL
+                or op == CALL_METHOD
+                or op == CALL_FUNC
+                or op == CALL_FUNC_BOUND
+                or op == CALL_BOUND
+            ):
+                argc = instructions[ip + 2]
+                if argc:
+                    args = stack[-argc:]
+                    del stack[-argc:]
+                else:
+                    args = []
+                if op == CALL_FUNC or op == CALL_FUNC_BOUND:
+                    # nested function bound by the compiler
+                    callee = functions[instructions[ip + 1]]
+                    name = callee.name
+                    this = pop() if op == CALL_FUNC_BOUND else UNBOUND
+                else:
+                    name = names[instructions[ip + 1]]
+                ip += 3
+                if op == CALL_METHOD:
+                    this = pop()
+                    if type(this) != tc.TypeObject:
+                        raise SyntaxError(f"'{name}' called on a non class value")
+                    callee = this.layout.methods.get(name)
+                    if callee is None:
+                        callee = funclist.get(name)
+                    if callee is None:
+                        raise SyntaxError(
+                            f"Function '{name}' not found in class '{this.name}'"
+                        )
+                elif op == CALL or op == CALL_BOUND:
+                    # CALL_BOUND is a call of a class body on its instance
+                    this = pop() if op == CALL_BOUND else UNBOUND
+                    callee = funclist.get(name)
+                    if callee is None:
+                        callee = classlist.get(name)
+                        if callee is None:
+                            raise SyntaxError(f"Function '{name}' not found")
+                calleeType = type(callee)
+                if calleeType == tc.ClassLayout:
+                    this = tc.TypeObject(callee)
+                    if callee.init is None:
+                        push(this)
+                        continue
+                    callee = callee.init
+                    args = []
+                elif calleeType != Code:
+                    # built-in function
+                    push(callee(*args))
+                    continue
+                elif argc < callee.nparams:
+                    raise SyntaxError(
+                        f"Function '{name}' expects {callee.nparams} arguments"
+                    )
+                elif argc > callee.nparams:
+                    del args[callee.nparams :]
+                frames.append((code, ip, varlist))
+                code = callee
+                instructions = code.code
+                consts = code.consts
+                names = code.names
+                varlist = [this, *args]
+                varlist.extend([UNBOUND] * (code.nlocals - len(varlist)))
+                ip = 0
+            elif op == RET:
+                if not frames:
+                    return pop()
+                code, ip, varlist = frames.pop()
+                instructions = code.code
+                consts = code.consts
+                names = code.names
+            elif op == POP:
+                pop()
+                ip += 1
+            elif op == DUP:
+                push(stack[-1])
+                ip += 1
+            elif op == LOAD_INDEX:
+                index = pop()
+                stack[-1] = stack[-1][index]
+                ip += 1
+            elif op == STORE_INDEX:
+                index = pop()
+                point = pop()
+                point[index] = pop()
+                ip += 1
+            elif op == GET_MEMBER:
+                obj = stack[-1]
+                name = names[instructions[ip + 1]]
+                value = obj.varlist[obj.member(name)]
+                if value is UNBOUND:
+                    raise SyntaxError(f"Member '{name}' not found")
+                stack[-1] = value
+                ip += 2
+            elif op == SET_MEMBER:
+                obj = pop()
+                obj.varlist[obj.member(names[instructions[ip + 1]])] = pop()
+                ip += 2
+            elif op == GET_SLOT:
+                slot = instructions[ip + 1]
+                value = stack[-1].varlist[slot]
+                if value is UNBOUND:
+                    # slots are numbered in declaration order
+                    raise SyntaxError(f"Member '{list(code.slots)[slot]}' not found")
+                stack[-1] = value
+                ip += 2
+            elif op == SET_SLOT:
+                obj = pop()
+                obj.varlist[instructions[ip + 1]] = pop()
+                ip += 2
+            elif op == UNARY:
+                stack[-1] = unary_table[instructions[ip + 1]](stack[-1])
+                ip += 2
+            elif op == UNARY_TYPED:
+                stack[-1] = typed_unary_table[instructions[ip + 1]](stack[-1])
+                ip += 2
+            elif op == DECL_TYPED:
+                slot = instructions[ip + 1]
+                varType = consts[instructions[ip + 2]]
+                cls = typeclass(varType)
+                old = varlist[slot]
+                if old is not UNBOUND and old and type(old) != cls:
+                    raise SyntaxError(
+                        f"Variable '{code.varnames[slot]}' already exists"
+                    )
+                varlist[slot] = cls(pop())
+                ip += 3
+            elif op == CONVERT:
+                stack[-1] = typeclass(consts[instructions[ip + 1]])(stack[-1])
+                ip += 2
+            elif op == DEF_FUNC:
+                func = consts[instructions[ip + 1]]
+                funclist[func.name] = func
+                ip += 2
+            elif op == DEF_CLASS:
+                cls = consts[instructions[ip + 1]]
+                methods = {method.name: method for method in cls.methods}
+                # methods stay callable by name from the method bodies
+                funclist.update(methods)
+                classlist[cls.name] = tc.ClassLayout(
+                    cls.name,
+                    cls.slots,
+                    cls.memberlist,
+                    cls.defaults,
+                    methods,
+                    cls if cls.code else None,
+                )
+                ip += 2
+            elif op == RET_OUTSIDE:
+                raise Exception("Return statement not in function")
+            else:
+                raise Exception(f"Unknown opcode {op}")